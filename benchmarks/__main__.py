@@ -0,0 +1,43 @@
+import sys
+
+from argparse import ArgumentParser
+
+from benchmarks import runner
+from benchmarks.workloads import WORKLOADS
+
+
+def main(argv=None) -> int:
+    parser = ArgumentParser(prog='python -m benchmarks', description="Benchmark model hot paths.")
+    parser.add_argument('--only', nargs='+', choices=sorted(WORKLOADS), default=list(WORKLOADS),
+                        help="workloads to run (all by default)")
+    parser.add_argument('--sizes', nargs='+', type=int, default=[4, 8, 32], help="board sides")
+    parser.add_argument('--fills', nargs='+', type=float, default=[0.25, 0.5, 0.9],
+                        help="shares of filled cells")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--min-time', type=float, default=0.2, help="seconds to run each benchmark for")
+    parser.add_argument('--alloc-samples', type=int, default=20,
+                        help="ops to sample allocations of, fewer keep huge boards quick")
+    parser.add_argument('--save', default=None, help="write the results to this JSON file")
+    parser.add_argument('--baseline', default=None, help="compare the results with this JSON file")
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help="allowed relative slowdown against the baseline")
+    args = parser.parse_args(argv)
+
+    report = runner.run(args.only, args.sizes, args.fills, seed=args.seed, min_time=args.min_time,
+                        alloc_samples=args.alloc_samples)
+
+    if args.save:
+        runner.save(report, args.save)
+
+    if args.baseline:
+        regressions = runner.compare(report, runner.load(args.baseline), args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,127 @@
+"""Measures workloads and compares the results against a baseline."""
+import gc
+import sys
+import json
+import platform
+import tracemalloc
+
+from time import perf_counter, strftime
+from typing import Callable, Dict, Iterable, List, Optional
+
+from benchmarks.workloads import WORKLOADS
+
+
+def measure(op: Callable, min_time: float = 0.2, alloc_samples: int = 20) -> dict:
+    """Runs ``op`` for at least ``min_time`` seconds and samples its allocations.
+
+    :return: dict with ops/sec and allocations per op, where ``alloc_peak_bytes``
+             is the peak of memory allocated during an op on average and
+             ``alloc_net_blocks`` is the number of memory blocks an op leaves allocated
+    """
+
+    # Warm up lazily built caches and tables
+    op()
+
+    ops = 0
+    batch = 1
+    elapsed = 0.0
+    while elapsed < min_time:
+        start = perf_counter()
+        for _ in range(batch):
+            op()
+        elapsed += perf_counter() - start
+        ops += batch
+        batch *= 2
+
+    # Count blocks left allocated with the collector off so it doesn't free unrelated garbage
+    gc.collect()
+    gc.disable()
+    try:
+        blocks = sys.getallocatedblocks()
+        for _ in range(alloc_samples):
+            op()
+        blocks = sys.getallocatedblocks() - blocks
+
+        tracemalloc.start()
+        peak = 0
+        for _ in range(alloc_samples):
+            current, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            op()
+            peak += tracemalloc.get_traced_memory()[1] - current
+        tracemalloc.stop()
+    finally:
+        gc.enable()
+
+    return dict(ops=ops,
+                seconds=elapsed,
+                ops_per_sec=ops / elapsed,
+                alloc_peak_bytes=peak / alloc_samples,
+                alloc_net_blocks=blocks / alloc_samples)
+
+
+def run(names: Iterable[str], sizes: Iterable[int], fills: Iterable[float],
+        seed: int = 0, min_time: float = 0.2, alloc_samples: int = 20, log: Callable = print) -> dict:
+    results = list()
+
+    for name in names:
+        for size in sizes:
+            for fill in fills:
+                op = WORKLOADS[name](size, fill, seed)
+                result = dict(name=name, size=size, fill=fill)
+                result.update(measure(op, min_time, alloc_samples))
+                results.append(result)
+                log(format_result(result))
+
+    return dict(meta=dict(python=platform.python_version(),
+                          implementation=platform.python_implementation(),
+                          machine=platform.machine(),
+                          system=platform.system(),
+                          timestamp=strftime('%Y-%m-%dT%H:%M:%S'),
+                          seed=seed),
+                results=results)
+
+
+def key(result: dict) -> str:
+    return f"{result['name']}[{result['size']}x{result['size']}, fill={result['fill']}]"
+
+
+def format_result(result: dict) -> str:
+    # Moves on huge boards take seconds, so slow rates keep their fractions
+    rate = result['ops_per_sec']
+    rate = f"{rate:,.0f}" if rate >= 100 else f"{rate:.2f}"
+    return (f"{key(result):<45} {rate:>14} ops/s "
+            f"{result['alloc_peak_bytes']:>12,.0f} B/op {result['alloc_net_blocks']:>8.1f} blocks/op")
+
+
+def compare(report: dict, baseline: dict, threshold: float) -> List[str]:
+    """Finds benchmarks that got slower than the baseline by more than ``threshold``.
+
+    :param threshold: allowed relative slowdown, e.g. 0.1 for 10%
+    :return: list of human readable regression descriptions
+    """
+
+    previous: Dict[str, dict] = {key(result): result for result in baseline['results']}
+    regressions = list()
+
+    for result in report['results']:
+        old: Optional[dict] = previous.get(key(result))
+        if not old:
+            continue
+
+        change = result['ops_per_sec'] / old['ops_per_sec'] - 1
+        if change < -threshold:
+            regressions.append(f"{key(result)}: {old['ops_per_sec']:,.0f} -> "
+                               f"{result['ops_per_sec']:,.0f} ops/s ({change:+.1%})")
+
+    return regressions
+
+
+def save(report: dict, path: str):
+    with open(path, 'w') as file:
+        json.dump(report, file, indent=2)
+
+
+def load(path: str) -> dict:
+    with open(path, 'r') as file:
+        return json.load(file)
@@ -0,0 +1,176 @@
+"""Seeded workloads for the model hot paths.
+
+Each workload takes a board size, a fill level and a seed, prepares
+the objects it needs and returns a callable that performs one operation.
+"""
+import random
+
+from argparse import Namespace
+from importlib.util import find_spec
+from typing import Callable, Dict, Tuple
+
+from common.events import CPUTickEvent, GameOverEvent, UserMoveEvent
+from common.mediator import EventManager, Listener, handles
+from controller.game import GameController
+from model.grid import Direction, Grid, Position, Tile
+from model.logic import Logic
+from storage.memory import MemoryStorageManager
+
+
+def _params(size: int) -> Namespace:
+    return Namespace(width=size, height=size, start_tiles=2)
+
+
+def fill_grid(grid: Grid, fill: float, rng: random.Random) -> Grid:
+    """Puts tiles with random values into ``fill`` share of the grid's cells."""
+
+    grid.empty()
+    cells = rng.sample(range(grid.width * grid.height), round(fill * grid.width * grid.height))
+
+    for index in cells:
+        position = Position(index % grid.width, index // grid.width)
+        grid.insert_tile(Tile(position, 2 ** rng.randint(1, 11)))
+
+    return grid
+
+
+def _filled_logic(size: int, fill: float, rng: random.Random) -> Logic:
+    logic = Logic(_params(size))
+    fill_grid(logic.grid, fill, rng)
+    return logic
+
+
+def logic_move(size: int, fill: float, seed: int) -> Callable:
+    rng = random.Random(seed)
+    random.seed(seed)
+
+    logic = _filled_logic(size, fill, rng)
+    directions = [rng.choice(list(Direction)) for _ in range(1024)]
+    state = dict(i=0)
+
+    def op():
+        state['i'] += 1
+        logic.move(directions[state['i'] & 1023])
+        # Keep the fill level from drifting away too much
+        if not logic.moves_available():
+            fill_grid(logic.grid, fill, rng)
+
+    return op
+
+
+def parallel_move(size: int, fill: float, seed: int) -> Callable:
+    from model.parallel import ParallelLogic
+
+    rng = random.Random(seed)
+    logic = ParallelLogic(_params(size))
+    logic.load_state(_filled_logic(size, fill, rng).save_state())
+    directions = [rng.choice(list(Direction)) for _ in range(1024)]
+    state = dict(i=0)
+
+    def op():
+        state['i'] += 1
+        logic.move(directions[state['i'] & 1023])
+        if not logic.moves_available():
+            logic.load_state(_filled_logic(size, fill, rng).save_state())
+
+    return op
+
+
+class _GameOverWatch(Listener):
+
+    def __init__(self):
+        self.finished = False
+
+    @handles(GameOverEvent)
+    def _on_game_over(self, event: GameOverEvent):
+        self.finished = True
+
+
+def _game(engine: str, size: int, fill: float, rng: random.Random) -> Tuple[GameController, _GameOverWatch]:
+    """Game controller on its own event manager that resumes a game with ``fill`` share of the cells filled."""
+
+    params = Namespace(width=size, height=size, start_tiles=2, engine=engine,
+                       username='benchmark', autosave_interval=0)
+    checkpoint = dict(state=_filled_logic(size, fill, rng).save_state(), best=0, is_finished=False)
+
+    storage = MemoryStorageManager()
+    storage.set(params.username, checkpoint)
+
+    event_manager = EventManager()
+    game = GameController(params, storage, event_manager)
+    watch = _GameOverWatch()
+    event_manager.register(watch)
+
+    # The first tick loads the checkpoint
+    event_manager.post(CPUTickEvent())
+    return game, watch
+
+
+def game_move(engine: str) -> Callable:
+    """Moves through ``GameController``: the move, the undo snapshot, the grid for the listeners and the checks."""
+
+    def workload(size: int, fill: float, seed: int) -> Callable:
+        rng = random.Random(seed)
+        random.seed(seed)
+
+        # The event manager only keeps weak references to its listeners
+        state = dict(i=0, game=_game(engine, size, fill, rng))
+        directions = [rng.choice(list(Direction)) for _ in range(1024)]
+
+        def op():
+            state['i'] += 1
+            game, watch = state['game']
+            game.post(UserMoveEvent(directions[state['i'] & 1023]))
+            if watch.finished:
+                state['game'] = _game(engine, size, fill, rng)
+
+        return op
+
+    return workload
+
+
+def logic_moves_available(size: int, fill: float, seed: int) -> Callable:
+    logic = _filled_logic(size, fill, random.Random(seed))
+    return logic.moves_available
+
+
+def logic_setup(size: int, fill: float, seed: int) -> Callable:
+    """Setup empties the grid first, so the fill level makes no difference."""
+
+    random.seed(seed)
+    logic = Logic(_params(size))
+    return logic.setup
+
+
+def grid_get_empty_cell(size: int, fill: float, seed: int) -> Callable:
+    random.seed(seed)
+    grid = fill_grid(Grid(size, size), fill, random.Random(seed))
+    return grid.get_empty_cell
+
+
+def grid_tiles(size: int, fill: float, seed: int) -> Callable:
+    """The list of tiles is cached until the grid changes, so a tile is put back before every call."""
+
+    grid = fill_grid(Grid(size, size), fill, random.Random(seed))
+    tile = grid.get_cell(Position(0, 0)) or Tile(Position(0, 0), 2)
+
+    def op():
+        grid.insert_tile(tile)
+        return grid.tiles
+
+    return op
+
+
+WORKLOADS: Dict[str, Callable] = {
+    'logic.move': logic_move,
+    'logic.moves_available': logic_moves_available,
+    'logic.setup': logic_setup,
+    'grid.get_empty_cell': grid_get_empty_cell,
+    'grid.tiles': grid_tiles,
+    'game.move': game_move('classic'),
+}
+
+# The parallel engine needs NumPy, which is optional
+if find_spec('numpy') is not None:
+    WORKLOADS['parallel.move'] = parallel_move
+    WORKLOADS['game.parallel_move'] = game_move('parallel')
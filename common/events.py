@@ -30,6 +30,18 @@ class UserRestartEvent(Event):
         super().__init__("User restart request event")
 
 
+class UserUndoEvent(Event):
+
+    def __init__(self):
+        super().__init__("User undo request event")
+
+
+class UserRedoEvent(Event):
+
+    def __init__(self):
+        super().__init__("User redo request event")
+
+
 class CPUTickEvent(Event):
 
     def __init__(self, ticks: int = 0):
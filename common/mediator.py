@@ -1,5 +1,9 @@
+import asyncio
+
 from enum import Enum, auto
-from abc import ABC, abstractmethod
+from abc import ABC
+from weakref import WeakKeyDictionary, ref
+from typing import Callable, Dict, List, Tuple
 
 
 class EventGroup(Enum):
@@ -10,11 +14,50 @@ class EventGroup(Enum):
     CPU = auto()
 
 
+def handles(*event_types):
+    """Marks a ``Listener`` method as the handler of the given event types (and their subclasses).
+
+    ``EventManager`` calls such methods directly instead of going through ``notify``.
+    """
+
+    def decorator(method):
+        method.handled_events = event_types
+        return method
+
+    return decorator
+
+
 class Listener(ABC):
+    """Receives posted events.
+
+    Either mark handler methods with :func:`handles` or override :meth:`notify`
+    to receive every event and filter them yourself.
+    """
+
+    # Event type -> names of the methods marked to handle it, filled for every subclass
+    handlers: Dict[type, Tuple[str, ...]] = dict()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+
+        # The most derived definition of a method decides what it handles
+        methods = dict()
+        for klass in reversed(cls.__mro__):
+            for name, attribute in vars(klass).items():
+                if callable(attribute):
+                    methods[name] = getattr(attribute, 'handled_events', ())
+
+        handlers = dict()
+        for name, event_types in methods.items():
+            for event_type in event_types:
+                handlers.setdefault(event_type, list()).append(name)
+
+        cls.handlers = {event_type: tuple(names) for event_type, names in handlers.items()}
 
-    @abstractmethod
     def notify(self, event):
-        pass
+        for event_type in type(event).__mro__:
+            for name in self.handlers.get(event_type, ()):
+                getattr(self, name)(event)
 
 
 class Poster(ABC):
@@ -26,20 +69,214 @@ class Poster(ABC):
         self.event_manager.post(event, event_group)
 
 
+class EventCoalescer(Listener):
+    """Sits between the event manager and a listener and holds back bursts of events.
+
+    Events of the ``coalesce`` types are not delivered right away: only the latest
+    event of each type is kept until an event of the ``flush_on`` types arrives.
+    Then the kept events are delivered in the order they were last posted,
+    followed by the flushing event itself. Any other event is passed through.
+
+    Register the coalescer instead of the listener and keep a reference to it,
+    the event manager doesn't keep its listeners alive.
+    """
+
+    def __init__(self, listener: Listener, coalesce: Tuple[type, ...], flush_on: Tuple[type, ...]):
+        self.listener = listener
+
+        self._coalesce = coalesce
+        self._flush_on = flush_on
+        # Event type -> the latest event of that type posted since the last flush
+        self._pending = dict()
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def notify(self, event):
+        if isinstance(event, self._coalesce):
+            # Re-insert the type so the pending events stay in the order of their last update
+            self._pending.pop(type(event), None)
+            self._pending[type(event)] = event
+            return
+
+        if isinstance(event, self._flush_on):
+            self.flush()
+
+        self.listener.notify(event)
+
+    def flush(self):
+        """Delivers the held back events."""
+
+        pending = list(self._pending.values())
+        self._pending.clear()
+
+        for event in pending:
+            self.listener.notify(event)
+
+
+class _Subscription:
+
+    __slots__ = ('listener', 'event_type', 'function', 'event_group')
+
+    def __init__(self, listener: ref, event_type, function: Callable, event_group: EventGroup):
+        self.listener = listener
+        self.event_type = event_type
+        self.function = function
+        self.event_group = event_group
+
+
 class EventManager(object):
+    """Delivers posted events to the registered listeners.
+
+    Listeners subscribe to event classes, so posting an event takes
+    a single dict lookup to find its handlers. Listeners that override
+    ``notify`` are subscribed to every event. Registering a listener
+    again doesn't deliver events to it twice.
+    Only weak references to the listeners are kept.
+    """
 
     def __init__(self):
-        from weakref import WeakKeyDictionary
         self.listeners = WeakKeyDictionary()
 
+        self._subscriptions: List[_Subscription] = list()
+        # (event type, event group) -> tuple of (listener reference, function) pairs
+        self._dispatch = dict()
+
     def register(self, listener: Listener, event_group: EventGroup = None):
         self.listeners[listener] = event_group
 
+        listener_class = type(listener)
+        if getattr(listener_class, 'notify', None) is not Listener.notify:
+            self._subscribe(listener, object, listener_class.notify, event_group)
+            return
+
+        for event_type, names in listener_class.handlers.items():
+            for name in names:
+                self._subscribe(listener, event_type, getattr(listener_class, name), event_group)
+
+    def subscribe(self, event_type, handler: Callable, event_group: EventGroup = None):
+        """Calls bound method ``handler`` for every posted event of ``event_type`` or its subclasses."""
+
+        listener = handler.__self__
+        self.listeners.setdefault(listener, event_group)
+        self._subscribe(listener, event_type, handler.__func__, event_group)
+
     def unregister(self, listener: Listener):
         if listener in self.listeners:
             del self.listeners[listener]
 
+        self._forget(lambda subscription: subscription.listener() is listener)
+
+    def post(self, event, event_group: EventGroup = None):
+        for listener, function in self._handlers(event, event_group):
+            listener = listener()
+            if listener is not None:
+                function(listener, event)
+
+    def _handlers(self, event, event_group: EventGroup) -> tuple:
+        key = (type(event), event_group)
+
+        handlers = self._dispatch.get(key)
+        if handlers is None:
+            handlers = self._dispatch[key] = self._resolve(*key)
+
+        return handlers
+
+    def _subscribe(self, listener, event_type, function: Callable, event_group: EventGroup):
+        for subscription in self._subscriptions:
+            if (subscription.listener() is listener and subscription.event_type is event_type and
+                    subscription.function is function):
+                # Registering again only moves the listener to the new event group
+                subscription.event_group = event_group
+                self._dispatch.clear()
+                return
+
+        reference = ref(listener, self._release)
+        self._subscriptions.append(_Subscription(reference, event_type, function, event_group))
+        self._dispatch.clear()
+
+    def _release(self, reference: ref):
+        # Called once a listener has been garbage collected
+        self._forget(lambda subscription: subscription.listener is reference)
+
+    def _forget(self, predicate: Callable):
+        self._subscriptions = [subscription for subscription in self._subscriptions
+                               if not predicate(subscription)]
+        self._dispatch.clear()
+
+    def _resolve(self, event_class, event_group: EventGroup) -> tuple:
+        """Collects handlers of the event class in the order they were subscribed."""
+
+        event_types = set(event_class.__mro__)
+        return tuple((subscription.listener, subscription.function)
+                     for subscription in self._subscriptions
+                     if subscription.event_type in event_types and subscription.event_group is event_group)
+
+
+class AsyncEventManager(EventManager):
+    """Event manager that queues posted events and dispatches them from :meth:`run`.
+
+    Events are dispatched one at a time: an event is delivered to all its handlers
+    before the next one is taken from the queue, so posting never calls listeners re-entrantly.
+    Handlers may be coroutines; those of the same event run concurrently and are awaited.
+    """
+
+    def __init__(self):
+        super().__init__()
+
+        # The queue is created by `run` so that it belongs to the running loop
+        self._queue = None
+        self._backlog = list()
+        self._running = False
+
     def post(self, event, event_group: EventGroup = None):
-        for listener, group in self.listeners.items():
-            if group is event_group:
-                listener.notify(event)
+        if self._queue is None:
+            self._backlog.append((event, event_group))
+        else:
+            self._queue.put_nowait((event, event_group))
+
+    def stop(self):
+        """Makes :meth:`run` return once the events posted so far are dispatched."""
+
+        self._running = False
+        if self._queue is not None:
+            self._queue.put_nowait(None)
+
+    async def join(self):
+        """Waits until every posted event is dispatched."""
+
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def run(self):
+        self._queue = asyncio.Queue()
+        self._running = True
+
+        for item in self._backlog:
+            self._queue.put_nowait(item)
+        self._backlog.clear()
+
+        try:
+            while self._running or not self._queue.empty():
+                item = await self._queue.get()
+                try:
+                    if item is not None:
+                        await self.dispatch(*item)
+                finally:
+                    self._queue.task_done()
+        finally:
+            self._queue = None
+
+    async def dispatch(self, event, event_group: EventGroup = None):
+        coroutines = list()
+
+        for listener, function in self._handlers(event, event_group):
+            listener = listener()
+            if listener is not None:
+                result = function(listener, event)
+                if asyncio.iscoroutine(result):
+                    coroutines.append(result)
+
+        if coroutines:
+            await asyncio.gather(*coroutines)
@@ -0,0 +1,260 @@
+from argparse import Namespace
+from collections import OrderedDict
+from typing import Optional
+
+from common.errors import MisconfigurationError
+from common.mediator import EventManager
+from controller.autoplay import PlayerController
+from model import bitboard
+from model.bitboard import CELLS, MAX_EXPONENT, ROW_MASK, SIZE, board_from_grid, empty_mask, move_board, transpose
+from model.grid import Direction, Grid
+
+
+# Heuristic weights borrowed from the well-known C++ expectimax solver by Robert Xiao
+SCORE_LOST_PENALTY = 200000.0
+SCORE_MONOTONICITY_POWER = 4.0
+SCORE_MONOTONICITY_WEIGHT = 47.0
+SCORE_SUM_POWER = 3.5
+SCORE_SUM_WEIGHT = 11.0
+SCORE_MERGES_WEIGHT = 700.0
+SCORE_EMPTY_WEIGHT = 270.0
+
+# Chance nodes less likely than that are evaluated right away
+PROBABILITY_THRESHOLD = 0.0001
+
+DEFAULT_DEPTH = 3
+DEFAULT_CACHE_SIZE = 100000
+
+
+def _row_heuristic(row: int) -> float:
+    cells = [row >> shift & 0xF for shift in (0, 4, 8, 12)]
+
+    total = sum(rank ** SCORE_SUM_POWER for rank in cells)
+    empty = cells.count(0)
+
+    merges = 0
+    previous = 0
+    counter = 0
+    for rank in cells:
+        if not rank:
+            continue
+        if previous == rank:
+            counter += 1
+        elif counter > 0:
+            merges += 1 + counter
+            counter = 0
+        previous = rank
+    if counter > 0:
+        merges += 1 + counter
+
+    monotonicity_left = monotonicity_right = 0.0
+    for a, b in zip(cells, cells[1:]):
+        if a > b:
+            monotonicity_left += a ** SCORE_MONOTONICITY_POWER - b ** SCORE_MONOTONICITY_POWER
+        else:
+            monotonicity_right += b ** SCORE_MONOTONICITY_POWER - a ** SCORE_MONOTONICITY_POWER
+
+    return (SCORE_LOST_PENALTY +
+            SCORE_EMPTY_WEIGHT * empty +
+            SCORE_MERGES_WEIGHT * merges -
+            SCORE_MONOTONICITY_WEIGHT * min(monotonicity_left, monotonicity_right) -
+            SCORE_SUM_WEIGHT * total)
+
+
+_HEURISTIC = None
+
+
+def _ensure_heuristic():
+    global _HEURISTIC
+
+    if _HEURISTIC is None:
+        _HEURISTIC = [_row_heuristic(row) for row in range(1 << 16)]
+
+
+def evaluate(board: int) -> float:
+    """Scores a packed board as the sum of precomputed scores of its rows and columns."""
+
+    table = _HEURISTIC
+    columns = transpose(board)
+    return (table[board & ROW_MASK] + table[board >> 16 & ROW_MASK] +
+            table[board >> 32 & ROW_MASK] + table[board >> 48] +
+            table[columns & ROW_MASK] + table[columns >> 16 & ROW_MASK] +
+            table[columns >> 32 & ROW_MASK] + table[columns >> 48])
+
+
+class TranspositionTable:
+    """Bounded mapping of already evaluated positions with LRU eviction."""
+
+    def __init__(self, capacity: int = DEFAULT_CACHE_SIZE):
+        self._capacity = capacity
+        self._entries = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: int) -> Optional[float]:
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: int, value: float):
+        entries = self._entries
+        entries[key] = value
+        entries.move_to_end(key)
+        if len(entries) > self._capacity:
+            entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+
+class Expectimax:
+    """Depth-limited expectimax search over packed 4x4 boards.
+
+    Max nodes try every move, chance nodes average over every possible spawn.
+    The search depth is the number of moves looked ahead.
+    """
+
+    def __init__(self, depth: int = DEFAULT_DEPTH, cache_size: int = DEFAULT_CACHE_SIZE):
+        if depth < 1:
+            raise ValueError(f"Search depth must be positive. Got {depth} instead.")
+
+        bitboard.prepare_tables()
+        _ensure_heuristic()
+
+        self._depth = depth
+        self._cache = TranspositionTable(cache_size)
+
+    @property
+    def depth(self) -> int:
+        return self._depth
+
+    @property
+    def cache(self) -> TranspositionTable:
+        return self._cache
+
+    def decide(self, board: int) -> Optional[Direction]:
+        """Picks the move with the best expected heuristic score.
+
+        :return: Direction or None if no move changes the board
+        """
+
+        best, best_value = None, -1.0
+
+        for direction in Direction:
+            moved, _ = move_board(board, direction)
+            if moved == board:
+                continue
+
+            value = self._chance(moved, self._depth - 1, 1.0)
+            if value > best_value:
+                best, best_value = direction, value
+
+        return best
+
+    def decide_grid(self, grid: Grid) -> Optional[Direction]:
+        """Picks the move for a 4x4 ``Grid``, which may hold tiles the packed boards can't.
+
+        Tiles above ``1 << MAX_EXPONENT`` are searched as the largest packed tile.
+        Those never merge on packed boards, so every move the search picks changes the grid too.
+        Merges it can't see are only made once no other move is left.
+
+        :return: Direction or None if no move changes the grid
+        """
+
+        try:
+            board = board_from_grid(grid)
+        except ValueError:
+            board = _clamped_board(grid)
+
+        return self.decide(board) or _merging_direction(grid)
+
+    def _max(self, board: int, depth: int, probability: float) -> float:
+        best = 0.0
+
+        for direction in Direction:
+            moved, _ = move_board(board, direction)
+            if moved != board:
+                value = self._chance(moved, depth - 1, probability)
+                if value > best:
+                    best = value
+
+        return best
+
+    def _chance(self, board: int, depth: int, probability: float) -> float:
+        if depth <= 0 or probability < PROBABILITY_THRESHOLD:
+            return evaluate(board)
+
+        # The depth is stored above the 64 bits of the board
+        key = board | depth << 64
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+
+        empty = empty_mask(board)
+        count = bin(empty).count('1')
+        probability /= count
+
+        total = 0.0
+        while empty:
+            cell = empty & -empty
+            empty ^= cell
+            total += 0.9 * self._max(board | cell, depth, probability * 0.9)
+            total += 0.1 * self._max(board | cell << 1, depth, probability * 0.1)
+
+        value = total / count
+        self._cache.put(key, value)
+        return value
+
+
+def _clamped_board(grid: Grid) -> int:
+    board = 0
+    for y in range(SIZE):
+        for x, exponent in enumerate(grid.row_exponents(y)):
+            board |= min(exponent, MAX_EXPONENT) << ((y * SIZE + x) << 2)
+    return board
+
+
+def _merging_direction(grid: Grid) -> Optional[Direction]:
+    """A move merging two of the largest tiles on a full grid, None if there is none."""
+
+    cells = b''.join(grid.row_exponents(y) for y in range(SIZE))
+    if 0 in cells:
+        return
+
+    for index in range(CELLS):
+        if index % SIZE + 1 < SIZE and cells[index] == cells[index + 1]:
+            return Direction.LEFT
+        if index + SIZE < CELLS and cells[index] == cells[index + SIZE]:
+            return Direction.UP
+
+
+class ExpectimaxController(PlayerController):
+    """Makes the move chosen by :class:`Expectimax` on every ``CPUTickEvent``.
+
+    Search settings are taken from ``ai_depth`` and ``ai_cache_size`` config options.
+    """
+
+    def __init__(self, params: Namespace, event_manager: EventManager, games: Optional[int] = 1):
+        if not bitboard.BitboardLogic.supports(params):
+            raise MisconfigurationError("AI player supports only 4x4 grids.")
+
+        super().__init__(event_manager, games)
+
+        depth = getattr(params, 'ai_depth', DEFAULT_DEPTH)
+        cache_size = getattr(params, 'ai_cache_size', DEFAULT_CACHE_SIZE)
+
+        try:
+            self._search = Expectimax(depth=depth, cache_size=cache_size)
+        except ValueError as e:
+            raise MisconfigurationError(str(e))
+
+    def _choose_direction(self, grid: Grid) -> Optional[Direction]:
+        return self._search.decide_grid(grid)
@@ -0,0 +1,64 @@
+import asyncio
+import logging
+
+from time import perf_counter
+from typing import Optional
+
+from common.events import GameTeardownEvent, QuitEvent, CPUTickEvent
+from common.mediator import AsyncEventManager, handles
+from controller.controller import Controller
+
+
+log = logging.getLogger(__name__)
+
+
+class AsyncClockController(Controller):
+    """Produces the ``CPUTickEvent`` up to :attr:`fps` times per second on an asyncio loop.
+
+    Every tick is fully dispatched before the next one is posted, and the time left
+    until the next frame is given back to the loop, so other tasks can run meanwhile.
+    With ``fps=None`` ticks are produced as fast as listeners can handle them.
+    """
+
+    def __init__(self, event_manager: AsyncEventManager, fps: Optional[int] = 60):
+        super().__init__(event_manager)
+
+        self._fps = fps
+        self._running = False
+        self._ticks = 0
+
+    @handles(QuitEvent)
+    def _on_quit(self, event: QuitEvent):
+        self._running = False
+        self.post(GameTeardownEvent())
+        self.event_manager.stop()
+
+    async def run(self):
+        """Runs the event manager and produces ticks until a ``QuitEvent`` is posted."""
+
+        self._running = True
+        dispatcher = asyncio.ensure_future(self.event_manager.run())
+
+        # Let the dispatcher set up its queue before the first tick
+        await asyncio.sleep(0)
+
+        try:
+            last_tick = perf_counter()
+            # A handler that raised stops the dispatcher, its exception is re-raised below
+            while self._running and not dispatcher.done():
+                self.post(CPUTickEvent(self._ticks))
+                await self.event_manager.join()
+
+                frame = 1 / self._fps if self._fps else 0
+                await asyncio.sleep(max(0.0, frame - (perf_counter() - last_tick)))
+
+                now = perf_counter()
+                self._ticks = round((now - last_tick) * 1000)
+                last_tick = now
+
+        except (KeyboardInterrupt, asyncio.CancelledError):
+            log.info('Detected interruption. Attempting graceful shutdown ...')
+            if not dispatcher.done():
+                self.post(QuitEvent())
+
+        await dispatcher
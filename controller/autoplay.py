@@ -0,0 +1,88 @@
+import random
+
+from abc import abstractmethod
+from typing import Optional
+
+from common.events import (
+    CPUTickEvent,
+    GameOverEvent,
+    GameReadyEvent,
+    GridUpdateEvent,
+    QuitEvent,
+    UserMoveEvent,
+    UserRestartEvent,
+)
+from common.mediator import EventManager, handles
+from controller.controller import Controller
+from model.grid import Direction, Grid
+
+
+class PlayerController(Controller):
+    """Base class for controllers that make a move on every ``CPUTickEvent``.
+
+    Plays :attr:`games` games restarting after each game over and quits after the last one.
+    If :attr:`games` is ``None`` it just stops after a game over and waits for a restart.
+    """
+
+    def __init__(self, event_manager: EventManager, games: Optional[int] = 1):
+        super().__init__(event_manager)
+
+        self._games = games
+        self._grid = None
+        self._game_over = False
+
+        self.results = list()
+        self.moves = 0
+
+    @abstractmethod
+    def _choose_direction(self, grid: Grid) -> Optional[Direction]:
+        pass
+
+    @handles(CPUTickEvent)
+    def _on_tick(self, event: CPUTickEvent):
+        if self._grid is None:
+            return
+
+        # React to a game over on the next tick rather than in the middle of the move
+        if self._game_over:
+            if self._games is None:
+                return
+
+            self._game_over = False
+            if len(self.results) < self._games:
+                self.post(UserRestartEvent())
+            else:
+                self.post(QuitEvent())
+            return
+
+        direction = self._choose_direction(self._grid)
+        if direction:
+            self.moves += 1
+            self.post(UserMoveEvent(direction))
+
+    @handles(GameReadyEvent)
+    def _on_game_ready(self, event: GameReadyEvent):
+        self._grid = event.grid
+        self._game_over = False
+
+    @handles(GridUpdateEvent)
+    def _on_grid_update(self, event: GridUpdateEvent):
+        self._grid = event.grid
+
+    @handles(GameOverEvent)
+    def _on_game_over(self, event: GameOverEvent):
+        self.results.append(event.score)
+        self._game_over = True
+
+
+class RandomPlayerController(PlayerController):
+    """Makes a random move on every ``CPUTickEvent``."""
+
+    def __init__(self, event_manager: EventManager, games: Optional[int] = 1, seed: int = None):
+        super().__init__(event_manager, games)
+
+        self._random = random.Random(seed)
+        self._directions = list(Direction)
+
+    def _choose_direction(self, grid: Grid) -> Direction:
+        return self._random.choice(self._directions)
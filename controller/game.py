@@ -1,27 +1,33 @@
 import logging
 
 from argparse import Namespace
+from typing import Optional
 
-from common.events import GameReadyEvent, CPUTickEvent, UserMoveEvent, UserRestartEvent, GridUpdateEvent, GameOverEvent, ScoreUpdateEvent, QuitEvent, GameTeardownEvent
+from common.events import GameReadyEvent, CPUTickEvent, UserMoveEvent, UserRestartEvent, UserUndoEvent, UserRedoEvent, GridUpdateEvent, GameOverEvent, ScoreUpdateEvent, QuitEvent, GameTeardownEvent
 from common.errors import MisconfigurationError
-from common.mediator import EventManager
+from common.mediator import EventManager, handles
 from controller.controller import Controller
-from model.logic import Logic
+from model.engine import create_logic
+from model.history import DEFAULT_DEPTH, DEFAULT_MEMORY, History
 from storage.storage import StorageManager
 
 log = logging.getLogger(__name__)
 
+# Seconds of play between checkpoints, 0 saves only when the game quits
+DEFAULT_AUTOSAVE_INTERVAL = 30
+
 
 class GameController(Controller):
 
     def __init__(self,
                  params: Namespace,
                  storage: StorageManager,
-                 event_manager: EventManager):
+                 event_manager: EventManager,
+                 seed: Optional[int] = None):
 
         super().__init__(event_manager)
 
-        self._logic = Logic(params)
+        self._logic = create_logic(params)
         self._params = params
         self._storage = storage
 
@@ -30,6 +36,22 @@ class GameController(Controller):
 
         self._score = 0
         self._best = 0
+        # Seed of the next new game, incremented for every game, random if None
+        self._seed = seed
+
+        # Milliseconds since the last checkpoint
+        self._autosave_interval = getattr(params, 'autosave_interval', DEFAULT_AUTOSAVE_INTERVAL) * 1000
+        self._unsaved = 0
+
+        # Snapshots of the states before the moves, 0 depth disables undo
+        depth = getattr(params, 'undo_depth', DEFAULT_DEPTH)
+        memory = getattr(params, 'undo_memory', DEFAULT_MEMORY)
+        self._history = History(depth, memory) if depth else None
+
+    @property
+    def best(self) -> int:
+        """Best score of the user, games of earlier runs included."""
+        return self._best
 
     def _initialize(self):
         if self._initialized:
@@ -46,7 +68,12 @@ class GameController(Controller):
         self._initialized = True
 
     def _setup_logic(self):
-        if not self._logic.setup():
+        self._clear_history()
+        seed = self._seed
+        if seed is not None:
+            self._seed += 1
+
+        if not self._logic.setup(seed=seed):
             error = "Invalid number of `start_tiles` provided in config!"
             log.error(error)
             raise MisconfigurationError(error)
@@ -58,53 +85,114 @@ class GameController(Controller):
         if not last_game_finished:
             state = checkpoint['state']
             self._logic.load_state(state)
+            self._clear_history()
             self._score = self._logic.merged_total
         else:
             self._setup_logic()
 
     def _restart_game(self):
         self._update_best()
+        # Threads of the previous game aren't needed until the first move
+        self._logic.close()
         self._setup_logic()
         self._score = 0
         self._is_finished = False
 
     def _teardown(self):
+        self._save()
+        self._storage.flush()
+        self._logic.close()
+
+    def _save(self):
         self._update_best()
         state = self._logic.save_state()
         result = dict(state=state, is_finished=self._is_finished, best=self._best)
         self._storage.set(self._params.username, result)
+        self._unsaved = 0
+
+    def _clear_history(self):
+        if self._history is not None:
+            self._history.clear()
+
+    def _travel(self, back: bool):
+        """
+        Restores the game to a snapshot from the history.
+
+        :param back: undo the last move if True, redo the last undone one otherwise
+        """
+
+        history = self._history
+        if history is None:
+            return
+
+        if not (history.can_undo() if back else history.can_redo()):
+            return
+
+        step = history.undo if back else history.redo
+        snapshot = step(self._logic.snapshot(history.last))
+
+        self._logic.restore(snapshot)
+        self._score = self._logic.merged_total
+        self._is_finished = False
+
+        # The whole grid is replaced, so it's redrawn as a new game rather than animated as a move
+        self.post(GameReadyEvent(grid=self._logic.grid, score=self._score, best=self._best))
+
+        # Redo might bring back the last move of the game
+        if not self._logic.moves_available():
+            self._is_finished = True
+            self.post(GameOverEvent(username=self._params.username, score=self._score, best=self._best))
 
     def _update_best(self):
         if self._score > self._best:
             self._best = self._score
 
-    def notify(self, event):
-        if isinstance(event, CPUTickEvent):
-            if not self._initialized:
-                self._initialize()
-                self.post(GameReadyEvent(grid=self._logic.grid, score=self._score, best=self._best))
-
-        if isinstance(event, UserMoveEvent):
-            self._logic.move(event.direction)
-            self.post(GridUpdateEvent(grid=self._logic.grid))
-
-            # Check if tiles have merged and update score
-            if self._logic.merged_total != self._score:
-                self._score = self._logic.merged_total
-                self.post(ScoreUpdateEvent(score=self._score, best=self._best))
-
-            # Check if logic can't insert new tiles
-            if not self._logic.random_tile():
-                # Check if there are any possible moves (expensive)
-                if not self._logic.moves_available():
-                    self._is_finished = True
-                    self.post(GameOverEvent(username=self._params.username, score=self._score, best=self._best))
-
-        if isinstance(event, (QuitEvent, GameTeardownEvent)):
-            self._teardown()
-
-        if isinstance(event, UserRestartEvent):
-            self._restart_game()
+    @handles(CPUTickEvent)
+    def _on_tick(self, event: CPUTickEvent):
+        if not self._initialized:
+            self._initialize()
             self.post(GameReadyEvent(grid=self._logic.grid, score=self._score, best=self._best))
+            return
+
+        # Storage managers that write in the background make it cheap to do during play
+        self._unsaved += event.ticks
+        if self._autosave_interval and self._unsaved >= self._autosave_interval:
+            self._save()
+
+    @handles(UserMoveEvent)
+    def _on_move(self, event: UserMoveEvent):
+        if self._is_finished:
+            return
+
+        if self._history is not None:
+            self._history.push(self._logic.snapshot(self._history.last))
+
+        self._logic.move(event.direction)
+        self.post(GridUpdateEvent(grid=self._logic.grid))
+
+        # Check if tiles have merged and update score
+        if self._logic.merged_total != self._score:
+            self._score = self._logic.merged_total
+            self.post(ScoreUpdateEvent(score=self._score, best=self._best))
+
+        # Check if there are any possible moves (cheap, both engines track it)
+        if not self._logic.moves_available():
+            self._is_finished = True
+            self.post(GameOverEvent(username=self._params.username, score=self._score, best=self._best))
+
+    @handles(QuitEvent, GameTeardownEvent)
+    def _on_quit(self, event):
+        self._teardown()
+
+    @handles(UserRestartEvent)
+    def _on_restart(self, event: UserRestartEvent):
+        self._restart_game()
+        self.post(GameReadyEvent(grid=self._logic.grid, score=self._score, best=self._best))
 
+    @handles(UserUndoEvent)
+    def _on_undo(self, event: UserUndoEvent):
+        self._travel(back=True)
 
+    @handles(UserRedoEvent)
+    def _on_redo(self, event: UserRedoEvent):
+        self._travel(back=False)
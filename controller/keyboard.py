@@ -1,6 +1,7 @@
 import pygame
 
-from common.events import QuitEvent, UserRestartEvent, UserMoveEvent, CPUTickEvent
+from common.events import QuitEvent, UserRestartEvent, UserMoveEvent, UserUndoEvent, UserRedoEvent, CPUTickEvent
+from common.mediator import handles
 from controller.controller import Controller
 from model.grid import Direction
 
@@ -23,12 +24,16 @@ class KeyboardController(Controller):
             response = UserMoveEvent(Direction.RIGHT)
         elif event.key == pygame.K_r:
             response = UserRestartEvent()
+        elif event.key in (pygame.K_u, pygame.K_z):
+            response = UserUndoEvent()
+        elif event.key == pygame.K_y:
+            response = UserRedoEvent()
 
         if response:
             self.post(response)
 
-    def notify(self, event):
-        if isinstance(event, CPUTickEvent):
-            for event in pygame.event.get():
-                if event.type == pygame.KEYDOWN:
-                    self._handle_event(event)
+    @handles(CPUTickEvent)
+    def _on_tick(self, event: CPUTickEvent):
+        for event in pygame.event.get():
+            if event.type == pygame.KEYDOWN:
+                self._handle_event(event)
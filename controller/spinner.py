@@ -0,0 +1,46 @@
+import logging
+
+from time import perf_counter
+
+from common.events import GameTeardownEvent, QuitEvent, CPUTickEvent
+from common.mediator import EventManager, handles
+from controller.controller import Controller
+
+
+log = logging.getLogger(__name__)
+
+
+class SpinnerController(Controller):
+    """Produces the ``CPUTickEvent`` as fast as listeners can handle it.
+
+    Doesn't depend on pygame, so it can drive the game without a display.
+    Ticks carry the number of milliseconds passed since the previous one.
+    """
+
+    def __init__(self, event_manager: EventManager):
+        super().__init__(event_manager)
+
+        self._running = False
+        self._ticks = 0
+        self._last_tick = None
+
+    @handles(QuitEvent)
+    def _on_quit(self, event: QuitEvent):
+        self._running = False
+        self.post(GameTeardownEvent())
+
+    def tick(self):
+        now = perf_counter()
+        if self._last_tick is not None:
+            self._ticks = round((now - self._last_tick) * 1000)
+        self._last_tick = now
+
+    def run(self):
+        self._running = True
+        try:
+            while self._running:
+                self.post(CPUTickEvent(self._ticks))
+                self.tick()
+        except KeyboardInterrupt:
+            log.info('Detected `KeyboardInterrupt`. Attempting graceful shutdown ...')
+            self.post(QuitEvent())
@@ -0,0 +1,86 @@
+"""Runs the game without a display, e.g. for batch jobs and benchmarks.
+
+Neither pygame nor the ``view`` package are imported here,
+so the controller/model stack runs at full CPU speed.
+"""
+import sys
+import yaml
+import asyncio
+import logging
+
+from argparse import ArgumentParser, Namespace
+from time import perf_counter
+
+from controller.ai import ExpectimaxController
+from controller.aio import AsyncClockController
+from controller.autoplay import RandomPlayerController
+from controller.game import GameController
+from controller.spinner import SpinnerController
+
+from common.mediator import AsyncEventManager, EventManager
+from storage.local import LocalStorageManager
+from storage.memory import MemoryStorageManager
+from storage.sqlite import SQLiteStorageManager
+
+
+def parse_args(argv=None) -> Namespace:
+    parser = ArgumentParser(description="Play 2048 games headlessly.")
+    parser.add_argument('--config', default='config.yaml', help="game settings file")
+    parser.add_argument('--games', type=int, default=1, help="number of games to play")
+    parser.add_argument('--player', choices=('random', 'ai'), default='random', help="who makes the moves")
+    parser.add_argument('--seed', type=int, default=None,
+                        help="seed of the first game, incremented per game, and of the random player's moves")
+    parser.add_argument('--asyncio', action='store_true', help="run the event loop on asyncio")
+    parser.add_argument('--storage', default=None,
+                        help="directory or SQLite database (*.db) to keep checkpoints in (kept in memory by default)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    # Load user defined game settings
+    with open(args.config, 'r') as config:
+        params = Namespace(**yaml.safe_load(config))
+
+    if args.storage and args.storage.endswith('.db'):
+        storage = SQLiteStorageManager(path=args.storage)
+    elif args.storage:
+        storage = LocalStorageManager(path=args.storage, hide_files=False)
+    else:
+        storage = MemoryStorageManager()
+
+    # The game has to be registered before the player
+    # so that it's initialized by the time the first move is made
+    if args.asyncio:
+        event_manager = AsyncEventManager()
+        spinner = AsyncClockController(event_manager, fps=None)
+    else:
+        event_manager = EventManager()
+        spinner = SpinnerController(event_manager)
+
+    # The event manager only keeps weak references to its listeners
+    game = GameController(params, storage, event_manager, seed=args.seed)
+    if args.player == 'ai':
+        player = ExpectimaxController(params, event_manager, games=args.games)
+    else:
+        player = RandomPlayerController(event_manager, games=args.games, seed=args.seed)
+
+    start = perf_counter()
+    if args.asyncio:
+        asyncio.run(spinner.run())
+    else:
+        spinner.run()
+    elapsed = perf_counter() - start
+
+    scores = player.results
+    print(f"games: {len(scores)}, moves: {player.moves}, "
+          f"moves/sec: {player.moves / elapsed:.0f}, elapsed: {elapsed:.2f}s")
+    if scores:
+        print(f"score: mean {sum(scores) / len(scores):.1f}, best {max(scores)}, best ever {game.best}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
+    sys.exit()
@@ -1,15 +1,20 @@
 import sys
 import yaml
+import asyncio
 import pygame
 
 from argparse import Namespace
 
+from controller.ai import ExpectimaxController
+from controller.aio import AsyncClockController
 from controller.keyboard import KeyboardController
 from controller.cpu import CPUClockController
 from controller.game import GameController
 
-from common.mediator import EventManager
+from common.events import CPUTickEvent, GameOverEvent, GameReadyEvent, GridUpdateEvent, ScoreUpdateEvent
+from common.mediator import AsyncEventManager, EventCoalescer, EventManager
 from storage.local import LocalStorageManager
+from view.animation import DEFAULT_DURATION
 from view.ui import UserInterface
 
 
@@ -21,21 +26,35 @@ if __name__ == "__main__":
         params = yaml.safe_load(config)
 
     params = Namespace(**params)
-    storage = LocalStorageManager(path='./.games', hide_files=False)
-    ui = UserInterface(width=640, height=960)
+    storage = LocalStorageManager(path='./.games', hide_files=False, background=True)
+    ui = UserInterface(width=640, height=960,
+                       animation_duration=getattr(params, 'animation_duration', DEFAULT_DURATION))
 
     # Event broker that serves MVC entities
-    event_manager = EventManager()
+    use_asyncio = getattr(params, 'event_loop', 'sync') == 'async'
+    event_manager = AsyncEventManager() if use_asyncio else EventManager()
 
     # Main controllers
     keyboard = KeyboardController(event_manager)
-    spinner = CPUClockController(event_manager)
+    spinner = AsyncClockController(event_manager) if use_asyncio else CPUClockController(event_manager)
     game = GameController(params, storage, event_manager)
 
+    # Let the AI make moves instead of the user if asked to
+    if getattr(params, 'player', 'keyboard') == 'ai':
+        ai = ExpectimaxController(params, event_manager, games=None)
+
     # User interface needs to be attached explicitly
-    # since it doesn't post any events and only listens to them
-    event_manager.register(ui)
+    # since it doesn't post any events and only listens to them.
+    # Grid and score updates are drawn at most once per frame,
+    # everything posted before a frame is over is drawn first
+    renderer = EventCoalescer(ui, coalesce=(GridUpdateEvent, ScoreUpdateEvent),
+                              flush_on=(CPUTickEvent, GameReadyEvent, GameOverEvent))
+    event_manager.register(renderer)
+
+    if use_asyncio:
+        asyncio.run(spinner.run())
+    else:
+        spinner.run()
 
-    spinner.run()
     pygame.quit()
     sys.exit()
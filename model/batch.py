@@ -0,0 +1,214 @@
+import numpy as np
+
+from argparse import Namespace
+from typing import Optional, Sequence, Tuple, Union
+
+from model.grid import Direction, CompactGrid
+
+
+# Direction codes used by :class:`BatchLogic`, e.g. ``DIRECTIONS.index(Direction.UP)``
+DIRECTIONS = tuple(Direction)
+_CODES = {direction: code for code, direction in enumerate(DIRECTIONS)}
+
+
+def direction_codes(directions: Union[np.ndarray, Sequence[Direction]]) -> np.ndarray:
+    """Converts a sequence of ``Direction`` members into an array of direction codes."""
+
+    if isinstance(directions, np.ndarray):
+        return directions.astype(np.int8, copy=False)
+
+    return np.fromiter((_CODES[direction] for direction in directions), dtype=np.int8, count=len(directions))
+
+
+def _compact(lines: np.ndarray) -> np.ndarray:
+    """Moves non-empty cells of every line to its head keeping their order."""
+
+    order = np.argsort(lines == 0, axis=1, kind='stable')
+    return np.take_along_axis(lines, order, axis=1)
+
+
+def slide_lines(lines: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Slides every line of exponents towards its head and merges equal neighbours.
+
+    Follows the rules of ``Logic.move``: each tile merges at most once per move
+    and the merge priority is given to the tiles closest to the head of the line.
+
+    :param lines: uint8 array of shape (M, L), 0 stands for an empty cell
+    :return: tuple (moved lines, int64 array of merged tiles' values per line)
+    """
+
+    lines = _compact(lines)
+    score = np.zeros(len(lines), dtype=np.int64)
+
+    for i in range(lines.shape[1] - 1):
+        head = lines[:, i]
+        merge = (head != 0) & (head == lines[:, i + 1])
+
+        if merge.any():
+            head[merge] += 1
+            lines[merge, i + 1] = 0
+            score[merge] += np.left_shift(1, head[merge].astype(np.int64))
+
+    return _compact(lines), score
+
+
+def _oriented(boards: np.ndarray, code: int) -> np.ndarray:
+    """Returns a view of the boards where the given direction points to the head of each row."""
+
+    direction = DIRECTIONS[code]
+
+    if direction.value.y:
+        boards = boards.transpose(0, 2, 1)
+
+    if direction.value.x + direction.value.y > 0:
+        boards = boards[:, :, ::-1]
+
+    return boards
+
+
+def move_boards(boards: np.ndarray, codes: np.ndarray) -> np.ndarray:
+    """Applies moves to a stack of boards in-place without spawning new tiles.
+
+    :param boards: uint8 array of shape (N, H, W) holding cells' exponents
+    :param codes: array of N direction codes, negative codes leave the board as is
+    :return: int64 array of N merged tiles' values
+    """
+
+    score = np.zeros(len(boards), dtype=np.int64)
+
+    for code in range(len(DIRECTIONS)):
+        games = np.flatnonzero(codes == code)
+        if not len(games):
+            continue
+
+        oriented = _oriented(boards[games], code)
+        count, rows, cols = oriented.shape
+
+        moved, merged = slide_lines(oriented.reshape(count * rows, cols))
+
+        # Writing through the same view puts the cells back into the original layout
+        result = np.empty_like(boards[games])
+        _oriented(result, code)[...] = moved.reshape(count, rows, cols)
+
+        boards[games] = result
+        score[games] = merged.reshape(count, rows).sum(axis=1)
+
+    return score
+
+
+def moves_available(boards: np.ndarray) -> np.ndarray:
+    """Checks which boards have an empty cell or a pair of equal neighbours.
+
+    :return: bool array of shape (N,)
+    """
+
+    empty = (boards == 0).any(axis=(1, 2))
+    horizontal = (boards[:, :, 1:] == boards[:, :, :-1]).any(axis=(1, 2))
+    vertical = (boards[:, 1:, :] == boards[:, :-1, :]).any(axis=(1, 2))
+    return empty | horizontal | vertical
+
+
+class BatchLogic:
+    """Steps many games of the same size at once.
+
+    Boards are stored as a single uint8 array of shape (N, H, W) holding
+    cells' exponents, so every move, spawn and game over check is a handful
+    of vectorized NumPy operations regardless of the number of games.
+    """
+
+    def __init__(self, params: Namespace, count: int, seed: Optional[int] = None):
+        self._boards = np.zeros((count, params.height, params.width), dtype=np.uint8)
+        self._merged_total = np.zeros(count, dtype=np.int64)
+        self._finished = np.zeros(count, dtype=bool)
+        self._start_tiles = params.start_tiles
+        self._rng = np.random.default_rng(seed)
+
+    def __len__(self):
+        return len(self._boards)
+
+    @property
+    def boards(self) -> np.ndarray:
+        return self._boards
+
+    @property
+    def merged_total(self) -> np.ndarray:
+        return self._merged_total
+
+    @property
+    def finished(self) -> np.ndarray:
+        return self._finished
+
+    @property
+    def start_tiles(self) -> int:
+        return self._start_tiles
+
+    def grid(self, game: int) -> CompactGrid:
+        """Copies a single board into a ``CompactGrid``, e.g. to show it in the UI."""
+
+        _, height, width = self._boards.shape
+        return CompactGrid.from_exponents(width, height, self._boards[game].tobytes())
+
+    def setup(self, games: Optional[np.ndarray] = None) -> bool:
+        """Clears the given boards (all by default) and inserts ``start_tiles`` tiles in each of them.
+
+        :return: bool False if couldn't insert the number of tiles given,
+                 True otherwise
+        """
+
+        games = self._select(games)
+
+        self._boards[games] = 0
+        self._merged_total[games] = 0
+        self._finished[games] = False
+
+        for _ in range(self._start_tiles):
+            if not self.spawn(games).all():
+                return False
+        return True
+
+    def spawn(self, games: Optional[np.ndarray] = None) -> np.ndarray:
+        """Puts a 2 (or rarely a 4) tile into a random empty cell of every given board.
+
+        :return: bool array telling which of the given boards got a new tile
+        """
+
+        games = self._select(games)
+        cells = self._boards.reshape(len(self._boards), -1)
+
+        empty = cells[games] == 0
+        inserted = empty.any(axis=1)
+
+        # The empty cell with the highest random key is chosen uniformly
+        keys = self._rng.random(empty.shape)
+        keys[~empty] = -1
+        chosen = keys.argmax(axis=1)
+        values = np.where(self._rng.random(len(games)) < 0.1, 2, 1).astype(np.uint8)
+
+        cells[games[inserted], chosen[inserted]] = values[inserted]
+        return inserted
+
+    def move(self, directions: Union[np.ndarray, Sequence[Direction]]) -> Tuple[np.ndarray, np.ndarray]:
+        """Moves every unfinished game in its own direction and spawns a new tile in each.
+
+        :param directions: N ``Direction`` members or direction codes
+        :return: tuple (int64 array of score deltas, bool mask of the games that are over)
+        """
+
+        codes = direction_codes(directions).copy()
+        codes[self._finished] = -1
+
+        score = move_boards(self._boards, codes)
+        self._merged_total += score
+
+        self.spawn(np.flatnonzero(codes >= 0))
+        self._finished |= ~moves_available(self._boards)
+
+        return score, self._finished.copy()
+
+    def random_directions(self) -> np.ndarray:
+        return self._rng.integers(0, len(DIRECTIONS), size=len(self._boards), dtype=np.int8)
+
+    def _select(self, games: Optional[np.ndarray]) -> np.ndarray:
+        if games is None:
+            return np.arange(len(self._boards))
+        return np.asarray(games, dtype=np.intp)
@@ -0,0 +1,480 @@
+
+from argparse import Namespace
+from typing import List, Optional, Tuple
+
+from model.grid import (
+    CompactGrid,
+    Direction,
+    Position,
+    Grid,
+    Tile,
+)
+from model.history import Snapshot, rewind
+from model.journal import Journal
+from model.spawn import SpawnRandom
+from model.logic import LogicState, new_seed
+
+
+SIZE = 4
+CELLS = SIZE * SIZE
+
+ROW_MASK = 0xFFFF
+CELL_MASK = 0xF
+
+# Exponent 15 is the largest one a nibble can hold (tile 32768),
+# so two such tiles are never merged.
+MAX_EXPONENT = CELL_MASK
+
+# Lowest bit of every cell
+_CELL_LOW_BITS = 0x1111111111111111
+
+# Picks the lowest nibble of every column when the board is stored transposed
+_COLUMN_MASK = 0x000F000F000F000F
+
+_LEFT = Direction.LEFT
+_RIGHT = Direction.RIGHT
+_UP = Direction.UP
+_DOWN = Direction.DOWN
+
+
+def slide_line(line: List[int]) -> Tuple[List[int], int]:
+    """Slides exponents of a single line towards its head and merges equal neighbours.
+
+    Every tile merges at most once per move, and the merge priority is given
+    to the tiles closest to the head of the line, same as in ``Logic.move``.
+
+    :param line: list of exponents, 0 stands for an empty cell
+    :return: tuple (exponents after the move, sum of merged tiles' values)
+    """
+
+    tiles = [exponent for exponent in line if exponent]
+    result = list()
+    score = 0
+
+    i = 0
+    while i < len(tiles):
+        exponent = tiles[i]
+        if i + 1 < len(tiles) and tiles[i + 1] == exponent and exponent < MAX_EXPONENT:
+            exponent += 1
+            score += 1 << exponent
+            i += 1
+        result.append(exponent)
+        i += 1
+
+    result.extend([0] * (len(line) - len(result)))
+    return result, score
+
+
+def _pack_row(cells) -> int:
+    return cells[0] | cells[1] << 4 | cells[2] << 8 | cells[3] << 12
+
+
+def _unpack_row(row: int) -> List[int]:
+    return [row & CELL_MASK, row >> 4 & CELL_MASK, row >> 8 & CELL_MASK, row >> 12 & CELL_MASK]
+
+
+def _spread_column(row: int) -> int:
+    return (row & 0xF) | (row >> 4 & 0xF) << 16 | (row >> 8 & 0xF) << 32 | (row >> 12 & 0xF) << 48
+
+
+def transpose(board: int) -> int:
+    """Swaps rows and columns of a packed board."""
+
+    a1 = board & 0xF0F00F0FF0F00F0F
+    a2 = board & 0x0000F0F00000F0F0
+    a3 = board & 0x0F0F00000F0F0000
+    a = a1 | (a2 << 12) | (a3 >> 12)
+    b1 = a & 0xFF00FF0000FF00FF
+    b2 = a & 0x00FF00FF00000000
+    b3 = a & 0x00000000FF00FF00
+    return b1 | (b2 >> 24) | (b3 << 24)
+
+
+def _build_tables():
+    """Precomputes the outcome of every move for each of 65536 possible rows.
+
+    Column tables hold the moved line spread over the four rows (see ``_COLUMN_MASK``),
+    so a transposed board can be moved without transposing it back.
+    Score tables hold the sum of merged tiles' values for either direction of the line.
+    """
+
+    left, right, up, down = [], [], [], []
+    head_score, tail_score, movable = [], [], []
+
+    for row in range(1 << 16):
+        cells = _unpack_row(row)
+
+        moved, score = slide_line(cells)
+        head = _pack_row(moved)
+        head_score.append(score)
+
+        moved, score = slide_line(cells[::-1])
+        tail = _pack_row(moved[::-1])
+        tail_score.append(score)
+
+        left.append(head)
+        right.append(tail)
+        up.append(_spread_column(head))
+        down.append(_spread_column(tail))
+        movable.append(head != row or tail != row)
+
+    return left, right, up, down, head_score, tail_score, movable
+
+
+_ROW_LEFT = _ROW_RIGHT = _COL_UP = _COL_DOWN = None
+_HEAD_SCORE = _TAIL_SCORE = _MOVABLE = None
+
+
+def prepare_tables():
+    """Builds the lookup tables once per process. Call it before any other function of the module."""
+
+    global _ROW_LEFT, _ROW_RIGHT, _COL_UP, _COL_DOWN, _HEAD_SCORE, _TAIL_SCORE, _MOVABLE
+
+    if _ROW_LEFT is None:
+        (_ROW_LEFT, _ROW_RIGHT, _COL_UP, _COL_DOWN,
+         _HEAD_SCORE, _TAIL_SCORE, _MOVABLE) = _build_tables()
+
+
+def move_board(board: int, direction: Direction) -> Tuple[int, int]:
+    """Applies a move to a packed board without spawning new tiles.
+
+    :param board: packed board, 4 bits per cell in row-major order
+    :param direction: the direction to move the tiles to
+    :return: tuple (new board, sum of merged tiles' values)
+    """
+
+    if direction is _LEFT or direction is _UP:
+        score = _HEAD_SCORE
+    else:
+        score = _TAIL_SCORE
+
+    if direction is _LEFT or direction is _RIGHT:
+        table = _ROW_LEFT if direction is _LEFT else _ROW_RIGHT
+        a, b, c, d = board & ROW_MASK, board >> 16 & ROW_MASK, board >> 32 & ROW_MASK, board >> 48
+        moved = table[a] | table[b] << 16 | table[c] << 32 | table[d] << 48
+    else:
+        table = _COL_UP if direction is _UP else _COL_DOWN
+        board = transpose(board)
+        a, b, c, d = board & ROW_MASK, board >> 16 & ROW_MASK, board >> 32 & ROW_MASK, board >> 48
+        moved = table[a] | table[b] << 4 | table[c] << 8 | table[d] << 12
+
+    return moved, score[a] + score[b] + score[c] + score[d]
+
+
+def empty_cells(board: int) -> List[int]:
+    """Returns indices (4 * y + x) of the empty cells of a packed board."""
+
+    return [i for i in range(CELLS) if not board >> (i << 2) & CELL_MASK]
+
+
+def empty_mask(board: int) -> int:
+    """Returns a mask with the lowest bit of every empty cell set."""
+
+    board |= board >> 1
+    return ~(board | board >> 2) & _CELL_LOW_BITS
+
+
+def can_move(board: int) -> bool:
+    """Checks if any move changes a packed board."""
+
+    columns = transpose(board)
+    return (_MOVABLE[board & ROW_MASK] or _MOVABLE[board >> 16 & ROW_MASK] or
+            _MOVABLE[board >> 32 & ROW_MASK] or _MOVABLE[board >> 48] or
+            _MOVABLE[columns & ROW_MASK] or _MOVABLE[columns >> 16 & ROW_MASK] or
+            _MOVABLE[columns >> 32 & ROW_MASK] or _MOVABLE[columns >> 48])
+
+
+def board_from_grid(grid: Grid) -> int:
+    """Packs tiles of a 4x4 ``Grid`` into a single integer.
+
+    :raise ValueError: if the grid isn't 4x4 or holds a tile above ``1 << MAX_EXPONENT``
+    """
+
+    if grid.width != SIZE or grid.height != SIZE:
+        raise ValueError(f"Only {SIZE}x{SIZE} grids can be packed. "
+                         f"Got {grid.width}x{grid.height} instead.")
+
+    # Compact grids hold the exponents already, no need to materialize their tiles
+    if isinstance(grid, CompactGrid):
+        exponents = grid.exponents
+    else:
+        exponents = bytearray(CELLS)
+        for tile in grid.tiles:
+            exponents[tile.y * SIZE + tile.x] = tile.value.bit_length() - 1
+
+    if max(exponents) > MAX_EXPONENT:
+        raise ValueError(f"Only tiles up to {1 << MAX_EXPONENT} can be packed. "
+                         f"Got {1 << max(exponents)} instead.")
+
+    board = 0
+    for index, exponent in enumerate(exponents):
+        board |= exponent << (index << 2)
+    return board
+
+
+class BitboardLogic:
+    """Game logic for 4x4 boards packed into a 64-bit integer.
+
+    Each cell takes 4 bits and holds the exponent of its tile (0 for empty cells),
+    so a move boils down to four lookups in precomputed row tables.
+    Exposes the same API as ``Logic``; the ``grid`` is only built when requested.
+
+    A cell can't hold a tile above 32768, so two of them are never merged
+    and the game may end earlier than the classic one would.
+    """
+
+    # Name of the engine in journals
+    engine = 'bitboard'
+
+    def __init__(self, params: Namespace):
+        if not self.supports(params):
+            raise ValueError(f"{type(self).__name__} supports only {SIZE}x{SIZE} grids. "
+                             f"Got {params.width}x{params.height} instead.")
+        prepare_tables()
+
+        self._board = 0
+        self._start_tiles = params.start_tiles
+        self._merged_total = 0
+        self._params = params
+
+        # The board before the last move and its direction
+        # are only kept to restore tiles metadata for the UI
+        self._last_move = None
+        self._grid = None
+
+        self._seed = None
+        self._rng = SpawnRandom(new_seed())
+        self._journal = None
+
+    @staticmethod
+    def supports(params: Namespace) -> bool:
+        return params.width == SIZE and params.height == SIZE
+
+    @property
+    def board(self) -> int:
+        return self._board
+
+    @property
+    def grid(self) -> Grid:
+        if self._grid is None:
+            self._grid = self._build_grid()
+        return self._grid
+
+    @property
+    def start_tiles(self) -> int:
+        return self._start_tiles
+
+    @property
+    def merged_total(self) -> int:
+        return self._merged_total
+
+    @property
+    def seed(self) -> Optional[int]:
+        """Seed of the current game, None if it was loaded from a state."""
+        return self._seed
+
+    @property
+    def journal(self) -> Optional[Journal]:
+        """Moves made since :meth:`setup`, None if the game was loaded from a state."""
+        return self._journal
+
+    def random_tile(self) -> Optional[Tile]:
+        """Produce a new ``Tile`` with random value and position.
+
+        If there are no empty cells in the grid returns ``None``.
+
+        :return: Tile object or None if no available cells found.
+        """
+
+        cells = empty_cells(self._board)
+        if cells:
+            value = 4 if self._rng.random() < 0.1 else 2
+            index = self._rng.choice(cells)
+            return Tile(Position(index % SIZE, index // SIZE), value)
+
+    def save_state(self) -> LogicState:
+        return LogicState(grid=self.grid, params=self._params, merged_total=self.merged_total)
+
+    def load_state(self, state: LogicState):
+        class InvalidStateException(Exception):
+            pass
+        try:
+            board = board_from_grid(state.grid)
+            self._start_tiles = state.params.start_tiles
+            self._merged_total = state.merged_total
+            self._params = state.params
+        except (AttributeError, ValueError) as e:
+            raise InvalidStateException(f"Logic state is corrupted! {e}")
+
+        self._set_board(board)
+
+        # The moves that led to the state are unknown
+        self._seed = None
+        self._rng.seed(new_seed())
+        self._journal = None
+
+    def snapshot(self, previous: Optional[Snapshot] = None) -> Snapshot:
+        """
+        Takes an immutable snapshot of the game to :meth:`restore` later, e.g. on undo.
+        The whole board is a single integer, so there is nothing to share with ``previous``.
+        """
+
+        journal = self._journal
+
+        return Snapshot(board=self._board, free=None, merged_total=self._merged_total,
+                        moves=self._rng.turn,
+                        direction=journal.last if journal is not None else None,
+                        size=8)
+
+    def restore(self, snapshot: Snapshot):
+        """Returns the game to the state of a snapshot taken by :meth:`snapshot`."""
+
+        self._set_board(snapshot.board)
+        self._merged_total = snapshot.merged_total
+        self._rng.start(snapshot.moves)
+        rewind(self._journal, snapshot)
+
+    def setup(self, seed: Optional[int] = None) -> bool:
+        """Clears the board and inserts ``start_tiles`` number of tiles.
+
+        :param seed: seed of the game's random number generator, a new one by default
+        :return: bool False if couldn't insert the number of tiles given,
+                 True otherwise
+        """
+        self._seed = new_seed() if seed is None else seed
+        self._rng.seed(self._seed)
+        self._journal = Journal(self._seed, SIZE, SIZE, self._start_tiles, self.engine)
+
+        self._merged_total = 0
+        self._set_board(0)
+        for _ in range(self._start_tiles):
+            if not self.insert_random_tile():
+                return False
+        return True
+
+    def insert_random_tile(self) -> bool:
+        """Puts a 2 (or rarely a 4) tile into a random empty cell.
+
+        :return: bool True if inserted, False if the board is full
+        """
+
+        empty = empty_mask(self._board)
+        if not empty:
+            return False
+
+        # Drop a random number of the lowest empty cells and take the next one
+        draw = self._rng.random
+        for _ in range(int(draw() * bin(empty).count("1"))):
+            empty &= empty - 1
+
+        exponent = 2 if draw() < 0.1 else 1
+        self._board |= exponent << (empty & -empty).bit_length() - 1
+        self._grid = None
+        return True
+
+    def close(self):
+        pass
+
+    def moves_available(self) -> bool:
+        return can_move(self._board)
+
+    def move(self, direction: Direction):
+        """Moves all the tiles in the given direction and merges them if needed.
+
+        :param direction: direction to move the tiles to
+        :return: None
+        """
+
+        if self._journal is not None:
+            self._journal.append(direction)
+
+        before = self._board
+        self._board, merged = move_board(before, direction)
+        self._merged_total += merged
+        self._last_move = (before, direction)
+        self._grid = None
+
+        # Tiles spawned after a move only depend on the seed and the move's number
+        self._rng.start(self._rng.turn + 1)
+        self.insert_random_tile()
+
+    def _set_board(self, board: int):
+        self._board = board
+        self._last_move = None
+        self._grid = None
+
+    def _build_grid(self) -> Grid:
+        """Materializes the board as a ``CompactGrid``.
+
+        If the board is the result of a move, the tiles that took part in it
+        are materialized right away with their ``previous_position`` and ``merged_from``
+        attributes restored by replaying that move line by line.
+        """
+
+        board = self._board
+        exponents = bytes(board >> (index << 2) & CELL_MASK for index in range(CELLS))
+        grid = CompactGrid.from_exponents(SIZE, SIZE, exponents)
+
+        if not self._last_move:
+            return grid
+
+        traced = self._trace_move(*self._last_move)
+        for index, sources in traced.items():
+            position = Position(index % SIZE, index // SIZE)
+
+            if len(sources) == 1:
+                tile = self._moved_tile(sources[0], position)
+            else:
+                tile = Tile(position, 1 << exponents[index])
+                tile.merged_from = [self._moved_tile(source, position) for source in sources]
+
+            grid.insert_tile(tile)
+
+        # The only tile that didn't take part in the move is the spawned one
+        for index in range(CELLS):
+            if exponents[index] and index not in traced:
+                grid.insert_tile(Tile(Position(index % SIZE, index // SIZE), 1 << exponents[index]))
+
+        return grid
+
+    @staticmethod
+    def _moved_tile(source, position: Position) -> Tile:
+        value, origin = source
+        tile = Tile(origin, value)
+        tile.save_position()
+        tile.position = position
+        return tile
+
+    @staticmethod
+    def _trace_move(board: int, direction: Direction) -> dict:
+        """Maps each destination cell of a move to the (value, position) pairs that landed there."""
+
+        traced = dict()
+        dx, dy = direction.value.x, direction.value.y
+
+        for line in range(SIZE):
+            # Walk the line starting from the cell the tiles move towards
+            steps = range(SIZE - 1, -1, -1) if dx + dy > 0 else range(SIZE)
+            cells = [(line, step) if dx == 0 else (step, line) for step in steps]
+
+            tiles = list()
+            for x, y in cells:
+                exponent = board >> ((y * SIZE + x) << 2) & CELL_MASK
+                if exponent:
+                    tiles.append((1 << exponent, Position(x, y)))
+
+            slot = 0
+            i = 0
+            while i < len(tiles):
+                x, y = cells[slot]
+                value = tiles[i][0]
+                if i + 1 < len(tiles) and tiles[i + 1][0] == value and value < 1 << MAX_EXPONENT:
+                    traced[y * SIZE + x] = (tiles[i], tiles[i + 1])
+                    i += 2
+                else:
+                    traced[y * SIZE + x] = (tiles[i],)
+                    i += 1
+                slot += 1
+
+        return traced
+
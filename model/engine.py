@@ -0,0 +1,45 @@
+from argparse import Namespace
+
+from common.errors import MisconfigurationError
+from model.bitboard import BitboardLogic
+from model.logic import Logic
+
+
+def _parallel_logic(params: Namespace):
+    # NumPy is only needed by this engine, so it's imported on demand
+    from model.parallel import ParallelLogic
+    return ParallelLogic(params)
+
+
+ENGINES = {
+    'classic': Logic,
+    'bitboard': BitboardLogic,
+    'parallel': _parallel_logic,
+}
+
+
+def create_logic(params: Namespace):
+    """Builds the game logic engine chosen by the ``engine`` config option.
+
+    ``auto`` (the default) picks the classic engine. The bitboard one is much faster on 4x4 grids,
+    but it never merges two 32768 tiles, so it plays a slightly different game
+    and has to be chosen explicitly.
+
+    :return: Logic-like object
+    """
+
+    engine = getattr(params, 'engine', 'auto')
+
+    if engine == 'auto':
+        engine = 'classic'
+
+    if engine not in ENGINES:
+        raise MisconfigurationError(f"Unknown logic engine `{engine}`. "
+                                    f"Choose one of: auto, {', '.join(ENGINES)}.")
+
+    try:
+        return ENGINES[engine](params)
+    except ImportError as e:
+        raise MisconfigurationError(f"Logic engine `{engine}` requires NumPy: {e}")
+    except ValueError as e:
+        raise MisconfigurationError(str(e))
@@ -1,7 +1,7 @@
 import random
 
 from enum import Enum
-from typing import List, Optional, Iterable
+from typing import List, Optional, Iterable, Tuple
 
 
 class Position:
@@ -94,11 +94,30 @@ class Grid:
         self._height = height
         self._cells = None
 
+        # Counters kept up to date on every change of a cell
+        self._filled = 0
+        self._pairs = 0
+
+        # Occupancy index: cell indices (y * width + x) of empty cells in no particular order,
+        # each cell's slot in that list (-1 if filled) and an ordered set of filled cells.
+        # It's built on first use, grids that are only read cell by cell never need it
+        self._free = None
+        self._slots = None
+        self._occupied = None
+        self._tiles = None
+
         self.empty()
 
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+
+        # Grids pickled before the counters and the index were introduced
+        if '_free' not in state:
+            self._reindex()
+
     def __str__(self):
         s = ''
-        for row in self._cells:
+        for row in self.cells:
             for tile in row:
                 s += '[{}]'.format(tile.value if tile else ' ')
             s += '\n'
@@ -116,6 +135,21 @@ class Grid:
     def height(self) -> int:
         return self._height
 
+    @property
+    def tiles_count(self) -> int:
+        """Number of filled cells."""
+        return self._filled
+
+    @property
+    def available_cells(self) -> int:
+        """Number of empty cells."""
+        return self._width * self._height - self._filled
+
+    @property
+    def mergeable_pairs(self) -> int:
+        """Number of horizontally or vertically adjacent tiles with equal values."""
+        return self._pairs
+
     def empty(self) -> None:
         """
         Builds the grid and fills it with empty cells.
@@ -125,6 +159,7 @@ class Grid:
 
         self._cells = [[None for _ in range(self._width)]
                        for _ in range(self._height)]
+        self._reset_index()
 
     def insert_tile(self, tile: Tile) -> bool:
         """
@@ -136,6 +171,7 @@ class Grid:
         if not self.is_within(tile.position) or not tile:
             return False
 
+        self._track(tile.x, tile.y, self._key(tile.x, tile.y), tile.value)
         self._cells[tile.y][tile.x] = tile
         return True
 
@@ -150,6 +186,7 @@ class Grid:
         if not self.is_within(tile.position) or self.is_cell_empty(tile.position):
             return False
 
+        self._track(tile.x, tile.y, self._key(tile.x, tile.y), 0)
         self._cells[tile.y][tile.x] = None
         return True
 
@@ -157,18 +194,16 @@ class Grid:
     def tiles(self) -> List[Tile]:
         """
         Returns list of ``Tile`` objects found in the grid.
+        The list is cached until the grid changes, so it must not be modified.
 
         :return: list of tiles
         """
 
-        tiles = list()
+        if self._tiles is None:
+            self._ensure_index()
+            self._tiles = [self._tile_at(index) for index in self._occupied]
 
-        for y, row in enumerate(self._cells):
-            for x, tile in enumerate(row):
-                if tile:
-                    tiles.append(tile)
-
-        return tiles
+        return self._tiles
 
     def get_cell(self, position: Position) -> Optional[Tile]:
         if self.is_within(position):
@@ -185,22 +220,307 @@ class Grid:
                 0 <= position.x < self._width)
 
     def has_available_cells(self) -> bool:
-        return self.get_empty_cell() is not None
+        return self._filled < self._width * self._height
+
+    @property
+    def free_order(self) -> Tuple[int, ...]:
+        """Indices (y * width + x) of the empty cells in the order :meth:`get_empty_cell` chooses from."""
+        self._ensure_index()
+        return tuple(self._free)
+
+    def row_exponents(self, y: int) -> bytes:
+        """Exponents of the tiles' values in row ``y``, 0 for empty cells."""
+        return bytes(tile.value.bit_length() - 1 if tile else 0 for tile in self._cells[y])
+
+    def restore(self, rows: Iterable[bytes], free_order: Iterable[int]) -> None:
+        """
+        Refills the grid with new tiles from rows of exponents.
+        The tiles are placed as if they haven't moved, so they aren't animated as spawned.
 
-    def get_empty_cell(self) -> Optional[Position]:
+        :param rows: exponents of every row, as returned by :meth:`row_exponents`
+        :param free_order: order of the empty cells, as returned by :attr:`free_order`
+        """
+
+        self.empty()
+        for y, row in enumerate(rows):
+            for x, exponent in enumerate(row):
+                if exponent:
+                    tile = Tile(Position(x, y), 1 << exponent)
+                    # The tile has been in place before the state was restored
+                    tile.save_position()
+                    self.insert_tile(tile)
+
+        self._set_free_order(free_order)
+
+    def get_empty_cell(self, rng: random.Random = None) -> Optional[Position]:
         """
         Get next empty cell in the grid.
 
-        :return: tuple (x, y) of a randomly chosen empty cell
+        :param rng: random number generator to choose with (anything with ``choice``), the global one by default
+        :return: Position of a randomly chosen empty cell
                  None if there are no empty cells
         """
 
-        empty_tiles = list()
+        self._ensure_index()
+        if self._free:
+            index = (rng or random).choice(self._free)
+            return Position(index % self._width, index // self._width)
+
+    def _key(self, x: int, y: int) -> int:
+        """Value that equal tiles share, 0 for an empty cell."""
+
+        tile = self._cells[y][x]
+        return tile.value if tile else 0
+
+    def _tile_at(self, index: int) -> Tile:
+        return self._cells[index // self._width][index % self._width]
+
+    def _track(self, x: int, y: int, old: int, new: int) -> None:
+        """Updates the counters and the index when the key of cell (x, y) changes from ``old`` to ``new``."""
+
+        # Even if the key stays the same the tile object might not
+        self._tiles = None
+
+        if old == new:
+            return
+
+        if self._free is None and not (old and new):
+            self._build_index()
+
+        if not old:
+            self._occupy(y * self._width + x)
+        elif not new:
+            self._release(y * self._width + x)
+
+        for nx, ny in ((x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1)):
+            if 0 <= nx < self._width and 0 <= ny < self._height:
+                key = self._key(nx, ny)
+                if key:
+                    self._pairs += (key == new) - (key == old)
+
+    def _occupy(self, index: int) -> None:
+        # Swap the cell with the last free one and drop it
+        slot = self._slots[index]
+        last = self._free.pop()
+        if last != index:
+            self._free[slot] = last
+            self._slots[last] = slot
+
+        self._slots[index] = -1
+        self._occupied[index] = None
+        self._filled += 1
+
+    def _release(self, index: int) -> None:
+        self._slots[index] = len(self._free)
+        self._free.append(index)
+        del self._occupied[index]
+        self._filled -= 1
+
+    def _set_free_order(self, free_order: Iterable[int]) -> None:
+        self._ensure_index()
+        free = list(free_order)
+        size = self._width * self._height
+        if (len(free) != len(self._free) or len(set(free)) != len(free) or
+                any(not 0 <= index < size or self._slots[index] < 0 for index in free)):
+            raise ValueError("Order of the empty cells doesn't match the grid.")
+
+        self._free = free
+        for slot, index in enumerate(free):
+            self._slots[index] = slot
+
+    def _reset_index(self) -> None:
+        """Resets the counters for an empty grid and drops the index."""
+
+        self._filled = 0
+        self._pairs = 0
+        self._free = None
+        self._slots = None
+        self._occupied = None
+        self._tiles = None
+
+    def _ensure_index(self) -> None:
+        if self._free is None:
+            self._build_index()
+
+    def _build_index(self) -> None:
+        """Builds the occupancy index from the cells, the empty ones are listed in row-major order."""
+
+        width = self._width
+        self._set_index([index for index in range(width * self._height)
+                         if not self._key(index % width, index // width)])
+
+    def _set_index(self, free: List[int]) -> None:
+        slots = [-1] * (self._width * self._height)
+        for slot, index in enumerate(free):
+            slots[index] = slot
+
+        self._free = free
+        self._slots = slots
+        self._occupied = dict.fromkeys(index for index, slot in enumerate(slots) if slot < 0)
+
+    def _reindex(self) -> None:
+        """Recounts the counters from scratch, the index is built again on first use."""
+
+        self._reset_index()
+        filled = 0
+        pairs = 0
+
+        for y in range(self._height):
+            for x in range(self._width):
+                key = self._key(x, y)
+                if not key:
+                    continue
+
+                filled += 1
+                if x + 1 < self._width and self._key(x + 1, y) == key:
+                    pairs += 1
+                if y + 1 < self._height and self._key(x, y + 1) == key:
+                    pairs += 1
+
+        self._filled = filled
+        self._pairs = pairs
+
+
+class CompactGrid(Grid):
+    """``Grid`` that keeps tiles' exponents in a flat ``bytearray``.
+
+    Cell ``(x, y)`` is stored at index ``y * width + x`` as the exponent of its tile value
+    (``0`` for an empty cell). ``Tile`` objects are only materialized when requested
+    and are kept as views until the cell is overwritten. A view made on request
+    stands still, only the tiles inserted with :meth:`insert_tile` carry the history of a move.
+    """
+
+    def __init__(self, width, height):
+        self._exponents = None
+        self._views = None
 
-        for y, row in enumerate(self._cells):
-            for x, tile in enumerate(row):
-                if not tile:
-                    empty_tiles.append(Position(x, y))
+        super().__init__(width, height)
 
-        if empty_tiles:
-            return random.choice(empty_tiles)
+    @classmethod
+    def from_exponents(cls, width: int, height: int, exponents, pairs: Optional[int] = None) -> 'CompactGrid':
+        """
+        Builds a grid from row-major cell exponents without creating any ``Tile`` objects.
+
+        :param pairs: number of pairs of equal neighbours if the caller has counted them already,
+                      e.g. with NumPy, which is much faster than counting them here on huge boards
+        :return: CompactGrid object
+        """
+
+        if len(exponents) != width * height:
+            raise ValueError(f"Expected {width * height} cell exponents. Got {len(exponents)} instead.")
+
+        grid = cls(width, height)
+        grid._exponents[:] = exponents
+
+        if pairs is None:
+            grid._reindex()
+        else:
+            grid._filled = len(exponents) - grid._exponents.count(0)
+            grid._pairs = pairs
+        return grid
+
+    @property
+    def exponents(self) -> bytearray:
+        """
+        Raw cell storage. Can be wrapped without copying, e.g. by ``numpy.frombuffer``.
+        Writing to it directly bypasses the tile views and counters,
+        use :meth:`set_exponent` instead.
+        """
+
+        return self._exponents
+
+    @property
+    def cells(self) -> List[List]:
+        return [[self.get_cell(Position(x, y)) for x in range(self._width)]
+                for y in range(self._height)]
+
+    def empty(self) -> None:
+        self._exponents = bytearray(self._width * self._height)
+        self._views = dict()
+        self._reset_index()
+
+    def row_exponents(self, y: int) -> bytes:
+        return bytes(self._exponents[y * self._width:(y + 1) * self._width])
+
+    def restore(self, rows: Iterable[bytes], free_order: Iterable[int]) -> None:
+        self._exponents[:] = b''.join(rows)
+        self._views = dict()
+        self._reindex()
+        self._set_free_order(free_order)
+
+    def forget_tiles(self) -> None:
+        """Drops the materialized tiles, e.g. the ones that took part in the previous move."""
+
+        self._views = dict()
+        self._tiles = None
+
+    def get_exponent(self, x: int, y: int) -> int:
+        return self._exponents[y * self._width + x]
+
+    def set_exponent(self, x: int, y: int, exponent: int) -> None:
+        index = y * self._width + x
+        self._track(x, y, self._exponents[index], exponent)
+        self._exponents[index] = exponent
+        self._views.pop(index, None)
+
+    def insert_tile(self, tile: Tile) -> bool:
+        if not tile or not self.is_within(tile.position):
+            return False
+
+        index = tile.y * self._width + tile.x
+        exponent = tile.value.bit_length() - 1
+        self._track(tile.x, tile.y, self._exponents[index], exponent)
+        self._exponents[index] = exponent
+        self._views[index] = tile
+        return True
+
+    def remove_tile(self, tile: Tile) -> bool:
+        if not self.is_within(tile.position) or self.is_cell_empty(tile.position):
+            return False
+
+        index = tile.y * self._width + tile.x
+        self._track(tile.x, tile.y, self._exponents[index], 0)
+        self._exponents[index] = 0
+        self._views.pop(index, None)
+        return True
+
+    def get_cell(self, position: Position) -> Optional[Tile]:
+        if self.is_within(position):
+            index = position.y * self._width + position.x
+            exponent = self._exponents[index]
+            if exponent:
+                return self._view(index, exponent)
+
+    def is_cell_empty(self, position: Position) -> bool:
+        return not self._exponents[position.y * self._width + position.x]
+
+    def _key(self, x: int, y: int) -> int:
+        return self._exponents[y * self._width + x]
+
+    def _build_index(self) -> None:
+        self._set_index([index for index, exponent in enumerate(self._exponents) if not exponent])
+
+    def _reindex(self) -> None:
+        self._reset_index()
+
+        exponents = self._exponents
+        width = self._width
+        pairs = sum(1 for left, right in zip(exponents, exponents[1:]) if left == right and left)
+        # Pairs across the ends of the rows aren't neighbours
+        pairs -= sum(1 for end in range(width, len(exponents), width)
+                     if exponents[end - 1] == exponents[end] and exponents[end])
+        pairs += sum(1 for top, bottom in zip(exponents, exponents[width:]) if top == bottom and top)
+
+        self._filled = len(exponents) - exponents.count(0)
+        self._pairs = pairs
+
+    def _tile_at(self, index: int) -> Tile:
+        return self._view(index, self._exponents[index])
+
+    def _view(self, index: int, exponent: int) -> Tile:
+        tile = self._views.get(index)
+        if tile is None:
+            tile = Tile(Position(index % self._width, index // self._width), 1 << exponent)
+            tile.save_position()
+            self._views[index] = tile
+        return tile
@@ -0,0 +1,168 @@
+"""Undo and redo of game moves.
+
+States are kept as immutable snapshots: the board is a tuple of rows of tile exponents
+(``bytes``) or a packed integer, and a snapshot reuses the row objects of the one taken
+before it wherever the rows are equal, so unchanged rows are stored only once.
+Tiles spawned after a move only depend on the game's seed and the move's number
+(see :mod:`model.spawn`), so a snapshot holds no random number generator state
+and a move made again after an undo still spawns the same tile.
+"""
+from collections import deque
+from typing import Optional, Tuple, Union
+
+from model.grid import Direction
+from model.journal import Journal
+
+
+DEFAULT_DEPTH = 100
+
+# Bytes the snapshots of a history may take
+DEFAULT_MEMORY = 1 << 20
+
+# Rough size of a snapshot object and its fields, whatever the board
+_OVERHEAD = 128
+
+
+class Snapshot:
+    """Immutable state of a game.
+
+    :param board: tuple of rows of exponents (``bytes``) or a packed board (``int``)
+    :param free: order of the empty cells the next tile is chosen from, if the engine depends on it
+    :param merged_total: score of the game
+    :param moves: number of moves made since the game was set up or loaded
+    :param direction: the move that led to the state, None for the first one
+    :param size: bytes the snapshot doesn't share with the one taken before it
+    """
+
+    __slots__ = ('board', 'free', 'merged_total', 'moves', 'direction', 'size')
+
+    def __init__(self, board: Union[Tuple[bytes, ...], int], free: Optional[bytes], merged_total: int,
+                 moves: int, direction: Optional[Direction], size: int):
+        self.board = board
+        self.free = free
+        self.merged_total = merged_total
+        self.moves = moves
+        self.direction = direction
+        self.size = size
+
+
+def share_rows(rows: Tuple[bytes, ...], previous: Optional[Snapshot]) -> Tuple[Tuple[bytes, ...], int]:
+    """
+    Replaces rows equal to the ones of the previous snapshot with the previous snapshot's rows.
+
+    :return: tuple (rows, bytes taken by the rows that aren't shared)
+    """
+
+    if previous is None or not isinstance(previous.board, tuple) or len(previous.board) != len(rows):
+        return rows, sum(map(len, rows))
+
+    shared = list()
+    size = 0
+
+    for row, old in zip(rows, previous.board):
+        if row == old:
+            row = old
+        else:
+            size += len(row)
+        shared.append(row)
+
+    return tuple(shared), size
+
+
+def rewind(journal: Optional[Journal], snapshot: Snapshot):
+    """Brings a game's journal to the move of the snapshot, at most one move forward."""
+
+    if journal is None:
+        return
+
+    if len(journal) + 1 == snapshot.moves and snapshot.direction is not None:
+        journal.append(snapshot.direction)
+    else:
+        journal.truncate(snapshot.moves)
+
+
+class History:
+    """Bounded stacks of snapshots to undo and redo moves.
+
+    The oldest snapshots are dropped once there are more than ``depth`` of them
+    or they take more than ``memory`` bytes.
+    """
+
+    def __init__(self, depth: int = DEFAULT_DEPTH, memory: int = DEFAULT_MEMORY):
+        if depth <= 0:
+            raise ValueError(f"History depth must be positive. Got {depth} instead.")
+
+        self._depth = depth
+        self._memory = memory
+        self._undo = deque()
+        self._redo = list()
+        self._size = 0
+
+    @property
+    def last(self) -> Optional[Snapshot]:
+        """The snapshot an undo would restore, new snapshots share rows with it."""
+        return self._undo[-1] if self._undo else None
+
+    @property
+    def size(self) -> int:
+        """Approximate number of bytes the snapshots take."""
+        return self._size
+
+    def can_undo(self) -> bool:
+        return bool(self._undo)
+
+    def can_redo(self) -> bool:
+        return bool(self._redo)
+
+    def push(self, snapshot: Snapshot):
+        """Saves the state before a move. Moves undone before it can't be redone anymore."""
+
+        for undone in self._redo:
+            self._size -= undone.size + _OVERHEAD
+        self._redo.clear()
+
+        self._undo.append(snapshot)
+        self._size += snapshot.size + _OVERHEAD
+        self._evict()
+
+    def undo(self, current: Snapshot) -> Optional[Snapshot]:
+        """
+        :param current: state of the game to return to on redo
+        :return: the state before the last move or None if there is none
+        """
+
+        if not self._undo:
+            return
+
+        self._redo.append(current)
+        self._size += current.size + _OVERHEAD
+        return self._take(self._undo.pop())
+
+    def redo(self, current: Snapshot) -> Optional[Snapshot]:
+        """
+        :param current: state of the game to return to on undo
+        :return: the state after the last undone move or None if there is none
+        """
+
+        if not self._redo:
+            return
+
+        self._undo.append(current)
+        self._size += current.size + _OVERHEAD
+        snapshot = self._take(self._redo.pop())
+        self._evict()
+        return snapshot
+
+    def clear(self):
+        self._undo.clear()
+        self._redo.clear()
+        self._size = 0
+
+    def _take(self, snapshot: Snapshot) -> Snapshot:
+        self._size -= snapshot.size + _OVERHEAD
+        return snapshot
+
+    def _evict(self):
+        # The latest snapshot is kept whatever it takes, so the last move can always be undone
+        while len(self._undo) > 1 and (len(self._undo) > self._depth or self._size > self._memory):
+            self._size -= self._undo.popleft().size + _OVERHEAD
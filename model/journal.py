@@ -0,0 +1,135 @@
+"""Append-only record of a game that is enough to reproduce it.
+
+A journal is a fixed-size little-endian header followed by the moves, four per byte::
+
+    magic       4s  b'2JRN'
+    version     B   format version, see ``VERSION``
+    seed        Q   seed of the game's random number generator
+    width       H   grid width
+    height      H   grid height
+    start_tiles B   number of tiles the game started with
+    engine      B   index of the logic engine in ``ENGINES``
+    count       I   number of moves
+    moves       2-bit direction codes (index in ``DIRECTIONS``), the first move in the lowest bits
+"""
+import struct
+
+from argparse import Namespace
+from typing import Iterator, Optional
+
+from model.grid import Direction
+
+
+MAGIC = b'2JRN'
+# Version 2 spawns tiles from the seed and the move's number (see model/spawn.py)
+VERSION = 2
+
+# Engines spawn tiles differently, so a game is replayed by the engine that played it
+ENGINES = ('classic', 'bitboard', 'parallel')
+
+DIRECTIONS = tuple(Direction)
+_CODES = {direction: code for code, direction in enumerate(DIRECTIONS)}
+
+_HEADER = struct.Struct('<4sBQHHBBI')
+
+
+class JournalError(ValueError):
+    pass
+
+
+class Journal:
+
+    def __init__(self, seed: int, width: int, height: int, start_tiles: int, engine: str):
+        if engine not in ENGINES:
+            raise JournalError(f"Unknown logic engine `{engine}`.")
+
+        self._seed = seed
+        self._width = width
+        self._height = height
+        self._start_tiles = start_tiles
+        self._engine = engine
+
+        self._moves = bytearray()
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self) -> Iterator[Direction]:
+        directions = DIRECTIONS
+        count = self._count
+
+        for index, packed in enumerate(self._moves):
+            for shift in range(0, min(8, (count - index * 4) * 2), 2):
+                yield directions[packed >> shift & 3]
+
+    @property
+    def seed(self) -> int:
+        return self._seed
+
+    @property
+    def last(self) -> Optional[Direction]:
+        """The latest move, None if there are none."""
+
+        if self._count:
+            slot = (self._count - 1) & 3
+            return DIRECTIONS[self._moves[-1] >> (slot << 1) & 3]
+
+    @property
+    def engine(self) -> str:
+        return self._engine
+
+    def params(self) -> Namespace:
+        """Game settings the journal was recorded with, enough to create its logic."""
+
+        return Namespace(width=self._width, height=self._height,
+                         start_tiles=self._start_tiles, engine=self._engine)
+
+    def append(self, direction: Direction):
+        slot = self._count & 3
+        if not slot:
+            self._moves.append(0)
+
+        self._moves[-1] |= _CODES[direction] << (slot << 1)
+        self._count += 1
+
+    def truncate(self, count: int):
+        """Drops the moves after the first ``count`` ones, e.g. the undone ones."""
+
+        if count >= self._count:
+            return
+
+        del self._moves[(count + 3) // 4:]
+        if count & 3:
+            self._moves[-1] &= (1 << ((count & 3) << 1)) - 1
+        self._count = count
+
+    def to_bytes(self) -> bytes:
+        header = _HEADER.pack(MAGIC, VERSION, self._seed, self._width, self._height,
+                              self._start_tiles, ENGINES.index(self._engine), self._count)
+        return header + self._moves
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'Journal':
+        if len(data) < _HEADER.size:
+            raise JournalError(f"Journal is truncated: {len(data)} bytes.")
+
+        magic, version, seed, width, height, start_tiles, engine, count = _HEADER.unpack_from(data)
+
+        if magic != MAGIC:
+            raise JournalError("Not a journal.")
+
+        if version != VERSION:
+            raise JournalError(f"Unsupported journal version: {version}.")
+
+        if engine >= len(ENGINES):
+            raise JournalError(f"Unknown logic engine index: {engine}.")
+
+        moves = data[_HEADER.size:]
+        if len(moves) != (count + 3) // 4:
+            raise JournalError(f"Journal of {count} moves can't take {len(moves)} bytes.")
+
+        journal = cls(seed, width, height, start_tiles, ENGINES[engine])
+        journal._moves = bytearray(moves)
+        journal._count = count
+        return journal
@@ -1,21 +1,19 @@
 import random
 
-from itertools import product
+from array import array
 from argparse import Namespace
-from typing import Optional, Iterator
+from typing import Optional
 
 from model.grid import (
+    CompactGrid,
     Direction,
     Position,
     Grid,
     Tile,
 )
-
-
-def _next_position(position: Position, direction: Direction) -> Position:
-    x = position.x + direction.value.x
-    y = position.y + direction.value.y
-    return Position(x, y)
+from model.history import Snapshot, rewind, share_rows
+from model.journal import Journal
+from model.spawn import SpawnRandom
 
 
 class LogicState:
@@ -26,16 +24,39 @@ class LogicState:
         self.params = params
 
 
+def new_seed() -> int:
+    """Draws a seed for a game from the global ``random``, so seeding it makes the games reproducible."""
+    return random.getrandbits(64)
+
+
 class Logic:
+    """Game logic for grids of any size.
+
+    Every game has its own random number generator seeded in :meth:`setup`,
+    and its moves are recorded in :attr:`journal`, so the game can be replayed.
+    """
+
+    # Name of the engine in journals
+    engine = 'classic'
 
     def __init__(self, params: Namespace):
-        self._grid = Grid(width=params.width, height=params.height)
+        self._grid = CompactGrid(width=params.width, height=params.height)
         self._start_tiles = params.start_tiles
         self._merged_total = 0
         self._params = params
 
+        # Tiles that moved or merged in the last move, only kept to restore their metadata for the UI
+        self._last_move = None
+
+        self._seed = None
+        self._rng = SpawnRandom(new_seed())
+        self._journal = None
+
     @property
     def grid(self) -> Grid:
+        if self._last_move:
+            self._materialize(self._last_move)
+            self._last_move = None
         return self._grid
 
     @property
@@ -46,6 +67,16 @@ class Logic:
     def merged_total(self) -> int:
         return self._merged_total
 
+    @property
+    def seed(self) -> Optional[int]:
+        """Seed of the current game, None if it was loaded from a state."""
+        return self._seed
+
+    @property
+    def journal(self) -> Optional[Journal]:
+        """Moves made since :meth:`setup`, None if the game was loaded from a state."""
+        return self._journal
+
     def random_tile(self) -> Optional[Tile]:
         """Produce a new ``Tile`` with random value and position.
 
@@ -55,8 +86,8 @@ class Logic:
         """
 
         if self._grid.has_available_cells():
-            value = 4 if random.random() < 0.1 else 2
-            return Tile(self._grid.get_empty_cell(), value)
+            value = 4 if self._rng.random() < 0.1 else 2
+            return Tile(self._grid.get_empty_cell(self._rng), value)
 
     def save_state(self) -> LogicState:
         return LogicState(grid=self._grid, params=self._params, merged_total=self.merged_total)
@@ -68,23 +99,79 @@ class Logic:
             self._start_tiles = state.params.start_tiles
             self._merged_total = state.merged_total
             self._params = state.params
-            self._grid = state.grid
-        except AttributeError as e:
+            self._grid = self._compact(state.grid)
+        except (AttributeError, ValueError) as e:
             raise InvalidStateException(f"Logic state is corrupted! {e}")
 
-    def setup(self) -> bool:
+        self._last_move = None
+
+        # The moves that led to the state are unknown
+        self._seed = None
+        self._rng.seed(new_seed())
+        self._journal = None
+
+    @staticmethod
+    def _compact(grid: Grid) -> CompactGrid:
+        """States saved before the logic kept a ``CompactGrid`` hold a plain ``Grid``."""
+
+        if isinstance(grid, CompactGrid):
+            return grid
+
+        cells = b''.join(grid.row_exponents(y) for y in range(grid.height))
+        return CompactGrid.from_exponents(grid.width, grid.height, cells)
+
+    def snapshot(self, previous: Optional[Snapshot] = None) -> Snapshot:
+        """
+        Takes an immutable snapshot of the game to :meth:`restore` later, e.g. on undo.
+        It's O(board) and holds no ``Tile`` objects.
+
+        :param previous: snapshot to share the unchanged rows with
+        :return: Snapshot object
+        """
+
+        grid = self._grid
+        rows, size = share_rows(tuple(grid.row_exponents(y) for y in range(grid.height)), previous)
+
+        # Spawned tiles are chosen by their index in the free cells list, so its order is a part of the state
+        free = array('I', grid.free_order).tobytes()
+        journal = self._journal
+
+        return Snapshot(board=rows, free=free, merged_total=self._merged_total,
+                        moves=self._rng.turn,
+                        direction=journal.last if journal is not None else None,
+                        size=size + len(free))
+
+    def restore(self, snapshot: Snapshot):
+        """Returns the game to the state of a snapshot taken by :meth:`snapshot`."""
+
+        self._grid.restore(snapshot.board, array('I', snapshot.free))
+        self._last_move = None
+        self._merged_total = snapshot.merged_total
+        self._rng.start(snapshot.moves)
+        rewind(self._journal, snapshot)
+
+    def setup(self, seed: Optional[int] = None) -> bool:
         """Clears the grid and inserts ``start_tiles`` number of tiles.
 
+        :param seed: seed of the game's random number generator, a new one by default
         :return: bool False if couldn't insert the number of tiles given,
                  True otherwise
         """
+        self._start(seed)
         self._merged_total = 0
+        self._last_move = None
         self._grid.empty()
         for _ in range(self._start_tiles):
             if not self.insert_random_tile():
                 return False
         return True
 
+    def _start(self, seed: Optional[int]):
+        self._seed = new_seed() if seed is None else seed
+        self._rng.seed(self._seed)
+        self._journal = Journal(self._seed, self._params.width, self._params.height,
+                                self._start_tiles, self.engine)
+
     def insert_random_tile(self):
         # todo: add a docstring
         tile = self.random_tile()
@@ -93,126 +180,126 @@ class Logic:
             return True
         return False
 
-    def moves_available(self):
-        """Pretty expensive check"""
-
-        for direction in Direction:
-            for tile in self._grid.tiles:
+    def close(self):
+        """Nothing to release, unlike ``ParallelLogic`` this engine holds no threads."""
+        pass
 
-                if self._farthest_position(tile, direction) != tile.position:
-                    return True
+    def moves_available(self) -> bool:
+        """Checks if any move changes the grid.
 
-                if self._is_merge_available(tile, direction):
-                    return True
+        Relies on the counters the grid keeps up to date, so it's O(1).
+        """
 
-        return False
+        grid = self._grid
+        return bool(grid.tiles_count) and (grid.has_available_cells() or grid.mergeable_pairs > 0)
 
     def move(self, direction: Direction):
         """Moves all the tiles in the given direction and merges them if needed.
 
+        Every row (or column) is compacted and merged in a single pass over the cells' exponents,
+        so a move takes time linear in the board area. ``Tile`` objects for the tiles
+        that moved or merged are only made once the :attr:`grid` is requested,
+        so replays and simulations don't pay for the UI's animations.
+
         :param direction:
         :return: None
         """
 
-        # Remove tiles metadata from the previous move
-        self._clean_tiles_metadata()
-
-        for position in self._traversals(direction):
-            tile = self._grid.get_cell(position)
-
-            if not tile:
-                continue
-
-            # Move the tile to the farthest empty position before the first obstacle
-            self._move_tile(tile, self._farthest_position(tile, direction))
+        if self._journal is not None:
+            self._journal.append(direction)
 
-            # If the nearest obstacle in that direction is a tile
-            # check for merge and merge if possible
-            if self._is_merge_available(tile, direction):
-                closest = self._next_merge(tile, direction)
-                merged = self._merge_tiles(tile, closest)
-                self._merged_total += merged.value
-
-        self.insert_random_tile()
+        grid = self._grid
+        width = grid.width
+        landings = self._plan_move(bytes(grid.exponents), direction)
 
-    def _next_merge(self, tile: Tile, direction: Direction) -> Optional[Tile]:
-        # TODO: add a docstring
+        # Tiles of the previous move are dropped along with their metadata
+        grid.forget_tiles()
 
-        position = _next_position(tile.position, direction)
+        for slot, origin, other, exponent in landings:
+            if origin != slot:
+                grid.set_exponent(origin % width, origin // width, 0)
+            if other >= 0:
+                grid.set_exponent(other % width, other // width, 0)
 
-        if self._grid.is_within(position) and self._grid.is_cell_filled(position):
-            candidate = self._grid.get_cell(position)
-            if candidate.value == tile.value and not candidate.merged_from:
-                return candidate
+        for slot, origin, other, exponent in landings:
+            if other >= 0:
+                exponent += 1
+                self._merged_total += 1 << exponent
+            grid.set_exponent(slot % width, slot // width, exponent)
 
-    def _is_merge_available(self, tile: Tile, direction: Direction) -> bool:
-        return self._next_merge(tile, direction) is not None
+        self._last_move = landings
 
-    def _farthest_position(self, tile: Tile, direction: Direction) -> Position:
-        """Returns ``Position`` object of the farthest position before the first obstacle.
+        # Tiles spawned after a move only depend on the seed and the move's number
+        self._rng.start(self._rng.turn + 1)
+        self.insert_random_tile()
 
-        :param direction: direction towards the destination position
-        :return: Position object
+    def _plan_move(self, cells: bytes, direction: Direction) -> list:
         """
+        Compacts and merges every line of the grid in one pass over the cells' exponents.
 
-        current = tile.position
-        position = _next_position(current, direction)
-
-        while self._grid.is_within(position) and self._grid.is_cell_empty(position):
-            current = position
-            position = _next_position(current, direction)
+        :param cells: exponents of the cells in row-major order
+        :param direction: the direction to move the tiles to
+        :return: list of tuples (index of the cell a tile lands in, index of the tile,
+                 index of the tile merged into it or -1, exponent of the tiles)
+                 for every tile that moves or merges
+        """
 
-        return current
+        width, height = self._grid.width, self._grid.height
+
+        if direction.value.x:
+            lines, length, line_stride, step = height, width, width, 1
+        else:
+            lines, length, line_stride, step = width, height, 1, width
+
+        # Walk each line starting from the cell the tiles move towards
+        head = 0
+        if direction.value.x + direction.value.y > 0:
+            head = (length - 1) * step
+            step = -step
+
+        landings = list()
+        for line in range(lines):
+            start = line * line_stride + head
+            indices = range(start, start + length * step, step)
+            tiles = [index for index in indices if cells[index]]
+
+            slot = start
+            i = 0
+            while i < len(tiles):
+                origin = tiles[i]
+                exponent = cells[origin]
+                if i + 1 < len(tiles) and cells[tiles[i + 1]] == exponent:
+                    landings.append((slot, origin, tiles[i + 1], exponent))
+                    i += 2
+                else:
+                    if origin != slot:
+                        landings.append((slot, origin, -1, exponent))
+                    i += 1
+                slot += step
+
+        return landings
+
+    def _materialize(self, landings: list):
+        """Puts the tiles that took part in a move into the grid with their ``previous_position`` and ``merged_from``."""
+
+        grid = self._grid
+        width = grid.width
+
+        for slot, origin, other, exponent in landings:
+            position = Position(slot % width, slot // width)
+
+            if other < 0:
+                grid.insert_tile(self._moved_tile(origin, exponent, position))
+                continue
 
-    def _move_tile(self, tile: Tile, position: Position):
-        self._grid.remove_tile(tile)
+            merged = Tile(position, 2 << exponent)
+            merged.merged_from = [self._moved_tile(other, exponent, position),
+                                  self._moved_tile(origin, exponent, position)]
+            grid.insert_tile(merged)
 
+    def _moved_tile(self, origin: int, exponent: int, position: Position) -> Tile:
+        width = self._grid.width
+        tile = Tile(Position(origin % width, origin // width), 1 << exponent)
         tile.save_position()
         tile.position = position
-        self._grid.insert_tile(tile)
-
-    def _clean_tiles_metadata(self):
-        for tile in self._grid.tiles:
-            tile.merged_from = None
-
-    def _merge_tiles(self, a: Tile, b: Tile):
-        """Replaces tiles in the grid with a new ``Tile`` object at `b`'s position.
-
-        The merged tile's value is a sum of `a` and `b` values.
-
-        :param a: first Tile
-        :param b: second Tile
-        :return: new Tile object
-        """
-
-        merged = Tile(b.position, a.value + b.value)
-        merged.merged_from = [a, b]
-
-        self._grid.remove_tile(a)
-        self._grid.insert_tile(merged)
-
-        return merged
-
-    def _traversals(self, direction: Direction) -> Iterator[Position]:
-        """Get positions to travers in the given direction.
-
-        Positions are sorted in the bottommost or rightmost
-        order for vertical or horizontal directions accordingly.
-
-        :param direction: the direction to travers
-        :return: iterator that yields Position objects
-                 representing nodes to travers in the given direction.
-
-        """
-
-        xs = list(range(self._grid.width))
-        ys = list(range(self._grid.height))
-
-        if direction.value.x == 1:
-            xs.reverse()
-
-        if direction.value.y == 1:
-            ys.reverse()
-
-        for x, y in product(xs, ys):
-            yield Position(x, y)
+        return tile
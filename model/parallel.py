@@ -0,0 +1,303 @@
+"""Game logic for very large boards that moves bands of lines on a thread pool.
+
+Rows (for horizontal moves) or columns (for vertical ones) don't depend on each other,
+so the board is split into bands of lines and every band is compacted and merged
+by NumPy kernels on its own thread. The kernels release the GIL, so a move
+scales with the number of cores. A new tile is spawned once all the bands are done.
+"""
+import os
+
+import numpy as np
+
+from argparse import Namespace
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from model.grid import CompactGrid, Direction, Grid, Position, Tile
+from model.history import Snapshot, rewind, share_rows
+from model.journal import Journal
+from model.spawn import SpawnRandom
+from model.logic import LogicState, new_seed
+
+
+# Smaller bands cost more in thread handoffs than they save
+MIN_BAND_CELLS = 1 << 16
+
+
+def _compact(lines: np.ndarray) -> np.ndarray:
+    """Moves non-empty cells of every line to its head keeping their order."""
+
+    order = np.argsort(lines == 0, axis=1, kind='stable')
+    return np.take_along_axis(lines, order, axis=1)
+
+
+def merge_lines(lines: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Slides every line of exponents towards its head and merges equal neighbours.
+
+    Unlike ``batch.slide_lines`` it doesn't loop over the cells of a line:
+    in a run of equal tiles every tile at an odd offset from the run's start
+    merges into the one before it, which is what merging from the head one pair at a time gives.
+
+    :param lines: uint8 array of shape (M, L), 0 stands for an empty cell
+    :return: tuple (moved lines, counts of the merged tiles per exponent)
+    """
+
+    lines = _compact(lines)
+    length = lines.shape[1]
+
+    # Cells that hold the same tile as the cell before them
+    repeated = np.zeros(lines.shape, dtype=bool)
+    np.equal(lines[:, 1:], lines[:, :-1], out=repeated[:, 1:])
+    repeated[:, 1:] &= lines[:, 1:] != 0
+
+    # Offset of every cell from the start of its run of equal tiles
+    columns = np.arange(length, dtype=np.int32)
+    starts = np.where(repeated, 0, columns)
+    np.maximum.accumulate(starts, axis=1, out=starts)
+    absorbed = repeated & ((columns - starts) & 1).astype(bool)
+
+    if not absorbed.any():
+        return lines, np.zeros(0, dtype=np.int64)
+
+    heads = lines[:, :-1]
+    merged = absorbed[:, 1:]
+    heads[merged] += 1
+    lines[absorbed] = 0
+
+    return _compact(lines), np.bincount(heads[merged])
+
+
+def _pairs(board: np.ndarray) -> int:
+    """Counts the pairs of equal neighbouring tiles."""
+
+    horizontal = (board[:, 1:] == board[:, :-1]) & (board[:, 1:] != 0)
+    vertical = (board[1:, :] == board[:-1, :]) & (board[1:, :] != 0)
+    return int(np.count_nonzero(horizontal) + np.count_nonzero(vertical))
+
+
+def oriented(board: np.ndarray, direction: Direction) -> np.ndarray:
+    """Returns a view of the board where the given direction points to the head of each row."""
+
+    if direction.value.y:
+        board = board.T
+
+    if direction.value.x + direction.value.y > 0:
+        board = board[:, ::-1]
+
+    return board
+
+
+class ParallelLogic:
+    """Game logic for huge boards kept as a NumPy array of cells' exponents.
+
+    Exposes the same API as ``Logic``. The ``grid`` is only built when requested
+    and its tiles don't remember the last move, so it isn't meant to be animated.
+
+    :param params: game settings, ``engine_threads`` is the number of threads (one per core if 0 or missing)
+    """
+
+    # Name of the engine in journals
+    engine = 'parallel'
+
+    def __init__(self, params: Namespace):
+        self._board = np.zeros((params.height, params.width), dtype=np.uint8)
+        self._start_tiles = params.start_tiles
+        self._merged_total = 0
+        self._params = params
+        self._grid = None
+
+        self._workers = getattr(params, 'engine_threads', 0) or os.cpu_count() or 1
+        self._executor = None
+
+        self._seed = None
+        self._rng = SpawnRandom(new_seed())
+        self._journal = None
+
+    @property
+    def board(self) -> np.ndarray:
+        return self._board
+
+    @property
+    def grid(self) -> Grid:
+        """The board as a ``CompactGrid``, made once per move.
+
+        Its counters come from NumPy and its index of empty cells is only built if someone asks for it,
+        so the grid costs a copy of the board unless its tiles are drawn.
+        """
+
+        if self._grid is None:
+            board = self._board
+            height, width = board.shape
+            self._grid = CompactGrid.from_exponents(width, height, board.tobytes(), pairs=_pairs(board))
+        return self._grid
+
+    @property
+    def start_tiles(self) -> int:
+        return self._start_tiles
+
+    @property
+    def merged_total(self) -> int:
+        return self._merged_total
+
+    @property
+    def seed(self) -> Optional[int]:
+        """Seed of the current game, None if it was loaded from a state."""
+        return self._seed
+
+    @property
+    def journal(self) -> Optional[Journal]:
+        """Moves made since :meth:`setup`, None if the game was loaded from a state."""
+        return self._journal
+
+    def random_tile(self) -> Optional[Tile]:
+        """Produce a new ``Tile`` with random value and position.
+
+        If there are no empty cells in the grid returns ``None``.
+
+        :return: Tile object or None if no available cells found.
+        """
+
+        empty = np.flatnonzero(self._board == 0)
+        if len(empty):
+            width = self._board.shape[1]
+            index = int(empty[self._rng.randrange(len(empty))])
+            value = 4 if self._rng.random() < 0.1 else 2
+            return Tile(Position(index % width, index // width), value)
+
+    def save_state(self) -> LogicState:
+        return LogicState(grid=self.grid, params=self._params, merged_total=self.merged_total)
+
+    def load_state(self, state: LogicState):
+        class InvalidStateException(Exception):
+            pass
+        try:
+            grid = state.grid
+            cells = b''.join(grid.row_exponents(y) for y in range(grid.height))
+            board = np.frombuffer(cells, dtype=np.uint8).reshape(grid.height, grid.width).copy()
+            self._start_tiles = state.params.start_tiles
+            self._merged_total = state.merged_total
+            self._params = state.params
+        except (AttributeError, ValueError) as e:
+            raise InvalidStateException(f"Logic state is corrupted! {e}")
+
+        self._set_board(board)
+
+        # The moves that led to the state are unknown
+        self._seed = None
+        self._rng.seed(new_seed())
+        self._journal = None
+
+    def snapshot(self, previous: Optional[Snapshot] = None) -> Snapshot:
+        """
+        Takes an immutable snapshot of the game to :meth:`restore` later, e.g. on undo.
+
+        :param previous: snapshot to share the unchanged rows with
+        :return: Snapshot object
+        """
+
+        rows, size = share_rows(tuple(row.tobytes() for row in self._board), previous)
+        journal = self._journal
+
+        return Snapshot(board=rows, free=None, merged_total=self._merged_total,
+                        moves=self._rng.turn,
+                        direction=journal.last if journal is not None else None,
+                        size=size)
+
+    def restore(self, snapshot: Snapshot):
+        """Returns the game to the state of a snapshot taken by :meth:`snapshot`."""
+
+        board = np.frombuffer(b''.join(snapshot.board), dtype=np.uint8)
+        self._set_board(board.reshape(self._board.shape).copy())
+        self._merged_total = snapshot.merged_total
+        self._rng.start(snapshot.moves)
+        rewind(self._journal, snapshot)
+
+    def setup(self, seed: Optional[int] = None) -> bool:
+        """Clears the board and inserts ``start_tiles`` number of tiles.
+
+        :param seed: seed of the game's random number generator, a new one by default
+        :return: bool False if couldn't insert the number of tiles given,
+                 True otherwise
+        """
+        self._seed = new_seed() if seed is None else seed
+        self._rng.seed(self._seed)
+        height, width = self._board.shape
+        self._journal = Journal(self._seed, width, height, self._start_tiles, self.engine)
+
+        self._merged_total = 0
+        self._set_board(np.zeros_like(self._board))
+        for _ in range(self._start_tiles):
+            if not self.insert_random_tile():
+                return False
+        return True
+
+    def insert_random_tile(self) -> bool:
+        tile = self.random_tile()
+        if tile:
+            self._board[tile.y, tile.x] = tile.value.bit_length() - 1
+            self._grid = None
+            return True
+        return False
+
+    def moves_available(self) -> bool:
+        board = self._board
+        return bool(board.any() and ((board == 0).any() or
+                                     (board[:, 1:] == board[:, :-1]).any() or
+                                     (board[1:, :] == board[:-1, :]).any()))
+
+    def move(self, direction: Direction):
+        """Moves all the tiles in the given direction and merges them if needed.
+
+        :param direction: direction to move the tiles to
+        :return: None
+        """
+
+        if self._journal is not None:
+            self._journal.append(direction)
+
+        lines = oriented(self._board, direction)
+        bands = self._bands(len(lines))
+
+        if len(bands) == 1:
+            counts = [self._move_band(lines, 0, len(lines))]
+        else:
+            counts = list(self._pool().map(lambda band: self._move_band(lines, *band), bands))
+
+        # Merged tiles are summed as Python ints, exponents of huge boards overflow int64
+        for band in counts:
+            self._merged_total += sum(int(count) << exponent for exponent, count in enumerate(band) if count)
+
+        self._grid = None
+        # Tiles spawned after a move only depend on the seed and the move's number
+        self._rng.start(self._rng.turn + 1)
+        self.insert_random_tile()
+
+    def close(self):
+        """Stops the worker threads, if any were started. The next move starts them again."""
+
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    @staticmethod
+    def _move_band(lines: np.ndarray, start: int, stop: int) -> np.ndarray:
+        # Bands don't overlap, so they are written back in place without any locking
+        moved, counts = merge_lines(lines[start:stop])
+        lines[start:stop] = moved
+        return counts
+
+    def _bands(self, count: int):
+        """Splits ``count`` lines into (start, stop) ranges, one per worker at most."""
+
+        bands = max(1, min(self._workers, count, self._board.size // MIN_BAND_CELLS))
+        bounds = np.linspace(0, count, bands + 1).astype(int)
+        return list(zip(bounds[:-1], bounds[1:]))
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix='logic-band')
+        return self._executor
+
+    def _set_board(self, board: np.ndarray):
+        self._board = board
+        self._grid = None
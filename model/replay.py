@@ -0,0 +1,41 @@
+"""Rebuilds games from their journals by playing the recorded moves again without the event system."""
+from itertools import islice
+from typing import Iterator, Optional, Tuple
+
+from model.engine import create_logic
+from model.journal import Journal, JournalError
+
+
+def replay(journal: Journal, moves: Optional[int] = None):
+    """
+    Plays the game recorded in the journal up to the given move.
+
+    :param moves: number of moves to replay, all of them by default
+    :return: Logic-like object of the journal's engine in the state after the last replayed move
+    """
+
+    logic = create_logic(journal.params())
+    if not logic.setup(seed=journal.seed):
+        raise JournalError("Journal's `start_tiles` don't fit its grid.")
+
+    move = logic.move
+    for direction in islice(journal, moves):
+        move(direction)
+
+    return logic
+
+
+def states(journal: Journal) -> Iterator[Tuple[int, object]]:
+    """
+    Plays the game recorded in the journal move by move.
+
+    :return: iterator of (number of moves made, logic) pairs, starting from the initial state.
+             The same logic object is yielded every time.
+    """
+
+    logic = replay(journal, 0)
+    yield 0, logic
+
+    for number, direction in enumerate(journal, 1):
+        logic.move(direction)
+        yield number, logic
@@ -0,0 +1,58 @@
+"""Random numbers for spawning tiles.
+
+The draws made after a move depend only on the game's seed and the number of the move,
+so any state of a game can be continued, e.g. after an undo, without keeping
+the state of a random number generator around.
+"""
+from typing import Sequence
+
+
+_MASK = (1 << 64) - 1
+_GOLDEN = 0x9E3779B97F4A7C15
+
+# Draws a single move may make before running into the next move's ones
+_TURN_DRAWS = 1 << 16
+
+
+class SpawnRandom:
+    """Counter-based generator with the part of the ``random.Random`` API the engines use.
+
+    It's splitmix64: the i-th draw of a move is a hash of ``seed + (turn * _TURN_DRAWS + i) * golden ratio``,
+    so starting the draws of any move takes no more than a multiplication.
+
+    :param seed: seed of the game, only its lowest 64 bits are used
+    """
+
+    def __init__(self, seed: int):
+        self._seed = 0
+        self._turn = 0
+        self._state = 0
+        self.seed(seed)
+
+    @property
+    def turn(self) -> int:
+        """Number of the move the draws are made for, 0 for the start tiles."""
+        return self._turn
+
+    def seed(self, seed: int, turn: int = 0):
+        self._seed = seed & _MASK
+        self.start(turn)
+
+    def start(self, turn: int):
+        """Moves to the draws of the given move."""
+
+        self._turn = turn
+        self._state = (self._seed + turn * _TURN_DRAWS * _GOLDEN) & _MASK
+
+    def random(self) -> float:
+        x = self._state = (self._state + _GOLDEN) & _MASK
+        x = (x ^ (x >> 30)) * 0xBF58476D1CE4E5B9 & _MASK
+        x = (x ^ (x >> 27)) * 0x94D049BB133111EB & _MASK
+        return ((x ^ (x >> 31)) >> 11) * 2 ** -53
+
+    def randrange(self, n: int) -> int:
+        return int(self.random() * n)
+
+    def choice(self, seq: Sequence):
+        return seq[self.randrange(len(seq))]
+
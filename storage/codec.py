@@ -0,0 +1,117 @@
+"""Binary format of the game checkpoints.
+
+A checkpoint is a fixed-size little-endian header followed by one byte per cell::
+
+    magic       4s  b'2048'
+    version     B   format version, see ``VERSION``
+    width       H   grid width
+    height      H   grid height
+    start_tiles B   number of tiles a new game starts with
+    score       Q   score of the saved game
+    best        Q   best score of the user
+    is_finished ?   whether the saved game is over
+    cells       width * height bytes of tiles' exponents in row-major order, 0 for an empty cell
+
+A 4x4 game takes 43 bytes.
+"""
+import pickle
+import struct
+
+from argparse import Namespace
+from typing import Any
+
+from model.grid import CompactGrid, Grid
+from model.logic import LogicState
+
+
+MAGIC = b'2048'
+VERSION = 1
+
+_HEADER = struct.Struct('<4sBHHBQQ?')
+
+HEADER_SIZE = _HEADER.size
+
+
+class CheckpointError(ValueError):
+    pass
+
+
+def is_checkpoint(data: bytes) -> bool:
+    """Tells the binary checkpoints from other (e.g. pickled) data."""
+    return data[:len(MAGIC)] == MAGIC
+
+
+def is_checkpoint_value(value: Any) -> bool:
+    """Tells the checkpoints made by ``GameController`` from other values."""
+    return isinstance(value, dict) and 'state' in value
+
+
+def _exponents(grid: Grid) -> bytes:
+    if isinstance(grid, CompactGrid):
+        return bytes(grid.exponents)
+
+    cells = bytearray(grid.width * grid.height)
+    for tile in grid.tiles:
+        cells[tile.y * grid.width + tile.x] = tile.value.bit_length() - 1
+    return bytes(cells)
+
+
+def encode(checkpoint: dict) -> bytes:
+    """
+    Packs a checkpoint made by ``GameController`` into bytes.
+
+    :param checkpoint: dict with ``state`` (LogicState), ``best`` and ``is_finished`` keys
+    :return: bytes of the binary checkpoint
+    """
+
+    state = checkpoint['state']
+    grid = state.grid
+
+    header = _HEADER.pack(MAGIC, VERSION, grid.width, grid.height, state.params.start_tiles,
+                          state.merged_total, checkpoint.get('best', 0), checkpoint.get('is_finished', False))
+    return header + _exponents(grid)
+
+
+def decode(data: bytes) -> dict:
+    """
+    Unpacks a binary checkpoint. The grid is restored as a ``CompactGrid``,
+    so no ``Tile`` objects are created until the game asks for them.
+
+    :return: dict with ``state``, ``best`` and ``is_finished`` keys
+    """
+
+    if len(data) < HEADER_SIZE:
+        raise CheckpointError(f"Checkpoint is truncated: {len(data)} bytes.")
+
+    magic, version, width, height, start_tiles, score, best, is_finished = _HEADER.unpack_from(data)
+
+    if magic != MAGIC:
+        raise CheckpointError("Not a checkpoint.")
+
+    if version != VERSION:
+        raise CheckpointError(f"Unsupported checkpoint version: {version}.")
+
+    if len(data) != HEADER_SIZE + width * height:
+        raise CheckpointError(f"Checkpoint of a {width}x{height} grid can't take {len(data)} bytes.")
+
+    grid = CompactGrid.from_exponents(width, height, memoryview(data)[HEADER_SIZE:])
+    params = Namespace(width=width, height=height, start_tiles=start_tiles)
+
+    return dict(state=LogicState(grid=grid, params=params, merged_total=score),
+                best=best,
+                is_finished=is_finished)
+
+
+def serialize(value: Any) -> bytes:
+    """Packs game checkpoints into the binary format and pickles anything else."""
+
+    if is_checkpoint_value(value):
+        return encode(value)
+    return pickle.dumps(value)
+
+
+def deserialize(data: bytes) -> Any:
+    # Data saved before the binary format was introduced is pickled
+    if is_checkpoint(data):
+        return decode(data)
+    return pickle.loads(data)
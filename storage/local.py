@@ -1,98 +1,264 @@
-import pickle
+import os
+import json
+import zlib
 import logging
+import threading
 
 from os import getcwd
 from os.path import join
 from pathlib import Path
-from typing import Any
+from typing import Any, Dict, Optional, Tuple
 
+from storage import codec
 from storage.storage import StorageManager
 
 
 log = logging.getLogger(__name__)
 
+MANIFEST_NAME = '.manifest.jsonl'
+
+# The manifest is rewritten when it has this many more lines than live entries
+MANIFEST_SLACK = 1000
+
 
 class LocalStorageManager(StorageManager):
+    """Keeps each user's checkpoint in its own ``<username>.data`` file.
+
+    Known files are listed in a manifest next to them, one JSON line per change
+    with the file's name, size, modification time and CRC-32. The manifest is only
+    read on the first access and files are only opened by :meth:`get`, so creating
+    the manager takes constant time however many users there are. Files that
+    were changed since they were listed are validated and listed again.
 
-    def __init__(self, path=None, hide_files=True):
+    Files are written to a temporary file first and then moved in place,
+    so a crash never leaves a torn checkpoint. With ``background`` set, :meth:`set`
+    only serializes the value and a writer thread stores it later. Values set
+    for the same user before the writer gets to them are written only once, the newest one.
+    """
+
+    def __init__(self, path=None, hide_files=True, background=False):
         self._hide_files = hide_files
         self._path = path if path else join(getcwd())
-        self._files = None
+        # Username -> manifest entry, loaded lazily
+        self._files: Optional[Dict[str, dict]] = None
         self._data = None
+        # Whether the manifest ends with a line torn by a crash, the next entry starts on a new line
+        self._torn = False
+
+        # Username -> (path, serialized value) waiting for the writer thread, oldest first
+        self._background = background
+        self._pending: Dict[str, Tuple[str, bytes]] = dict()
+        self._lock = threading.RLock()
+        self._changed = threading.Condition(self._lock)
+        self._writer = None
+
+    @property
+    def _manifest_path(self) -> Path:
+        return Path(self._path) / MANIFEST_NAME
 
-        self._scan_path()
+    def _manifest(self) -> Dict[str, dict]:
+        with self._lock:
+            if self._files is None:
+                self._files = self._read_manifest()
+            return self._files
 
-    def _scan_path(self):
+    def _read_manifest(self) -> Dict[str, dict]:
         files = dict()
+        lines = 0
 
-        for file in Path(self._path).glob('*.data'):
+        try:
+            with open(str(self._manifest_path), 'r') as manifest:
+                for line in manifest:
+                    lines += 1
+                    self._torn = not line.endswith('\n')
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # The last line might have been torn by a crash
+                        continue
 
-            # Why not?
-            if file.is_dir():
-                continue
+                    if entry.get('deleted'):
+                        files.pop(entry['user'], None)
+                    else:
+                        files[entry['user']] = entry
 
-            # Check if file can be opened
-            try:
-                with open(str(file), 'rb') as f:
-                    pickle.load(f)
+        except FileNotFoundError:
+            return files
 
-                # This blocks continues if everything is fine
-                username = file.with_suffix('').name
-                if username.startswith('.'):
-                    # Then it was hidden
-                    username = username[1:]
+        if lines > len(files) + MANIFEST_SLACK:
+            self._compact_manifest(files)
 
-                files[username] = str(file)  # save for later
+        return files
 
-            except IOError:
-                log.warning(f"Corrupted user checkpoint found: {file}")
+    def _compact_manifest(self, files: Dict[str, dict]):
+        temp_path = self._manifest_path.with_suffix('.tmp')
 
-        self._files = files
+        with open(str(temp_path), 'w') as manifest:
+            for entry in files.values():
+                manifest.write(json.dumps(entry) + '\n')
+
+        os.replace(str(temp_path), str(self._manifest_path))
+        self._torn = False
+
+    def _append_manifest(self, entry: dict):
+        with open(str(self._manifest_path), 'a') as manifest:
+            manifest.write(('\n' if self._torn else '') + json.dumps(entry) + '\n')
+        self._torn = False
+
+    def _list(self, username: str, path: str, data: bytes):
+        stat = os.stat(path)
+        entry = dict(user=username, file=Path(path).name,
+                     size=stat.st_size, mtime=stat.st_mtime_ns, crc32=zlib.crc32(data))
+
+        with self._lock:
+            self._manifest()[username] = entry
+            self._append_manifest(entry)
+
+    def _unlist(self, username: str):
+        with self._lock:
+            self._manifest().pop(username, None)
+            self._append_manifest(dict(user=username, deleted=True))
+
+    def _find(self, username: str) -> Optional[str]:
+        """Path of the user's checkpoint file, listed or not, None if there is none."""
 
-    def _save_data(self, username: str, value: Any):
         base_path = Path(self._path)
-        save_path = base_path / f"{username}.data"
 
-        if not base_path.exists():
-            base_path.mkdir(parents=True)
+        entry = self._manifest().get(username)
+        if entry and (base_path / entry['file']).is_file():
+            return str(base_path / entry['file'])
+
+        # Files saved before the manifest was introduced or by another manager
+        for name in (f"{username}.data", f".{username}.data"):
+            if (base_path / name).is_file():
+                return str(base_path / name)
+
+    def _save_data(self, username: str, value: Any):
+        save_path = Path(self._path) / f"{username}.data"
 
         if self._hide_files:
             save_path = save_path.with_name('.' + save_path.name)
 
+        # Values are serialized right away as they may change after the call
         try:
-            with open(str(save_path), 'wb') as file:
-                pickle.dump(value, file)
-                return True
+            data = codec.serialize(value)
+        except Exception as e:
+            log.error(f"Can't save data. Operation discarded: {e}")
+            return False
+
+        if not self._background:
+            return self._write(username, str(save_path), data)
+
+        with self._lock:
+            self._pending.pop(username, None)
+            self._pending[username] = (str(save_path), data)
+            self._changed.notify_all()
+
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_behind, name='storage-writer', daemon=True)
+                self._writer.start()
+
+        return True
+
+    def _write(self, username: str, path: str, data: bytes) -> bool:
+        """Atomically replaces the file with the given data."""
+
+        temp_path = path + '.tmp'
+
+        try:
+            Path(self._path).mkdir(parents=True, exist_ok=True)
+
+            with open(temp_path, 'wb') as file:
+                file.write(data)
+                file.flush()
+                os.fsync(file.fileno())
+
+            os.replace(temp_path, path)
+            self._list(username, path, data)
+            return True
 
         except Exception as e:
             log.error(f"Can't save data. Operation discarded: {e}")
             return False
 
+    def _write_behind(self):
+        while True:
+            with self._lock:
+                while not self._pending:
+                    self._changed.wait()
+
+                username, item = next(iter(self._pending.items()))
+
+            # Files are written without holding the lock, so setting values never waits for the disk
+            self._write(username, *item)
+
+            with self._lock:
+                # A newer value might have been set in the meantime
+                if self._pending.get(username) is item:
+                    del self._pending[username]
+                self._changed.notify_all()
+
+    def flush(self):
+        with self._lock:
+            while self._pending:
+                self._changed.wait()
+
     def _load_data(self, username: str):
         """
-        Finds `yaml` user config and loads it into memory for quick access.
-        :return: None
+        Finds the user's checkpoint file and loads it.
+        Corrupted checkpoints are logged and skipped.
+
+        :return: checkpoint or None if there is no valid one
         """
 
-        if username not in self._files.keys():
+        with self._lock:
+            if username in self._pending:
+                return codec.deserialize(self._pending[username][1])
+
+        data_path = self._find(username)
+        if data_path is None:
             return
 
-        data_path = self._files[username]
-        with open(data_path, 'rb') as f:
-            try:
-                return pickle.load(f)
-            except Exception as e:
-                log.error(f"Error occurred while reading file `{data_path}`: {e}")
-                raise e
+        try:
+            stat = os.stat(data_path)
+            with open(data_path, 'rb') as f:
+                data = f.read()
+        except Exception as e:
+            log.error(f"Error occurred while reading file `{data_path}`: {e}")
+            raise e
+
+        # Files unchanged since they were listed only need their checksum verified
+        entry = self._manifest().get(username)
+        unchanged = (entry is not None and entry['file'] == Path(data_path).name and
+                     (entry['size'], entry['mtime']) == (stat.st_size, stat.st_mtime_ns))
+
+        if unchanged:
+            if entry['crc32'] != zlib.crc32(data):
+                log.warning(f"Corrupted user checkpoint found: {data_path}")
+                return
+            return codec.deserialize(data)
+
+        try:
+            value = codec.deserialize(data)
+        except Exception:
+            log.warning(f"Corrupted user checkpoint found: {data_path}")
+            return
+
+        self._list(username, data_path, data)
+        return value
 
     def _delete_data(self, username: str):
-        import os
+        # Otherwise a pending write could bring the file back
+        self.flush()
 
-        if not self._files.get(username):
+        data_path = self._find(username)
+
+        if not data_path:
             error = f"Can't find checkpoint file for user: '{username}'."
             raise FileNotFoundError(error)
 
-        os.remove(self._files[username])
+        os.remove(data_path)
+        self._unlist(username)
 
     def get(self, username: str) -> Any:
         return self._load_data(username)
@@ -102,4 +268,3 @@ class LocalStorageManager(StorageManager):
 
     def delete(self, username: str):
         return self._delete_data(username)
-
@@ -0,0 +1,24 @@
+from typing import Any
+
+from storage.storage import StorageManager
+
+
+class MemoryStorageManager(StorageManager):
+    """Keeps checkpoints in memory only, e.g. for headless runs."""
+
+    def __init__(self):
+        self._data = dict()
+
+    def get(self, username: str) -> Any:
+        return self._data.get(username)
+
+    def set(self, username: str, value: Any):
+        self._data[username] = value
+        return True
+
+    def delete(self, username: str):
+        if username not in self._data:
+            error = f"Can't find checkpoint for user: '{username}'."
+            raise KeyError(error)
+
+        del self._data[username]
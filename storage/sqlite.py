@@ -0,0 +1,146 @@
+import sqlite3
+import logging
+import threading
+
+from time import time
+from typing import Any, List, Optional, Tuple
+
+from storage import codec
+from storage.storage import StorageManager
+
+
+log = logging.getLogger(__name__)
+
+# Columns leaderboards can be built on
+RANKED_COLUMNS = ('best', 'score', 'max_tile')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    username TEXT PRIMARY KEY,
+    data BLOB NOT NULL,
+    best INTEGER,
+    score INTEGER,
+    max_tile INTEGER,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS checkpoints_best ON checkpoints (best);
+CREATE INDEX IF NOT EXISTS checkpoints_score ON checkpoints (score);
+CREATE INDEX IF NOT EXISTS checkpoints_max_tile ON checkpoints (max_tile);
+CREATE INDEX IF NOT EXISTS checkpoints_updated_at ON checkpoints (updated_at);
+"""
+
+
+def _stats(value: dict, data: bytes) -> Tuple[int, int, int]:
+    """Best score, score and max tile of a checkpoint."""
+
+    cells = data[codec.HEADER_SIZE:]
+    max_tile = 1 << max(cells) if any(cells) else 0
+    return value.get('best', 0), value['state'].merged_total, max_tile
+
+
+class SQLiteStorageManager(StorageManager):
+    """Keeps every user's checkpoint in a single SQLite database.
+
+    Checkpoints are stored in the binary format of :mod:`storage.codec` along with
+    indexed best score, score, max tile and update time, so leaderboards are
+    answered from the indices without decoding any checkpoint. The database runs
+    in WAL mode, so readers in other processes never block the writer.
+
+    Nothing but checkpoints is stored, and nothing is ever unpickled,
+    so a database from an untrusted source can't run code.
+    """
+
+    def __init__(self, path: str = 'games.db'):
+        self._path = path
+
+        # The connection is shared with whatever thread calls the manager, the lock serializes its use
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.executescript(_SCHEMA)
+
+    def get(self, username: str) -> Any:
+        with self._lock:
+            row = self._connection.execute('SELECT data FROM checkpoints WHERE username = ?',
+                                           (username,)).fetchone()
+        if row is None:
+            return
+
+        try:
+            return codec.decode(row[0])
+        except Exception as e:
+            log.warning(f"Corrupted user checkpoint found: {username} ({e})")
+
+    def set(self, username: str, value: Any):
+        if not codec.is_checkpoint_value(value):
+            log.error(f"Only game checkpoints can be saved to SQLite. Operation discarded: {type(value).__name__}")
+            return False
+
+        try:
+            data = codec.encode(value)
+            best, score, max_tile = _stats(value, data)
+
+            with self._lock:
+                self._connection.execute(
+                    'INSERT OR REPLACE INTO checkpoints (username, data, best, score, max_tile, updated_at) '
+                    'VALUES (?, ?, ?, ?, ?, ?)', (username, data, best, score, max_tile, time()))
+            return True
+
+        except Exception as e:
+            log.error(f"Can't save data. Operation discarded: {e}")
+            return False
+
+    def delete(self, username: str):
+        with self._lock:
+            deleted = self._connection.execute('DELETE FROM checkpoints WHERE username = ?', (username,)).rowcount
+
+        if not deleted:
+            error = f"Can't find checkpoint for user: '{username}'."
+            raise KeyError(error)
+
+    def top(self, k: int = 10, by: str = 'best') -> List[Tuple[str, int]]:
+        """
+        Users with the highest values of the given column.
+
+        :param by: one of ``RANKED_COLUMNS``
+        :return: list of up to ``k`` (username, value) pairs, highest first
+        """
+
+        column = self._ranked(by)
+        with self._lock:
+            return self._connection.execute(
+                f'SELECT username, {column} FROM checkpoints WHERE {column} IS NOT NULL '
+                f'ORDER BY {column} DESC LIMIT ?', (k,)).fetchall()
+
+    def rank(self, username: str, by: str = 'best') -> Optional[int]:
+        """
+        Place of the user in the leaderboard of the given column, users with equal values share it.
+        The users ranked higher are counted by a range scan of the column's index
+        (``SEARCH checkpoints USING COVERING INDEX``), so no table rows are read.
+
+        :param by: one of ``RANKED_COLUMNS``
+        :return: 1-based rank or None if the user has no checkpoint
+        """
+
+        column = self._ranked(by)
+        with self._lock:
+            row = self._connection.execute(f'SELECT {column} FROM checkpoints WHERE username = ?',
+                                           (username,)).fetchone()
+            if row is None or row[0] is None:
+                return
+
+            higher, = self._connection.execute(f'SELECT COUNT(*) FROM checkpoints WHERE {column} > ?',
+                                               (row[0],)).fetchone()
+        return higher + 1
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    @staticmethod
+    def _ranked(column: str) -> str:
+        # Column names can't be query parameters, so only the known ones get into the query
+        if column not in RANKED_COLUMNS:
+            raise ValueError(f"Can't rank by `{column}`. Expected one of: {', '.join(RANKED_COLUMNS)}.")
+        return column
@@ -16,4 +16,6 @@ class StorageManager(ABC):
     def delete(self, username: str):
         pass
 
-
+    def flush(self):
+        """Waits until every value that was set is stored. Call it before the game quits."""
+        pass
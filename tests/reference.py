@@ -0,0 +1,61 @@
+"""Straightforward implementation of the game's rules the engines are checked against.
+
+Boards are lists of rows of tile exponents, 0 stands for an empty cell.
+"""
+import random
+
+from typing import List, Tuple
+
+from model.grid import Direction
+
+
+def move_line(line: List[int]) -> Tuple[List[int], int]:
+    """Slides a line towards its head and merges equal neighbours, the ones closest to the head first.
+
+    :return: tuple (exponents after the move, sum of merged tiles' values)
+    """
+
+    tiles = [exponent for exponent in line if exponent]
+    result = list()
+    score = 0
+
+    while tiles:
+        exponent = tiles.pop(0)
+        if tiles and tiles[0] == exponent:
+            tiles.pop(0)
+            exponent += 1
+            score += 1 << exponent
+        result.append(exponent)
+
+    return result + [0] * (len(line) - len(result)), score
+
+
+def move_rows(rows: List[List[int]], direction: Direction) -> Tuple[List[List[int]], int]:
+    """Applies a move to a board without spawning a tile.
+
+    :return: tuple (rows after the move, sum of merged tiles' values)
+    """
+
+    horizontal = bool(direction.value.x)
+    backwards = direction.value.x + direction.value.y > 0
+
+    lines = [list(line) for line in (rows if horizontal else zip(*rows))]
+    moved = list()
+    score = 0
+
+    for line in lines:
+        line, merged = move_line(line[::-1] if backwards else line)
+        moved.append(line[::-1] if backwards else line)
+        score += merged
+
+    if not horizontal:
+        moved = [list(row) for row in zip(*moved)]
+
+    return moved, score
+
+
+def random_rows(rng: random.Random, width: int, height: int, top: int = 3) -> List[List[int]]:
+    """Board with many empty cells and equal neighbours, so moves both slide and merge tiles."""
+
+    choices = [0, 0] + list(range(1, top + 1))
+    return [[rng.choice(choices) for _ in range(width)] for _ in range(height)]
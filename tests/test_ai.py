@@ -0,0 +1,78 @@
+from argparse import Namespace
+
+from common.events import CPUTickEvent, GameTeardownEvent
+from common.mediator import EventManager
+from controller.ai import Expectimax, ExpectimaxController
+from controller.game import GameController
+from model.grid import CompactGrid, Direction
+from model.logic import Logic, LogicState
+from storage.memory import MemoryStorageManager
+
+
+PARAMS = dict(width=4, height=4, start_tiles=2, engine='classic')
+
+
+def _grid(rows) -> CompactGrid:
+    return CompactGrid.from_exponents(4, 4, bytes(sum(rows, [])))
+
+
+def _moves(grid: CompactGrid, direction: Direction) -> bool:
+    logic = Logic(Namespace(**PARAMS))
+    logic.load_state(LogicState(grid, Namespace(**PARAMS), 0))
+    before = [logic.grid.row_exponents(y) for y in range(4)]
+    logic.move(direction)
+    return [logic.grid.row_exponents(y) for y in range(4)] != before
+
+
+def test_grids_with_tiles_above_32768_are_searched():
+    search = Expectimax(depth=2)
+    grid = _grid([[16, 15, 3, 1],
+                  [2, 4, 0, 0],
+                  [0, 0, 0, 0],
+                  [1, 0, 0, 0]])
+
+    direction = search.decide_grid(grid)
+    assert direction is not None
+    assert _moves(grid, direction)
+
+
+def test_merges_of_the_largest_tiles_are_made_last():
+    search = Expectimax(depth=1)
+    # Only the two 65536 tiles can merge, the packed board sees no move at all
+    grid = _grid([[16, 16, 1, 2],
+                  [1, 2, 3, 4],
+                  [2, 3, 4, 5],
+                  [3, 4, 5, 6]])
+
+    direction = search.decide_grid(grid)
+    assert direction in (Direction.LEFT, Direction.RIGHT)
+    assert _moves(grid, direction)
+
+    assert search.decide_grid(_grid([[17, 16, 1, 2],
+                                     [1, 2, 3, 4],
+                                     [2, 3, 4, 5],
+                                     [3, 4, 5, 6]])) is None
+
+
+def test_controller_plays_past_32768():
+    storage = MemoryStorageManager()
+    logic = Logic(Namespace(**PARAMS))
+    logic.load_state(LogicState(_grid([[16, 0, 0, 0],
+                                       [0, 0, 0, 0],
+                                       [0, 0, 0, 1],
+                                       [0, 0, 0, 0]]), Namespace(**PARAMS), 0))
+    storage.set('ai', dict(state=logic.save_state(), best=0, is_finished=False))
+
+    event_manager = EventManager()
+    params = Namespace(username='ai', autosave_interval=0, ai_depth=1, **PARAMS)
+    # The event manager only keeps weak references to its listeners
+    controllers = [GameController(params, storage, event_manager), ExpectimaxController(params, event_manager)]
+
+    for _ in range(10):
+        event_manager.post(CPUTickEvent())
+
+    event_manager.post(GameTeardownEvent())
+    grid = storage.get('ai')['state'].grid
+
+    assert controllers[1].moves >= 9
+    assert max(b''.join(grid.row_exponents(y) for y in range(4))) == 16
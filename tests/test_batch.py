@@ -0,0 +1,33 @@
+import random
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from model.batch import DIRECTIONS, move_boards, slide_lines
+from tests.reference import move_line, move_rows, random_rows
+
+
+def test_slide_lines_matches_reference():
+    rng = random.Random(3)
+    lines = [random_rows(rng, 9, 1)[0] for _ in range(1000)]
+
+    moved, score = slide_lines(np.array(lines, dtype=np.uint8))
+
+    for line, result, merged in zip(lines, moved.tolist(), score.tolist()):
+        assert (result, merged) == move_line(line), line
+
+
+def test_move_boards_matches_reference():
+    rng = random.Random(5)
+    width, height = 5, 3
+    boards = [random_rows(rng, width, height) for _ in range(400)]
+    # Negative codes leave a board as is
+    codes = [rng.randrange(-1, len(DIRECTIONS)) for _ in boards]
+
+    stack = np.array(boards, dtype=np.uint8)
+    score = move_boards(stack, np.array(codes, dtype=np.int8))
+
+    for rows, code, result, merged in zip(boards, codes, stack.tolist(), score.tolist()):
+        expected = (rows, 0) if code < 0 else move_rows(rows, DIRECTIONS[code])
+        assert (result, merged) == expected
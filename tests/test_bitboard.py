@@ -0,0 +1,68 @@
+import random
+
+from itertools import product
+
+import pytest
+
+from model import bitboard
+from model.bitboard import MAX_EXPONENT, SIZE, board_from_grid, move_board, slide_line
+from model.grid import CompactGrid, Direction, Grid, Position, Tile
+from tests.reference import move_rows, random_rows
+
+
+def _pack(rows) -> int:
+    return board_from_grid(CompactGrid.from_exponents(SIZE, SIZE, bytes(sum(rows, []))))
+
+
+def _unpack(board: int):
+    return [[board >> ((y * SIZE + x) << 2) & bitboard.CELL_MASK for x in range(SIZE)] for y in range(SIZE)]
+
+
+def setup_module():
+    bitboard.prepare_tables()
+
+
+def test_slide_line_matches_reference():
+    for line in product(range(5), repeat=SIZE):
+        expected, score = move_rows([list(line)], Direction.LEFT)
+        assert slide_line(list(line)) == (expected[0], score), line
+
+
+def test_slide_line_keeps_largest_tiles_apart():
+    assert slide_line([MAX_EXPONENT, MAX_EXPONENT, 0, 0]) == ([MAX_EXPONENT, MAX_EXPONENT, 0, 0], 0)
+
+
+@pytest.mark.parametrize('direction', list(Direction))
+def test_move_board_matches_reference(direction):
+    rng = random.Random(direction.name)
+
+    for _ in range(500):
+        rows = random_rows(rng, SIZE, SIZE, top=6)
+        expected, score = move_rows(rows, direction)
+
+        moved, merged = move_board(_pack(rows), direction)
+        assert (_unpack(moved), merged) == (expected, score)
+
+
+def test_board_from_grid_packs_plain_grids():
+    grid = Grid(SIZE, SIZE)
+    grid.insert_tile(Tile(Position(1, 2), 8))
+    grid.insert_tile(Tile(Position(3, 3), 1 << MAX_EXPONENT))
+
+    assert _unpack(board_from_grid(grid)) == [[0, 0, 0, 0],
+                                              [0, 0, 0, 0],
+                                              [0, 3, 0, 0],
+                                              [0, 0, 0, MAX_EXPONENT]]
+
+
+def test_board_from_grid_rejects_tiles_a_cell_cant_hold():
+    grid = CompactGrid(SIZE, SIZE)
+    grid.set_exponent(0, 0, MAX_EXPONENT + 1)
+
+    with pytest.raises(ValueError):
+        board_from_grid(grid)
+
+
+def test_board_from_grid_rejects_other_sizes():
+    with pytest.raises(ValueError):
+        board_from_grid(Grid(SIZE + 1, SIZE))
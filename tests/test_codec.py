@@ -0,0 +1,67 @@
+from argparse import Namespace
+
+import pytest
+
+from model.grid import Direction, Grid, Position, Tile
+from model.logic import Logic, LogicState
+from storage import codec
+
+
+def _checkpoint(is_finished: bool = False) -> dict:
+    logic = Logic(Namespace(width=5, height=3, start_tiles=2))
+    logic.setup(seed=18)
+    for direction in (Direction.LEFT, Direction.UP, Direction.RIGHT, Direction.DOWN) * 4:
+        logic.move(direction)
+
+    return dict(state=logic.save_state(), best=4096, is_finished=is_finished)
+
+
+def _rows(grid: Grid):
+    return [grid.row_exponents(y) for y in range(grid.height)]
+
+
+@pytest.mark.parametrize('is_finished', [False, True])
+def test_round_trip(is_finished):
+    checkpoint = _checkpoint(is_finished)
+    state = checkpoint['state']
+
+    data = codec.encode(checkpoint)
+    assert len(data) == codec.HEADER_SIZE + 5 * 3
+
+    restored = codec.decode(data)
+    assert restored['best'] == 4096
+    assert restored['is_finished'] == is_finished
+    assert restored['state'].merged_total == state.merged_total
+    assert restored['state'].params.start_tiles == 2
+    assert _rows(restored['state'].grid) == _rows(state.grid)
+
+
+def test_plain_grids_are_encoded():
+    grid = Grid(2, 2)
+    grid.insert_tile(Tile(Position(1, 0), 2048))
+    params = Namespace(width=2, height=2, start_tiles=1)
+
+    data = codec.encode(dict(state=LogicState(grid=grid, params=params, merged_total=12)))
+
+    assert _rows(codec.decode(data)['state'].grid) == [bytes([0, 11]), bytes([0, 0])]
+
+
+def test_other_values_are_pickled():
+    assert codec.deserialize(codec.serialize({'theme': 'dark'})) == {'theme': 'dark'}
+
+
+@pytest.mark.parametrize('data', [
+    b'',
+    b'2048',
+    b'XXXX' + bytes(codec.HEADER_SIZE + 15),
+])
+def test_broken_checkpoints_are_rejected(data):
+    with pytest.raises(codec.CheckpointError):
+        codec.decode(data)
+
+
+def test_checkpoints_of_another_size_are_rejected():
+    data = codec.encode(_checkpoint())
+
+    with pytest.raises(codec.CheckpointError):
+        codec.decode(data[:-1])
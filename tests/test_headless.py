@@ -0,0 +1,30 @@
+import yaml
+
+import headless
+
+
+def _config(tmp_path) -> str:
+    settings = dict(width=4, height=4, start_tiles=2, engine='classic', username='headless',
+                    autosave_interval=0, ai_depth=1, ai_cache_size=1000)
+
+    path = tmp_path / 'config.yaml'
+    path.write_text(yaml.safe_dump(settings))
+    return str(path)
+
+
+def _run(tmp_path, capsys, *args) -> str:
+    headless.main(['--config', _config(tmp_path), *args])
+    summary = capsys.readouterr().out.splitlines()
+    # Speed differs between runs, everything else is up to the seed
+    return summary[0].split(', moves/sec')[0] + '\n' + summary[1]
+
+
+def test_seeded_runs_play_the_same_games(tmp_path, capsys):
+    first = _run(tmp_path, capsys, '--games', '3', '--seed', '5')
+    assert first == _run(tmp_path, capsys, '--games', '3', '--seed', '5')
+    assert first != _run(tmp_path, capsys, '--games', '3', '--seed', '6')
+
+
+def test_seeded_ai_runs_play_the_same_games(tmp_path, capsys):
+    first = _run(tmp_path, capsys, '--games', '2', '--seed', '5', '--player', 'ai')
+    assert first == _run(tmp_path, capsys, '--games', '2', '--seed', '5', '--player', 'ai')
@@ -0,0 +1,183 @@
+import random
+import struct
+
+from argparse import Namespace
+from importlib.util import find_spec
+
+import pytest
+
+from common.events import CPUTickEvent, GameReadyEvent, UserMoveEvent, UserRedoEvent, UserUndoEvent
+from common.mediator import EventManager, Listener, handles
+from controller.game import GameController
+from model.engine import create_logic
+from model.grid import Direction
+from model.history import History, Snapshot
+from model.journal import MAGIC, Journal, JournalError
+from storage.memory import MemoryStorageManager
+
+
+ENGINES = ['classic', 'bitboard'] + (['parallel'] if find_spec('numpy') else [])
+
+
+def _rows(logic):
+    grid = logic.grid
+    return [bytes(grid.row_exponents(y)) for y in range(grid.height)]
+
+
+def _state(logic):
+    return _rows(logic), logic.merged_total, list(logic.journal)
+
+
+def _game(engine: str, moves: int = 20):
+    logic = create_logic(Namespace(width=4, height=4, start_tiles=2, engine=engine))
+    logic.setup(seed=23)
+
+    rng = random.Random(23)
+    for _ in range(moves):
+        logic.move(rng.choice(list(Direction)))
+    return logic
+
+
+def _snapshot(size: int) -> Snapshot:
+    return Snapshot(board=(bytes(size),), free=None, merged_total=0, moves=0, direction=None, size=size)
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_undo_and_redo_bring_back_the_same_game(engine):
+    logic = _game(engine)
+    before = logic.snapshot()
+    state_before = _state(logic)
+
+    logic.move(Direction.LEFT)
+    after = logic.snapshot(before)
+    logic.move(Direction.UP)
+    state_after = _state(logic)
+
+    logic.restore(before)
+    assert _state(logic) == state_before
+
+    # Moves made again after an undo spawn the same tiles
+    logic.move(Direction.LEFT)
+    logic.move(Direction.UP)
+    assert _state(logic) == state_after
+
+    logic.restore(before)
+    logic.restore(after)
+    logic.move(Direction.UP)
+    assert _state(logic) == state_after
+
+
+def test_rewind_keeps_the_journal_in_step():
+    logic = _game('classic', moves=5)
+    first = logic.snapshot()
+    logic.move(Direction.DOWN)
+    second = logic.snapshot(first)
+    moves = list(logic.journal)
+
+    logic.restore(first)
+    assert list(logic.journal) == moves[:-1]
+
+    # Redo of the undone move appends it back
+    logic.restore(second)
+    assert list(logic.journal) == moves
+    assert len(Journal.from_bytes(logic.journal.to_bytes())) == len(moves)
+
+
+def test_snapshots_share_unchanged_rows():
+    logic = create_logic(Namespace(width=8, height=8, start_tiles=2, engine='classic'))
+    logic.setup(seed=1)
+
+    first = logic.snapshot()
+    logic.move(Direction.LEFT)
+    second = logic.snapshot(first)
+
+    shared = [row for row, old in zip(second.board, first.board) if row is old]
+    changed = [row for row, old in zip(second.board, first.board) if row is not old]
+
+    assert shared and all(row == old for row, old in zip(second.board, first.board) if row is old)
+    assert second.size == sum(map(len, changed)) + len(second.free)
+    assert first.size == 64 + len(first.free)
+
+
+def test_history_is_capped_by_depth():
+    history = History(depth=3)
+    for _ in range(5):
+        history.push(_snapshot(10))
+
+    undone = 0
+    while history.undo(_snapshot(10)):
+        undone += 1
+    assert undone == 3
+
+
+def test_history_is_capped_by_memory():
+    history = History(depth=100, memory=1000)
+    for _ in range(10):
+        history.push(_snapshot(300))
+
+    assert history.size <= 1000
+    assert history.can_undo()
+
+    # The latest snapshot is kept whatever it takes
+    history.push(_snapshot(5000))
+    assert history.last.size == 5000
+    assert history.undo(_snapshot(1)).size == 5000
+    assert not history.can_undo()
+
+
+def test_new_move_drops_the_redo_stack():
+    history = History()
+    history.push(_snapshot(1))
+    history.undo(_snapshot(2))
+    assert history.can_redo()
+
+    history.push(_snapshot(3))
+    assert not history.can_redo()
+
+
+def test_version_1_journals_are_rejected():
+    # Spawns of version 1 journals came from a different generator, so they can't be replayed
+    data = bytearray(Journal(7, 4, 4, 2, 'classic').to_bytes())
+    struct.pack_into('<4sB', data, 0, MAGIC, 1)
+
+    with pytest.raises(JournalError):
+        Journal.from_bytes(bytes(data))
+
+
+class _Grids(Listener):
+
+    def __init__(self):
+        self.ready = list()
+
+    @handles(GameReadyEvent)
+    def _on_ready(self, event: GameReadyEvent):
+        self.ready.append(bytes(event.grid.exponents))
+
+
+def _controller():
+    event_manager = EventManager()
+    params = Namespace(width=4, height=4, start_tiles=2, engine='classic', username='u', undo_depth=10)
+    grids = _Grids()
+    event_manager.register(grids)
+    # The event manager only keeps weak references, the caller keeps the controller alive
+    return GameController(params, MemoryStorageManager(), event_manager), event_manager, grids
+
+
+def test_controller_undo_and_redo():
+    game, event_manager, grids = _controller()
+
+    event_manager.post(CPUTickEvent())
+    for direction in (Direction.LEFT, Direction.UP, Direction.RIGHT):
+        event_manager.post(UserMoveEvent(direction))
+
+    event_manager.post(UserUndoEvent())
+    event_manager.post(UserUndoEvent())
+    event_manager.post(UserRedoEvent())
+    event_manager.post(UserRedoEvent())
+    # Nothing left to redo, no new game state is posted
+    event_manager.post(UserRedoEvent())
+
+    start, undone_once, undone_twice, redone_once, redone_twice = grids.ready
+    assert redone_once == undone_once
+    assert redone_twice != redone_once
+    assert undone_twice != start
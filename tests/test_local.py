@@ -0,0 +1,179 @@
+import os
+import json
+import threading
+import time
+
+from argparse import Namespace
+
+from common.events import CPUTickEvent, GameTeardownEvent, UserMoveEvent
+from common.mediator import EventManager
+from controller.game import GameController
+from model.grid import Direction
+from storage import codec
+from storage.local import MANIFEST_NAME, LocalStorageManager
+
+
+def _manifest(tmp_path) -> list:
+    entries = list()
+    with open(str(tmp_path / MANIFEST_NAME)) as manifest:
+        for line in manifest:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                continue
+    return entries
+
+
+def test_saves_are_appended_to_the_manifest(tmp_path):
+    storage = LocalStorageManager(str(tmp_path))
+    storage.set('ann', dict(score=1))
+    storage.set('bob', dict(score=2))
+    assert [entry['user'] for entry in _manifest(tmp_path)] == ['ann', 'bob']
+
+    storage.set('ann', dict(score=3))
+    storage.delete('bob')
+    entries = _manifest(tmp_path)
+    assert [entry['user'] for entry in entries] == ['ann', 'bob', 'ann', 'bob']
+    assert entries[-1]['deleted']
+    assert entries[2]['size'] == (tmp_path / '.ann.data').stat().st_size
+
+    reader = LocalStorageManager(str(tmp_path))
+    assert reader.get('ann') == dict(score=3)
+    assert reader.get('bob') is None
+
+
+def test_files_changed_outside_are_validated_again(tmp_path):
+    LocalStorageManager(str(tmp_path)).set('ann', dict(score=1))
+    path = tmp_path / '.ann.data'
+    mtime = path.stat().st_mtime_ns
+
+    path.write_bytes(codec.serialize(dict(score=2)))
+    os.utime(str(path), ns=(mtime + 10 ** 9, mtime + 10 ** 9))
+
+    assert LocalStorageManager(str(tmp_path)).get('ann') == dict(score=2)
+    entries = _manifest(tmp_path)
+    assert len(entries) == 2
+    assert entries[-1]['mtime'] == mtime + 10 ** 9
+
+    # A file changed without its listing being updated fails the checksum
+    path.write_bytes(codec.serialize(dict(score=5)))
+    os.utime(str(path), ns=(mtime + 10 ** 9, mtime + 10 ** 9))
+    assert LocalStorageManager(str(tmp_path)).get('ann') is None
+
+
+def test_long_manifests_are_compacted(tmp_path, monkeypatch):
+    monkeypatch.setattr('storage.local.MANIFEST_SLACK', 5)
+
+    storage = LocalStorageManager(str(tmp_path))
+    for score in range(8):
+        storage.set('ann', dict(score=score))
+    storage.set('bob', dict(score=0))
+    assert len(_manifest(tmp_path)) == 9
+
+    reader = LocalStorageManager(str(tmp_path))
+    assert reader.get('ann') == dict(score=7)
+    assert [entry['user'] for entry in _manifest(tmp_path)] == ['ann', 'bob']
+    assert reader.get('bob') == dict(score=0)
+
+
+def test_torn_manifest_lines_are_skipped(tmp_path):
+    LocalStorageManager(str(tmp_path)).set('ann', dict(score=1))
+    with open(str(tmp_path / MANIFEST_NAME), 'a') as manifest:
+        manifest.write('{"user": "bob", "fi')
+
+    storage = LocalStorageManager(str(tmp_path))
+    assert storage.get('ann') == dict(score=1)
+    assert storage.get('bob') is None
+
+    # The torn line is ended before the next entry is appended
+    storage.set('bob', dict(score=2))
+    assert [entry['user'] for entry in _manifest(tmp_path)[-2:]] == ['ann', 'bob']
+    assert LocalStorageManager(str(tmp_path)).get('bob') == dict(score=2)
+
+
+def _gated(storage: LocalStorageManager):
+    """Makes the storage's writer wait for the returned event before each write."""
+
+    gate = threading.Event()
+    started = threading.Event()
+    write = storage._write
+
+    def _write(*args):
+        started.set()
+        gate.wait()
+        return write(*args)
+
+    storage._write = _write
+    return gate, started
+
+
+def test_pending_values_are_read_back(tmp_path):
+    storage = LocalStorageManager(str(tmp_path), background=True)
+    gate, started = _gated(storage)
+
+    assert storage.set('ann', dict(score=1))
+    started.wait()
+    assert storage.get('ann') == dict(score=1)
+    assert LocalStorageManager(str(tmp_path)).get('ann') is None
+
+    gate.set()
+    storage.flush()
+    assert LocalStorageManager(str(tmp_path)).get('ann') == dict(score=1)
+
+
+def test_values_set_during_a_write_are_not_lost(tmp_path):
+    storage = LocalStorageManager(str(tmp_path), background=True)
+    gate, started = _gated(storage)
+
+    storage.set('ann', dict(score=1))
+    started.wait()
+    storage.set('ann', dict(score=2))
+    assert storage.get('ann') == dict(score=2)
+
+    gate.set()
+    storage.flush()
+    assert storage.get('ann') == dict(score=2)
+    assert LocalStorageManager(str(tmp_path)).get('ann') == dict(score=2)
+
+
+def test_flush_waits_for_the_disk(tmp_path):
+    storage = LocalStorageManager(str(tmp_path), background=True)
+    gate, started = _gated(storage)
+
+    storage.set('ann', dict(score=1))
+    storage.set('bob', dict(score=2))
+    started.wait()
+
+    flush = threading.Thread(target=storage.flush)
+    flush.start()
+    flush.join(0.1)
+    assert flush.is_alive()
+
+    gate.set()
+    flush.join()
+    reader = LocalStorageManager(str(tmp_path))
+    assert reader.get('ann') == dict(score=1)
+    assert reader.get('bob') == dict(score=2)
+
+
+def test_game_teardown_flushes_the_storage(tmp_path):
+    storage = LocalStorageManager(str(tmp_path), background=True)
+    write = storage._write
+
+    def _slow_write(*args):
+        time.sleep(0.2)
+        return write(*args)
+
+    storage._write = _slow_write
+
+    event_manager = EventManager()
+    params = Namespace(width=4, height=4, start_tiles=2, engine='classic', username='ann', autosave_interval=0)
+    game = GameController(params, storage, event_manager)
+
+    event_manager.post(CPUTickEvent())
+    event_manager.post(UserMoveEvent(Direction.LEFT))
+    event_manager.post(GameTeardownEvent())
+
+    checkpoint = LocalStorageManager(str(tmp_path)).get('ann')
+    assert checkpoint is not None
+    assert checkpoint['state'].merged_total == game._logic.merged_total
@@ -0,0 +1,92 @@
+import random
+
+from argparse import Namespace
+
+import pytest
+
+from model.grid import CompactGrid, Direction, Grid, Position, Tile
+from model.logic import Logic, LogicState
+from tests.reference import move_rows, random_rows
+
+
+def _logic(rows, grid_class=CompactGrid) -> Logic:
+    height, width = len(rows), len(rows[0])
+    params = Namespace(width=width, height=height, start_tiles=2)
+
+    grid = grid_class(width, height)
+    for y, row in enumerate(rows):
+        for x, exponent in enumerate(row):
+            if exponent:
+                grid.insert_tile(Tile(Position(x, y), 1 << exponent))
+
+    logic = Logic(params)
+    logic.load_state(LogicState(grid=grid, params=params, merged_total=0))
+    return logic
+
+
+def _rows(grid: Grid):
+    return [list(grid.row_exponents(y)) for y in range(grid.height)]
+
+
+def _spawned(expected, actual):
+    """Cells where the board after a move differs from the expected one."""
+
+    return [(x, y, actual[y][x]) for y, row in enumerate(expected) for x, exponent in enumerate(row)
+            if actual[y][x] != exponent]
+
+
+@pytest.mark.parametrize('width, height', [(4, 4), (7, 3), (1, 6), (16, 16)])
+def test_move_matches_reference(width, height):
+    rng = random.Random(width * 100 + height)
+
+    for _ in range(200):
+        rows = random_rows(rng, width, height)
+        direction = rng.choice(list(Direction))
+        expected, score = move_rows(rows, direction)
+
+        logic = _logic(rows)
+        logic.move(direction)
+
+        assert logic.merged_total == score
+
+        # Besides the move a single tile is spawned into an empty cell
+        spawned = _spawned(expected, _rows(logic.grid))
+        if any(0 in row for row in expected):
+            assert len(spawned) == 1
+            x, y, exponent = spawned[0]
+            assert expected[y][x] == 0 and exponent in (1, 2)
+        else:
+            assert not spawned
+
+
+def test_move_keeps_counters_up_to_date():
+    rng = random.Random(11)
+    logic = _logic(random_rows(rng, 6, 6))
+
+    for _ in range(100):
+        logic.move(rng.choice(list(Direction)))
+        rows = _rows(logic.grid)
+
+        fresh = CompactGrid.from_exponents(6, 6, bytes(sum(rows, [])))
+        assert logic.grid.tiles_count == fresh.tiles_count
+        assert logic.grid.mergeable_pairs == fresh.mergeable_pairs
+
+
+def test_moved_tiles_remember_the_move():
+    logic = _logic([[1, 1, 0, 2]])
+    logic.move(Direction.LEFT)
+
+    merged = logic.grid.get_cell(Position(0, 0))
+    assert merged.value == 4
+    assert sorted(tile.previous_position.x for tile in merged.merged_from) == [0, 1]
+
+    moved = logic.grid.get_cell(Position(1, 0))
+    assert (moved.value, moved.previous_position) == (4, Position(3, 0))
+
+
+def test_plain_grid_states_are_loaded():
+    rows = [[1, 0, 1], [0, 2, 2]]
+    logic = _logic(rows, grid_class=Grid)
+
+    assert isinstance(logic.grid, CompactGrid)
+    assert _rows(logic.grid) == rows
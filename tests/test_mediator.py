@@ -0,0 +1,273 @@
+import gc
+import asyncio
+
+from common.events import CPUTickEvent, Event, GameTeardownEvent, GridUpdateEvent, QuitEvent, ScoreUpdateEvent, UserRestartEvent
+from common.mediator import AsyncEventManager, EventCoalescer, EventGroup, EventManager, Listener, handles
+from controller.aio import AsyncClockController
+
+
+class _Tick(CPUTickEvent):
+    pass
+
+
+class _Recorder(Listener):
+
+    def __init__(self):
+        self.received = list()
+
+    @handles(CPUTickEvent)
+    def _on_tick(self, event: CPUTickEvent):
+        self.received.append(('tick', type(event)))
+
+    @handles(QuitEvent, UserRestartEvent)
+    def _on_quit_or_restart(self, event):
+        self.received.append(('quit or restart', type(event)))
+
+
+class _Everything(Listener):
+
+    def __init__(self):
+        self.received = list()
+
+    def notify(self, event):
+        self.received.append(type(event))
+
+
+def test_handlers_receive_their_event_types():
+    event_manager = EventManager()
+    recorder = _Recorder()
+    event_manager.register(recorder)
+
+    event_manager.post(CPUTickEvent())
+    event_manager.post(QuitEvent())
+    event_manager.post(UserRestartEvent())
+    event_manager.post(Event('unhandled'))
+
+    assert recorder.received == [('tick', CPUTickEvent), ('quit or restart', QuitEvent),
+                                 ('quit or restart', UserRestartEvent)]
+
+
+def test_handlers_receive_subclasses():
+    event_manager = EventManager()
+    recorder = _Recorder()
+    event_manager.register(recorder)
+
+    event_manager.post(_Tick())
+    assert recorder.received == [('tick', _Tick)]
+
+
+def test_overridden_handlers_are_used():
+
+    class _Derived(_Recorder):
+
+        @handles(CPUTickEvent)
+        def _on_tick(self, event: CPUTickEvent):
+            self.received.append(('derived tick', type(event)))
+
+    event_manager = EventManager()
+    derived = _Derived()
+    event_manager.register(derived)
+
+    event_manager.post(CPUTickEvent())
+    event_manager.post(QuitEvent())
+    assert derived.received == [('derived tick', CPUTickEvent), ('quit or restart', QuitEvent)]
+
+
+def test_notify_receives_every_event():
+    event_manager = EventManager()
+    everything = _Everything()
+    event_manager.register(everything)
+
+    event_manager.post(_Tick())
+    event_manager.post(QuitEvent())
+    assert everything.received == [_Tick, QuitEvent]
+
+
+def test_registering_again_delivers_once():
+    event_manager = EventManager()
+    recorder, everything = _Recorder(), _Everything()
+
+    for _ in range(2):
+        event_manager.register(recorder)
+        event_manager.register(everything)
+        event_manager.subscribe(CPUTickEvent, recorder._on_tick)
+
+    event_manager.post(CPUTickEvent())
+    assert recorder.received == [('tick', CPUTickEvent)]
+    assert everything.received == [CPUTickEvent]
+
+    # Registering in another group moves the listener there
+    event_manager.register(recorder, EventGroup.UI)
+    event_manager.post(CPUTickEvent())
+    event_manager.post(CPUTickEvent(), EventGroup.UI)
+    assert recorder.received == [('tick', CPUTickEvent)] * 2
+
+    event_manager.unregister(recorder)
+    event_manager.post(CPUTickEvent(), EventGroup.UI)
+    assert len(recorder.received) == 2
+
+
+def test_listeners_are_not_kept_alive():
+    event_manager = EventManager()
+    event_manager.register(_Recorder())
+    gc.collect()
+
+    assert len(event_manager.listeners) == 0
+    event_manager.post(CPUTickEvent())
+
+
+class _Relay(Listener):
+    """Posts a quit event from the first tick handler and records the order of deliveries."""
+
+    def __init__(self, event_manager: EventManager, received: list, name: str):
+        self.event_manager = event_manager
+        self.received = received
+        self.name = name
+
+    @handles(CPUTickEvent)
+    async def _on_tick(self, event: CPUTickEvent):
+        if self.name == 'first':
+            self.event_manager.post(QuitEvent())
+        # Handlers of the same event run concurrently, the second one finishes first
+        await asyncio.sleep(0.01 if self.name == 'first' else 0)
+        self.received.append((self.name, event.ticks))
+
+    @handles(QuitEvent)
+    def _on_quit(self, event: QuitEvent):
+        self.received.append((self.name, 'quit'))
+
+
+def test_async_events_are_dispatched_one_at_a_time():
+    event_manager = AsyncEventManager()
+    received = list()
+    relays = [_Relay(event_manager, received, name) for name in ('first', 'second')]
+    for relay in relays:
+        event_manager.register(relay)
+
+    # Events posted before the loop runs wait for it
+    event_manager.post(CPUTickEvent(1))
+    event_manager.post(CPUTickEvent(2))
+
+    async def _run():
+        dispatcher = asyncio.ensure_future(event_manager.run())
+        await asyncio.sleep(0)
+        await event_manager.join()
+        event_manager.stop()
+        await dispatcher
+
+    asyncio.run(_run())
+
+    # Quit events posted by handlers of the first tick are queued behind the second tick
+    assert received == [('second', 1), ('first', 1), ('second', 2), ('first', 2),
+                        ('first', 'quit'), ('second', 'quit'), ('first', 'quit'), ('second', 'quit')]
+
+
+def test_stopping_drains_the_queue():
+    event_manager = AsyncEventManager()
+    everything = _Everything()
+    event_manager.register(everything)
+
+    async def _run():
+        dispatcher = asyncio.ensure_future(event_manager.run())
+        await asyncio.sleep(0)
+
+        event_manager.post(CPUTickEvent())
+        event_manager.post(QuitEvent())
+        event_manager.stop()
+        event_manager.post(GameTeardownEvent())
+        await dispatcher
+
+    asyncio.run(_run())
+    assert everything.received == [CPUTickEvent, QuitEvent, GameTeardownEvent]
+
+
+class _Quitter(Listener):
+
+    def __init__(self, event_manager: EventManager, ticks: int):
+        self.event_manager = event_manager
+        self.ticks = ticks
+        self.teardowns = 0
+
+    @handles(CPUTickEvent)
+    def _on_tick(self, event: CPUTickEvent):
+        self.ticks -= 1
+        if self.ticks == 0:
+            self.event_manager.post(QuitEvent())
+
+    @handles(GameTeardownEvent)
+    def _on_teardown(self, event: GameTeardownEvent):
+        self.teardowns += 1
+
+
+def test_clock_tears_down_before_stopping():
+    event_manager = AsyncEventManager()
+    quitter = _Quitter(event_manager, ticks=3)
+    clock = AsyncClockController(event_manager, fps=None)
+    event_manager.register(quitter)
+    event_manager.register(clock)
+
+    asyncio.run(clock.run())
+    assert quitter.ticks == 0
+    assert quitter.teardowns == 1
+
+
+class _Frames(Listener):
+
+    def __init__(self):
+        self.received = list()
+
+    def notify(self, event):
+        self.received.append(getattr(event, 'score', type(event)))
+
+
+def _coalesced():
+    event_manager = EventManager()
+    frames = _Frames()
+    coalescer = EventCoalescer(frames, coalesce=(GridUpdateEvent, ScoreUpdateEvent), flush_on=(CPUTickEvent,))
+    event_manager.register(coalescer)
+    return event_manager, coalescer, frames
+
+
+def test_updates_are_merged_until_a_frame():
+    event_manager, coalescer, frames = _coalesced()
+
+    for score in (4, 8, 12):
+        event_manager.post(ScoreUpdateEvent(score, 12))
+    event_manager.post(GridUpdateEvent(None))
+    assert frames.received == []
+    assert coalescer.pending == 2
+
+    event_manager.post(CPUTickEvent())
+    assert frames.received == [12, GridUpdateEvent, CPUTickEvent]
+    assert coalescer.pending == 0
+
+    # Nothing is held back between frames without updates
+    event_manager.post(CPUTickEvent())
+    assert frames.received[3:] == [CPUTickEvent]
+
+
+def test_merged_updates_keep_the_order_of_their_last_post():
+    event_manager, coalescer, frames = _coalesced()
+
+    event_manager.post(ScoreUpdateEvent(4, 4))
+    event_manager.post(GridUpdateEvent(None))
+    event_manager.post(ScoreUpdateEvent(8, 8))
+    coalescer.flush()
+
+    assert frames.received == [GridUpdateEvent, 8]
+
+
+def test_other_events_pass_through_in_order():
+    event_manager, coalescer, frames = _coalesced()
+
+    event_manager.post(QuitEvent())
+    event_manager.post(ScoreUpdateEvent(4, 4))
+    event_manager.post(UserRestartEvent())
+    event_manager.post(ScoreUpdateEvent(8, 8))
+    event_manager.post(GameTeardownEvent())
+
+    # Events that aren't merged don't wait for the frame, nor make the updates go out
+    assert frames.received == [QuitEvent, UserRestartEvent, GameTeardownEvent]
+
+    event_manager.post(CPUTickEvent())
+    assert frames.received[3:] == [8, CPUTickEvent]
@@ -0,0 +1,95 @@
+import random
+import threading
+
+from argparse import Namespace
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from model import parallel
+from model.grid import CompactGrid, Direction
+from model.logic import LogicState
+from model.parallel import ParallelLogic, merge_lines, oriented
+from tests.reference import move_line, move_rows, random_rows
+
+
+def test_merge_lines_matches_reference():
+    rng = random.Random(7)
+    # Long runs of equal tiles are what the kernel's parity trick is about
+    lines = [random_rows(rng, 12, 1, top=2)[0] for _ in range(2000)]
+
+    moved, counts = merge_lines(np.array(lines, dtype=np.uint8))
+
+    expected = [move_line(line) for line in lines]
+    assert moved.tolist() == [line for line, _ in expected]
+    assert sum(int(count) << exponent for exponent, count in enumerate(counts)) == sum(s for _, s in expected)
+
+
+@pytest.mark.parametrize('direction', list(Direction))
+def test_oriented_moves_match_reference(direction):
+    rows = random_rows(random.Random(direction.name), 9, 6)
+    board = np.array(rows, dtype=np.uint8)
+
+    lines = oriented(board, direction)
+    lines[...] = merge_lines(lines.copy())[0]
+
+    assert board.tolist() == move_rows(rows, direction)[0]
+
+
+def _logic(rows, threads: int) -> ParallelLogic:
+    height, width = len(rows), len(rows[0])
+    params = Namespace(width=width, height=height, start_tiles=2, engine_threads=threads)
+
+    logic = ParallelLogic(params)
+    grid = CompactGrid.from_exponents(width, height, bytes(sum(rows, [])))
+    logic.load_state(LogicState(grid=grid, params=params, merged_total=0))
+    return logic
+
+
+def test_bands_move_like_a_single_band(monkeypatch):
+    # Bands of a single line make every move run on the thread pool
+    monkeypatch.setattr(parallel, 'MIN_BAND_CELLS', 1)
+
+    games = list()
+    for threads in (1, 4):
+        logic = ParallelLogic(Namespace(width=10, height=8, start_tiles=40, engine_threads=threads))
+        logic.setup(seed=25)
+        games.append(logic)
+
+    single, banded = games
+    try:
+        for direction in list(Direction) * 3:
+            single.move(direction)
+            banded.move(direction)
+
+            assert banded.board.tolist() == single.board.tolist()
+            assert banded.merged_total == single.merged_total
+    finally:
+        banded.close()
+
+
+def test_close_stops_the_threads(monkeypatch):
+    monkeypatch.setattr(parallel, 'MIN_BAND_CELLS', 1)
+    logic = _logic(random_rows(random.Random(1), 8, 8), threads=2)
+
+    try:
+        logic.move(Direction.LEFT)
+        assert any(thread.name.startswith('logic-band') for thread in threading.enumerate())
+    finally:
+        logic.close()
+    assert not any(thread.name.startswith('logic-band') for thread in threading.enumerate())
+
+    # The pool is started again on demand
+    logic.move(Direction.RIGHT)
+    logic.close()
+
+
+def test_grid_counters_match_the_board():
+    logic = _logic(random_rows(random.Random(4), 12, 7), threads=1)
+    logic.move(Direction.UP)
+
+    grid = logic.grid
+    fresh = CompactGrid.from_exponents(12, 7, logic.board.tobytes())
+    assert (grid.tiles_count, grid.mergeable_pairs) == (fresh.tiles_count, fresh.mergeable_pairs)
+    assert len(grid.tiles) == grid.tiles_count
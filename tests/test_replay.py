@@ -0,0 +1,92 @@
+import random
+
+from argparse import Namespace
+from importlib.util import find_spec
+
+import pytest
+
+from model.engine import create_logic
+from model.grid import Direction
+from model.journal import Journal, JournalError
+from model.replay import replay, states
+
+
+ENGINES = ['classic', 'bitboard'] + (['parallel'] if find_spec('numpy') else [])
+
+# Journals recorded by 30 random moves of seeded 4x4 games,
+# with the score and the cells' exponents the games ended with
+RECORDED = {
+    'classic': ('324a524e0200080000000000000400040002001e000000c521890d7a81da06', 172,
+                [[0, 1, 3, 2], [0, 2, 5, 3], [0, 1, 0, 3], [0, 0, 0, 2]]),
+    'bitboard': ('324a524e0200080000000000000400040002011e000000c521890d7a81da06', 140,
+                 [[2, 3, 4, 2], [0, 1, 2, 3], [0, 0, 0, 4], [0, 1, 0, 3]]),
+}
+
+
+def _rows(logic):
+    grid = logic.grid
+    return [list(grid.row_exponents(y)) for y in range(grid.height)]
+
+
+def _play(engine: str, moves: int, seed: int = 22):
+    logic = create_logic(Namespace(width=4, height=4, start_tiles=2, engine=engine))
+    logic.setup(seed=seed)
+
+    rng = random.Random(seed)
+    for _ in range(moves):
+        if not logic.moves_available():
+            break
+        logic.move(rng.choice(list(Direction)))
+
+    return logic
+
+
+@pytest.mark.parametrize('engine', sorted(RECORDED))
+def test_recorded_journal_replays(engine):
+    data, score, rows = RECORDED[engine]
+    journal = Journal.from_bytes(bytes.fromhex(data))
+
+    logic = replay(journal)
+
+    assert (logic.engine, len(journal)) == (engine, 30)
+    assert logic.merged_total == score
+    assert _rows(logic) == rows
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_replay_rebuilds_the_game(engine):
+    logic = _play(engine, moves=200)
+    journal = Journal.from_bytes(logic.journal.to_bytes())
+
+    replayed = replay(journal)
+
+    assert replayed.merged_total == logic.merged_total
+    assert _rows(replayed) == _rows(logic)
+
+
+def test_replay_stops_at_the_given_move():
+    journal = _play('classic', moves=50).journal
+
+    middle = _play('classic', moves=20)
+    assert _rows(replay(journal, 20)) == _rows(middle)
+
+    numbers = [number for number, _ in states(journal)]
+    assert numbers == list(range(len(journal) + 1))
+
+
+def test_truncated_journal_replays_a_prefix():
+    journal = _play('classic', moves=50).journal
+    journal.truncate(13)
+
+    assert len(journal) == 13
+    assert _rows(replay(journal)) == _rows(_play('classic', moves=13))
+
+
+@pytest.mark.parametrize('data', [
+    b'',
+    b'XXXX' + bytes(32),
+    bytes.fromhex(RECORDED['classic'][0])[:-1],
+])
+def test_broken_journals_are_rejected(data):
+    with pytest.raises(JournalError):
+        Journal.from_bytes(data)
@@ -0,0 +1,108 @@
+import sqlite3
+
+from argparse import Namespace
+
+import pytest
+
+from model.grid import Direction
+from model.logic import Logic
+from storage.sqlite import SQLiteStorageManager
+
+
+def _checkpoint(best: int, moves: int = 0) -> dict:
+    logic = Logic(Namespace(width=4, height=4, start_tiles=2))
+    logic.setup(seed=21)
+    for direction in (Direction.LEFT, Direction.UP, Direction.RIGHT, Direction.DOWN) * moves:
+        logic.move(direction)
+
+    return dict(state=logic.save_state(), best=best, is_finished=False)
+
+
+@pytest.fixture
+def storage(tmp_path):
+    storage = SQLiteStorageManager(str(tmp_path / 'games.db'))
+    yield storage
+    storage.close()
+
+
+def test_leaderboard_is_ordered(storage):
+    for username, best in (('ann', 300), ('bob', 900), ('cid', 600), ('dan', 100)):
+        assert storage.set(username, _checkpoint(best))
+
+    assert storage.top(3) == [('bob', 900), ('cid', 600), ('ann', 300)]
+    assert [storage.rank(username) for username in ('bob', 'cid', 'ann', 'dan')] == [1, 2, 3, 4]
+
+    # Saving again replaces the user's entry
+    storage.set('dan', _checkpoint(1000))
+    assert storage.top(1) == [('dan', 1000)]
+    assert storage.rank('bob') == 2
+
+
+def test_leaderboard_ties_share_the_rank(storage):
+    for username, best in (('ann', 500), ('bob', 900), ('cid', 500), ('dan', 100)):
+        storage.set(username, _checkpoint(best))
+
+    top = storage.top()
+    assert top[0] == ('bob', 900)
+    assert sorted(top[1:3]) == [('ann', 500), ('cid', 500)]
+    assert top[3] == ('dan', 100)
+
+    assert storage.rank('ann') == storage.rank('cid') == 2
+    assert storage.rank('dan') == 4
+
+
+def test_leaderboard_by_score(storage):
+    storage.set('ann', _checkpoint(0, moves=0))
+    storage.set('bob', _checkpoint(0, moves=5))
+
+    assert [username for username, _ in storage.top(by='score')] == ['bob', 'ann']
+    assert storage.rank('ann', by='score') == 2
+
+    with pytest.raises(ValueError):
+        storage.top(by='data')
+
+
+def test_missing_users_have_no_rank(storage):
+    assert storage.rank('ann') is None
+
+    storage.set('ann', _checkpoint(100))
+    storage.delete('ann')
+    assert storage.rank('ann') is None
+    assert storage.get('ann') is None
+
+    with pytest.raises(KeyError):
+        storage.delete('ann')
+
+
+def test_only_checkpoints_are_saved(storage):
+    assert not storage.set('ann', dict(score=1))
+    assert not storage.set('ann', 'not a checkpoint')
+    assert storage.get('ann') is None
+    assert storage.top() == []
+
+
+def test_readers_see_a_consistent_database(tmp_path, storage):
+    storage.set('ann', _checkpoint(100))
+
+    reader = sqlite3.connect(str(tmp_path / 'games.db'), isolation_level=None)
+    try:
+        assert reader.execute('PRAGMA journal_mode').fetchone() == ('wal',)
+
+        reader.execute('BEGIN')
+        assert reader.execute('SELECT COUNT(*) FROM checkpoints').fetchone() == (1,)
+
+        # Writing doesn't wait for the open read transaction, which keeps its snapshot
+        assert storage.set('bob', _checkpoint(200))
+        assert reader.execute('SELECT COUNT(*) FROM checkpoints').fetchone() == (1,)
+        reader.execute('COMMIT')
+
+        assert reader.execute('SELECT COUNT(*) FROM checkpoints').fetchone() == (2,)
+    finally:
+        reader.close()
+
+    other = SQLiteStorageManager(str(tmp_path / 'games.db'))
+    try:
+        assert other.top() == [('bob', 200), ('ann', 100)]
+        assert other.get('bob')['best'] == 200
+    finally:
+        other.close()
@@ -0,0 +1,43 @@
+import json
+
+import pytest
+import yaml
+
+import tournament
+
+
+def _config(tmp_path, **params) -> str:
+    settings = dict(width=4, height=4, start_tiles=2, engine='classic', ai_depth=1, ai_cache_size=1000)
+    settings.update(params)
+
+    path = tmp_path / 'config.yaml'
+    path.write_text(yaml.safe_dump(settings))
+    return str(path)
+
+
+def _run(tmp_path, config: str, *args) -> dict:
+    summary = tmp_path / 'summary.json'
+    tournament.main(['--config', config, '--workers', '1', '--seed', '3',
+                     '--results', str(tmp_path / 'results.jsonl'), '--summary', str(summary), *args])
+    return json.loads(summary.read_text())
+
+
+@pytest.mark.parametrize('engine', ['classic', 'bitboard', 'parallel'])
+def test_ai_plays_on_every_engine(tmp_path, engine):
+    if engine == 'parallel':
+        pytest.importorskip('numpy')
+
+    summary = _run(tmp_path, _config(tmp_path, engine=engine), '--games', '2', '--player', 'ai')
+
+    assert summary['games'] == 2
+    assert summary['score_max'] > 0
+
+
+def test_games_must_be_positive(tmp_path):
+    with pytest.raises(SystemExit):
+        _run(tmp_path, _config(tmp_path), '--games', '0')
+
+
+def test_ai_needs_a_4x4_grid(tmp_path):
+    with pytest.raises(SystemExit):
+        _run(tmp_path, _config(tmp_path, width=5), '--player', 'ai')
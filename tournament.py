@@ -0,0 +1,177 @@
+"""Plays many games across worker processes and collects their results.
+
+Every worker builds its own game logic from the config once and then plays
+the games it's given without the event system. Per-game results are written
+as JSON lines as soon as they arrive; aggregate statistics go to the summary file.
+Game ``i`` is seeded with ``seed + i``, so any game can be played again,
+and its journal can be kept along with the results to replay it move by move.
+"""
+import os
+import sys
+import json
+import yaml
+import random
+import logging
+
+from argparse import ArgumentParser, ArgumentTypeError, Namespace
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from statistics import mean, median, pstdev
+from time import perf_counter
+from typing import List
+
+from controller.ai import DEFAULT_CACHE_SIZE, DEFAULT_DEPTH, Expectimax
+from model.bitboard import BitboardLogic, SIZE
+from model.engine import create_logic
+from model.grid import Direction
+
+
+log = logging.getLogger(__name__)
+
+# Per-process state set up by `_init_worker`
+_logic = None
+_search = None
+_journals = False
+
+
+def _init_worker(params: dict, player: str, journals: bool = False):
+    global _logic, _search, _journals
+
+    params = Namespace(**params)
+    _logic = create_logic(params)
+    _journals = journals
+
+    if player == 'ai':
+        _search = Expectimax(depth=getattr(params, 'ai_depth', DEFAULT_DEPTH),
+                             cache_size=getattr(params, 'ai_cache_size', DEFAULT_CACHE_SIZE))
+
+
+def _choose_direction(directions) -> Direction:
+    if _search is None:
+        return random.choice(directions)
+
+    # Only the bitboard engine keeps the packed board the search works on
+    if isinstance(_logic, BitboardLogic):
+        return _search.decide(_logic.board)
+    return _search.decide_grid(_logic.grid)
+
+
+def _play(games: List[int], seed: int) -> List[dict]:
+    """Plays the games with the given indices. Runs in a worker process."""
+
+    results = list()
+    directions = list(Direction)
+
+    for game in games:
+        random.seed(seed + game)
+        start = perf_counter()
+        moves = 0
+
+        if not _logic.setup(seed=seed + game):
+            raise RuntimeError("Invalid number of `start_tiles` provided in config!")
+
+        while _logic.moves_available():
+            direction = _choose_direction(directions)
+            if direction is None:
+                break
+            _logic.move(direction)
+            moves += 1
+
+        result = dict(game=game,
+                      score=_logic.merged_total,
+                      max_tile=max(tile.value for tile in _logic.grid.tiles),
+                      moves=moves,
+                      wall_time=perf_counter() - start)
+
+        if _journals:
+            result['journal'] = _logic.journal.to_bytes().hex()
+
+        results.append(result)
+
+    return results
+
+
+def summarize(results: List[dict], elapsed: float) -> dict:
+    scores = [result['score'] for result in results]
+    moves = [result['moves'] for result in results]
+
+    return dict(games=len(results),
+                elapsed=elapsed,
+                games_per_sec=len(results) / elapsed if elapsed else 0.0,
+                moves_per_sec=sum(moves) / elapsed if elapsed else 0.0,
+                score_mean=mean(scores),
+                score_median=median(scores),
+                score_std=pstdev(scores),
+                score_max=max(scores),
+                moves_mean=mean(moves),
+                max_tiles={str(tile): count for tile, count in
+                           sorted(Counter(result['max_tile'] for result in results).items())})
+
+
+def _positive(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise ArgumentTypeError(f"must be positive, got {number}")
+    return number
+
+
+def parse_args(argv=None) -> Namespace:
+    parser = ArgumentParser(description="Play 2048 games in parallel and collect statistics.")
+    parser.add_argument('--config', default='config.yaml', help="game settings file")
+    parser.add_argument('--games', type=_positive, default=1000, help="number of games to play")
+    parser.add_argument('--workers', type=_positive, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument('--chunk-size', type=_positive, default=10, help="games sent to a worker at once")
+    parser.add_argument('--player', choices=('random', 'ai'), default='random', help="who makes the moves")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the first game, incremented per game")
+    parser.add_argument('--results', default='results.jsonl', help="per-game results file")
+    parser.add_argument('--summary', default='summary.json', help="aggregate statistics file")
+    parser.add_argument('--journals', action='store_true', help="keep every game's journal (hex) in the results")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    # Load user defined game settings
+    with open(args.config, 'r') as config:
+        params = yaml.safe_load(config)
+
+    # Workers would only fail on their first game
+    if args.player == 'ai' and not BitboardLogic.supports(Namespace(**params)):
+        sys.exit(f"AI player supports only {SIZE}x{SIZE} grids. "
+                 f"Got {params['width']}x{params['height']} in {args.config}.")
+
+    chunks = [list(range(start, min(start + args.chunk_size, args.games)))
+              for start in range(0, args.games, args.chunk_size)]
+
+    results = list()
+    start = perf_counter()
+
+    with ProcessPoolExecutor(max_workers=args.workers,
+                             initializer=_init_worker,
+                             initargs=(params, args.player, args.journals)) as executor, \
+            open(args.results, 'w') as output:
+
+        futures = [executor.submit(_play, chunk, args.seed) for chunk in chunks]
+
+        for future in as_completed(futures):
+            for result in future.result():
+                output.write(json.dumps(result) + '\n')
+                results.append(result)
+
+            output.flush()
+            log.info(f"Finished {len(results)}/{args.games} games")
+
+    summary = summarize(results, perf_counter() - start)
+    summary.update(player=args.player, workers=args.workers, params=params)
+
+    with open(args.summary, 'w') as output:
+        json.dump(summary, output, indent=2)
+
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
+    sys.exit()
@@ -0,0 +1,148 @@
+import math
+
+from typing import List, Optional, Tuple
+
+from model.grid import Grid, Position, Tile
+
+
+DEFAULT_DURATION = 120
+
+# Rendering an animation frame for longer than that (in ms) makes the animation jump to its end
+DEFAULT_BUDGET = 8
+
+# Share of the duration the tiles slide for, merged and new tiles pop up in the rest
+SLIDE_SHARE = 0.6
+
+# Merged tiles grow by this share of their size at the peak of the pop
+POP_SCALE = 0.2
+
+
+class Motion:
+    """Path of a single tile value over the grid, in cell coordinates."""
+
+    __slots__ = ('value', 'origin', 'target', 'kind')
+
+    SLIDE = 'slide'
+    MERGE = 'merge'
+    SPAWN = 'spawn'
+
+    def __init__(self, value: int, origin: Position, target: Position, kind: str):
+        self.value = value
+        self.origin = origin
+        self.target = target
+        self.kind = kind
+
+    def sprite(self, progress: float) -> Optional[Tuple[int, float, float, float]]:
+        """
+        Where and how big the tile is at the given share of the animation.
+
+        :return: tuple (value, x, y, scale) or None if the tile is not visible yet
+        """
+
+        slide = min(progress / SLIDE_SHARE, 1.0)
+        pop = max(progress - SLIDE_SHARE, 0.0) / (1.0 - SLIDE_SHARE)
+
+        if self.kind == Motion.SLIDE:
+            x = self.origin.x + (self.target.x - self.origin.x) * slide
+            y = self.origin.y + (self.target.y - self.origin.y) * slide
+            return self.value, x, y, 1.0
+
+        if not pop:
+            return None
+
+        if self.kind == Motion.MERGE:
+            return self.value, self.target.x, self.target.y, 1.0 + POP_SCALE * math.sin(math.pi * pop)
+
+        return self.value, self.target.x, self.target.y, pop
+
+
+class TileAnimation:
+    """Interpolates the tiles of a grid from their state before the last move to the current one.
+
+    The animation is driven by the milliseconds passed between frames, so late frames skip ahead
+    instead of slowing it down. Starting a new animation drops the pending one, and frames rendered
+    for longer than the budget end it right away, so animations never delay the game.
+    """
+
+    def __init__(self, duration: int = DEFAULT_DURATION, budget: int = DEFAULT_BUDGET):
+        self._duration = duration
+        self._budget = budget
+
+        self._motions: List[Motion] = list()
+        self._still: List[Tile] = list()
+        self._elapsed = 0
+        self._started = False
+
+    @property
+    def active(self) -> bool:
+        return bool(self._motions)
+
+    @property
+    def still(self) -> List[Tile]:
+        """Tiles that don't move during the animation."""
+        return self._still
+
+    def start(self, grid: Grid) -> bool:
+        """
+        Prepares the animation of the last move made on the grid.
+        Its clock starts with the first frame.
+
+        :return: bool True if there is anything to animate, False otherwise
+        """
+
+        self.stop()
+
+        if self._duration <= 0:
+            return False
+
+        for tile in grid.tiles:
+            if tile.merged_from:
+                for source in tile.merged_from:
+                    origin = source.previous_position or source.position
+                    self._motions.append(Motion(source.value, origin, tile.position, Motion.SLIDE))
+                self._motions.append(Motion(tile.value, tile.position, tile.position, Motion.MERGE))
+            elif tile.previous_position is None:
+                self._motions.append(Motion(tile.value, tile.position, tile.position, Motion.SPAWN))
+            elif tile.previous_position != tile.position:
+                self._motions.append(Motion(tile.value, tile.previous_position, tile.position, Motion.SLIDE))
+            else:
+                self._still.append(tile)
+
+        if not self._motions:
+            self.stop()
+
+        return self.active
+
+    def stop(self):
+        """Drops the animation, the tiles are to be drawn in their final state."""
+
+        self._motions = list()
+        self._still = list()
+        self._elapsed = 0
+        self._started = False
+
+    def frame(self, ticks: int) -> List[Tuple[int, float, float, float]]:
+        """
+        Advances the animation by the number of milliseconds passed since the previous frame.
+
+        :return: list of (value, x, y, scale) tuples of the moving tiles, empty once the animation is over
+        """
+
+        # The first frame shows the tiles where they were before the move
+        if self._started:
+            self._elapsed += ticks
+        self._started = True
+
+        progress = self._elapsed / self._duration
+        if progress >= 1.0:
+            self.stop()
+            return list()
+
+        sprites = (motion.sprite(progress) for motion in self._motions)
+        return [sprite for sprite in sprites if sprite is not None]
+
+    def spent(self, milliseconds: float):
+        """Reports the time it took to render the last frame."""
+
+        if milliseconds > self._budget:
+            self.stop()
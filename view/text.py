@@ -0,0 +1,108 @@
+import pygame
+
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from pygame.font import Font
+
+
+# Number of rendered lines kept around, enough for every label, tip and message on the screen
+LINES_CACHE_SIZE = 256
+
+# Font -> character -> horizontal advance in pixels
+_advances: Dict[Font, Dict[str, int]] = dict()
+
+# (font, text, antialias, color, background) -> rendered line, least recently used first
+_lines = OrderedDict()
+
+
+def _glyph_advances(font: Font, text: str) -> List[int]:
+    """Returns horizontal advances of every character, measuring each distinct character of a font only once."""
+
+    advances = _advances.setdefault(font, dict())
+
+    missing = set(text).difference(advances)
+    if missing:
+        missing = ''.join(missing)
+        for char, metrics in zip(missing, font.metrics(missing)):
+            # Characters the font has no glyph for are reported as None
+            advances[char] = metrics[4] if metrics else 0
+
+    return [advances[char] for char in text]
+
+
+def text_width(font: Font, text: str) -> int:
+    """Width of the text as a sum of glyph advances. Ignores kerning, so may differ from ``font.size`` a bit."""
+
+    return sum(_glyph_advances(font, text))
+
+
+def wrap(font: Font, text: str, width: int) -> List[str]:
+    """
+    Splits text into lines that fit the given width.
+
+    Lines are broken at newlines and at the last space that fits, words longer
+    than the width are broken at the last character that fits. Spaces the lines
+    are broken at stay at the end of the previous line. Takes linear time in the text length.
+
+    :return: list of lines
+    """
+
+    lines = list()
+
+    for paragraph in text.split('\n'):
+        # Labels are often laid out in rects of their exact size, ask the font about those
+        if font.size(paragraph)[0] <= width:
+            lines.append(paragraph)
+            continue
+
+        advances = _glyph_advances(font, paragraph)
+        start = 0
+        line_width = 0
+        space = -1
+
+        for i, advance in enumerate(advances):
+            while i > start and line_width + advance > width:
+                # Break after the last space of the line if there is one
+                end = space + 1 if space >= start else i
+                lines.append(paragraph[start:end])
+
+                line_width -= sum(advances[start:end])
+                start = end
+                space = -1
+
+            if paragraph[i] == ' ':
+                space = i
+            line_width += advance
+
+        lines.append(paragraph[start:])
+
+    return lines
+
+
+def render_line(font: Font, text: str, color, antialias: bool = False, background=None) -> pygame.Surface:
+    """Renders a single line of text, returning the same surface for repeated requests."""
+
+    key = (font, text, antialias, _color_key(color), _color_key(background))
+
+    image = _lines.get(key)
+    if image is not None:
+        _lines.move_to_end(key)
+        return image
+
+    if background:
+        image = font.render(text, 1, color, background)
+        image.set_colorkey(background)
+    else:
+        image = font.render(text, antialias, color)
+
+    _lines[key] = image
+    if len(_lines) > LINES_CACHE_SIZE:
+        _lines.popitem(last=False)
+
+    return image
+
+
+def _color_key(color) -> Optional[Tuple[int, ...]]:
+    # Colors are mutable and thus unhashable
+    return tuple(color) if color is not None else None
@@ -1,18 +1,25 @@
 import pygame
 from view import utils, theme
 
+from time import perf_counter
+
 from collections import OrderedDict
 from pygame.rect import Rect
 from pygame.font import Font
 
-from model.grid import Grid, Position
-from common.events import GameReadyEvent, GridUpdateEvent, ScoreUpdateEvent, GameOverEvent
+from model.grid import Grid
+from common.events import CPUTickEvent, GameReadyEvent, GridUpdateEvent, ScoreUpdateEvent, GameOverEvent
 from common.mediator import Listener
+from view.animation import DEFAULT_DURATION, TileAnimation
+
+
+# Number of composed tile surfaces kept around, way more than the distinct values on a board
+TILES_CACHE_SIZE = 64
 
 
 class UserInterface(Listener):
 
-    def __init__(self, width: int, height: int):
+    def __init__(self, width: int, height: int, animation_duration: int = DEFAULT_DURATION):
         pygame.font.init()
 
         self.width = width
@@ -23,7 +30,28 @@ class UserInterface(Listener):
         self._grid_rows = None
         self._grid_cols = None
         self._tile_side = None
-        self._tiles_cache = None
+        # Whole pixels a tile surface takes, tile surfaces are cached for it
+        self._cell_side = None
+
+        # Layers the window is composed of: background with the header and the footer,
+        # the board with empty cells, the board with the tiles that stand still, translucent cover for messages
+        self._static = None
+        self._board = None
+        self._tiles = None
+        self._overlay = None
+
+        # (value, side, colors, font) -> composed tile surface, least recently used first
+        self._tiles_cache = OrderedDict()
+
+        # Screen areas drawn since the last frame was presented
+        self._dirty = list()
+        # Cell index -> tile value currently drawn there, None if the grid has to be drawn from scratch
+        self._drawn = None
+        self._drawn_scores = None
+
+        # Tiles of the last move are animated in the following frames, 0 ms duration turns it off
+        self._animation = TileAnimation(duration=animation_duration)
+        self._animated = None
 
         self._grid_spacing = 15
         self._padding = 40
@@ -37,21 +65,73 @@ class UserInterface(Listener):
         self._score = "SCORE"
         self._best = "BEST"
         self._caption = "Join the numbers and get to the 2048 tile!"
-        self._how_to = OrderedDict(move=['arrows', 'W, A, S, D'], restart=['R'], quit=['Q', 'ESC'])
-
-        self.window.fill(theme.BACKGROUND)
+        self._how_to = OrderedDict(move=['arrows', 'W, A, S, D'], undo=['U', 'Z'], redo=['Y'], restart=['R'], quit=['Q', 'ESC'])
 
-        self._header = self._setup_header()
-        self._footer = self._setup_footer()
+        self._static = self._static_layer()
+        self._overlay = self._overlay_layer()
+        self.window.blit(self._static, (0, 0))
 
         self._drawable = True
         pygame.display.set_caption("2048 Game by Oleg Pavlovich")
         pygame.display.update()
 
+    def _static_layer(self) -> pygame.Surface:
+        """Renders the parts of the window that never change."""
+
+        layer = pygame.Surface((self.width, self.height))
+        layer.fill(theme.BACKGROUND)
+
+        self._header = self._setup_header(layer)
+        self._footer = self._setup_footer(layer)
+        return layer
+
+    def _overlay_layer(self) -> pygame.Surface:
+        alpha = 235
+        color = theme.BACKGROUND
+        color = color.r, color.g, color.b, alpha
+
+        layer = pygame.Surface((self.width, self.height), pygame.SRCALPHA)
+        layer.fill(color)
+        return layer
+
+    def _board_layer(self) -> pygame.Surface:
+        """Renders the grid with every cell empty."""
+
+        layer = pygame.Surface(self._grid_rect.size)
+        layer.fill(theme.BACKGROUND)
+        utils.draw_rounded_rect(layer, theme.GRID_COLOR, layer.get_rect(), border_radius=8)
+
+        offset = (-self._grid_rect.left, -self._grid_rect.top)
+        for index in range(self._grid_rows * self._grid_cols):
+            layer.blit(self._tile_surface(0, self._cell_side), self._cell_rect(index).move(offset))
+
+        return layer
+
+    def _tiles_layer(self, tiles) -> pygame.Surface:
+        """Renders the board with the given tiles on it."""
+
+        layer = self._board.copy()
+        offset = (-self._grid_rect.left, -self._grid_rect.top)
+
+        for tile in tiles:
+            rect = self._cell_rect(tile.y * self._grid_cols + tile.x)
+            layer.blit(self._tile_surface(tile.value, self._cell_side), rect.move(offset))
+
+        return layer
+
     def _reset_background(self):
-        self.window.fill(theme.BACKGROUND)
-        self._setup_header()
-        self._setup_footer()
+        self.window.blit(self._static, (0, 0))
+
+        self._drawn = None
+        self._drawn_scores = None
+        self._dirty.append(self.window.get_rect())
+
+    def _present(self):
+        """Puts everything drawn since the last call on the screen with a single display update."""
+
+        if self._dirty:
+            pygame.display.update(self._dirty)
+            self._dirty.clear()
 
     def _setup_grid(self, grid: Grid) -> Rect:
         assert self._header
@@ -67,29 +147,40 @@ class UserInterface(Listener):
         grid_width = grid.width * scale_factor
         grid_size = (grid_width, grid_height)
 
+        # The board is only rendered again if the layout changes
+        layout = (self._grid_rect, self._grid_rows, self._grid_cols)
+
         # Save computed values and instances
         self._grid_rows = grid.height
         self._grid_cols = grid.width
         self._grid_rect = Rect((self._container.centerx - grid_width / 2, self._header.bottom + margin), grid_size)
 
         self._tile_side = (self._grid_rect.width - self._grid_spacing * (self._grid_cols + 1)) / self._grid_cols
+        self._cell_side = int(self._tile_side)
+        self._drawn = None
+
+        # Tiles of the previous layout are of no use anymore
+        if any(key[1] != self._cell_side for key in self._tiles_cache):
+            self._tiles_cache.clear()
+
+        if self._board is None or layout != (self._grid_rect, self._grid_rows, self._grid_cols):
+            self._board = self._board_layer()
         return self._grid_rect
 
-    def _setup_header(self) -> Rect:
+    def _setup_header(self, surface: pygame.Surface) -> Rect:
         # Draw title
         title = Rect((self._container.left, self._container.top), theme.H1_FONT.size(self._title))
-        utils.draw_text(self.window, self._title, theme.COLOR_DARK, title, theme.H1_FONT, True)
+        utils.draw_text(surface, self._title, theme.COLOR_DARK, title, theme.H1_FONT, True)
 
         # Draw caption
         margin = 15
         caption = Rect((self._container.left, title.bottom + margin), theme.BASE_FONT.size(self._caption))
-        utils.draw_text(self.window, self._caption, theme.COLOR_DARK, caption, theme.BASE_FONT, True)
+        utils.draw_text(surface, self._caption, theme.COLOR_DARK, caption, theme.BASE_FONT, True)
 
         self._header = Rect(self._container.topleft, (self._container.width, caption.height + title.height + margin))
-        pygame.display.update()
         return self._header
 
-    def _setup_footer(self) -> Rect:
+    def _setup_footer(self, surface: pygame.Surface) -> Rect:
         # Draw tips from bottom to top
         margin_top = 5
         margin_right = 6
@@ -110,13 +201,12 @@ class UserInterface(Listener):
             options_size = options_font.size(options)
             options_rect = Rect((label_rect.right + margin_right, label_rect.y), options_size)
 
-            utils.draw_text(self.window, label, theme.COLOR_DARK, label_rect, label_font, True)
-            utils.draw_text(self.window, options, theme.COLOR_DARK, options_rect, options_font, True)
+            utils.draw_text(surface, label, theme.COLOR_DARK, label_rect, label_font, True)
+            utils.draw_text(surface, options, theme.COLOR_DARK, options_rect, options_font, True)
 
             height = label_rect.height + margin_top
             tip_y = label_rect.top - height
 
-        pygame.display.update()
         total_height = tip_h * len(self._how_to.keys())
         self._footer = Rect(self._container.left, self._container.bottom - total_height,
                             self._container.width, total_height)
@@ -124,6 +214,9 @@ class UserInterface(Listener):
         return self._footer
 
     def _draw_scores(self, score: int = 0, best: int = 0):
+        if self._drawn_scores == (score, best):
+            return
+
         score_margin = 10
 
         score_side = (self._container.width // 2 - score_margin * 2) / 2
@@ -143,68 +236,158 @@ class UserInterface(Listener):
             label_rect = Rect((bg_rect.centerx - label_size[0] / 2, bg_rect.top + 6), label_size)
             value_rect = Rect((bg_rect.centerx - value_size[0] / 2, label_rect.bottom), value_size)
 
+            # Clear the previous box so that anti-aliased corners are not drawn twice
+            self.window.blit(self._static, bg_rect, area=bg_rect)
             utils.draw_rounded_rect(self.window, theme.GRID_COLOR, bg_rect, border_radius=4)
             utils.draw_text(self.window, label, theme.COLOR_LIGHT, label_rect, theme.LABEL_FONT, True)
             utils.draw_text(self.window, value, theme.COLOR_WHITE, value_rect, theme.VALUE_FONT, True)
+            self._dirty.append(bg_rect)
 
             # Set next block's x-coordinate
             score_x = bg_rect.right + score_margin
 
-        pygame.display.update()
+        self._drawn_scores = (score, best)
+
+    def _cell_rect(self, index: int) -> Rect:
+        row, col = divmod(index, self._grid_cols)
+        step = self._tile_side + self._grid_spacing
+
+        return Rect(self._grid_rect.left + self._grid_spacing + col * step,
+                    self._grid_rect.top + self._grid_spacing + row * step,
+                    self._cell_side, self._cell_side)
+
+    def _tile_surface(self, value: int, side: int) -> pygame.Surface:
+        """Returns the cell with the given tile value (0 for an empty one) drawn on the board background."""
+
+        color = theme.TILE_COLOR_BASE if value else theme.CELL_COLOR
+        # Colors are mutable and thus unhashable, their components are used instead
+        key = (value, side, tuple(color), tuple(theme.GRID_COLOR), tuple(theme.COLOR_DARK), theme.H2_FONT)
+
+        surface = self._tiles_cache.get(key)
+        if surface is not None:
+            self._tiles_cache.move_to_end(key)
+            return surface
+
+        surface = pygame.Surface((side, side))
+        surface.fill(theme.GRID_COLOR)
+        utils.draw_rounded_rect(surface, color, surface.get_rect(), 4)
+
+        if value:
+            # Values too wide for small cells are cut by the surface bounds
+            text = theme.H2_FONT.render(str(value), True, theme.COLOR_DARK)
+            surface.blit(text, ((side - text.get_width()) // 2, (side - text.get_height()) // 2))
+
+        self._tiles_cache[key] = surface
+        if len(self._tiles_cache) > TILES_CACHE_SIZE:
+            self._tiles_cache.popitem(last=False)
+
+        return surface
+
+    def _draw_cell(self, index: int, value: int):
+        rect = self._cell_rect(index)
+        area = rect.move(-self._grid_rect.left, -self._grid_rect.top)
+
+        if value:
+            self._tiles.blit(self._tile_surface(value, self._cell_side), area)
+        else:
+            self._tiles.blit(self._board, area, area=area)
+
+        self.window.blit(self._tiles, rect, area=area)
+        self._dirty.append(rect)
 
     def _draw_tiles(self, grid: Grid):
         if not self._grid_rect:
             self._setup_grid(grid)
 
-        utils.draw_rounded_rect(self.window, theme.GRID_COLOR, self._grid_rect, border_radius=8)
+        tiles = grid.tiles
+        # Cell index -> value of the tile in it, empty cells are left out
+        values = {tile.y * self._grid_cols + tile.x: tile.value for tile in tiles}
 
-        x, y = self._grid_rect.topleft
-        for i in range(self._grid_rows):
-            rect = None
-            x = self._grid_rect.left
+        if self._drawn is None:
+            # Nothing is on the screen yet, render the tiles layer and put it on the window
+            self._tiles = self._tiles_layer(tiles)
+            self.window.blit(self._tiles, self._grid_rect)
+            self._dirty.append(self._grid_rect)
 
-            for j in range(self._grid_cols):
-                color = theme.CELL_COLOR
-                tile = grid.get_cell(Position(j, i))
-                text = None
-                rect = Rect(x + self._grid_spacing, y + self._grid_spacing, self._tile_side, self._tile_side)
+            self._drawn = values
+            return
 
-                if tile:
-                    color = theme.TILE_COLOR_BASE
-                    text = theme.H2_FONT.render(str(tile.value), True, theme.COLOR_DARK)
+        # Only cells whose value differs from the drawn one are redrawn
+        drawn = self._drawn
+        for index in drawn.keys() | values.keys():
+            value = values.get(index, 0)
+            if drawn.get(index, 0) != value:
+                self._draw_cell(index, value)
 
-                utils.draw_rounded_rect(self.window, color, rect, 4)
+        self._drawn = values
 
-                if text:
-                    text_x = rect.left + (rect.width - text.get_width()) // 2
-                    text_y = rect.top + (rect.height - text.get_height()) // 2
-                    self.window.blit(text, (text_x, text_y))
+    def _sprite_rect(self, x: float, y: float, scale: float) -> Rect:
+        step = self._tile_side + self._grid_spacing
+        side = self._tile_side * scale
 
-                x = rect.right
+        rect = Rect(0, 0, side, side)
+        rect.center = (round(self._grid_rect.left + self._grid_spacing + x * step + self._tile_side / 2),
+                       round(self._grid_rect.top + self._grid_spacing + y * step + self._tile_side / 2))
+        return rect
 
-            y = rect.bottom
+    def _draw_animation(self, ticks: int):
+        start = perf_counter()
+        sprites = self._animation.frame(ticks)
 
-        pygame.display.update()
+        if sprites:
+            self.window.blit(self._tiles, self._grid_rect)
+            self._dirty.append(self._grid_rect)
+
+            side = self._cell_side
+            for value, x, y, scale in sprites:
+                rect = self._sprite_rect(x, y, scale)
+                if rect.width < 1:
+                    continue
+
+                surface = self._tile_surface(value, side)
+                if rect.width != side:
+                    surface = pygame.transform.scale(surface, rect.size)
+                self.window.blit(surface, rect)
+
+            self._animation.spent((perf_counter() - start) * 1000)
+
+        # Either the animation is over or it's too slow to go on
+        if not self._animation.active:
+            self._finish_animation()
+
+    def _finish_animation(self):
+        """Draws the tiles of the animated grid in their final state."""
+
+        self._animation.stop()
+        grid, self._animated = self._animated, None
+
+        if grid is not None:
+            self._drawn = None
+            self._draw_tiles(grid)
 
     def _draw_message(self, text: str, overlay: bool = True):
         message_rect = self._header.copy()
         message_rect.y = message_rect.height * 2
 
         if overlay:
-            alpha = 235
-            color = theme.BACKGROUND
-            color = color.r, color.g, color.b, alpha
-            surf = pygame.Surface((self.width, self.height), pygame.SRCALPHA)
-            surf.fill(color)
-            self.window.blit(surf, (0, 0))
+            self.window.blit(self._overlay, (0, 0))
         else:
             self.window.fill(theme.BACKGROUND)
 
         utils.draw_text(self.window, text, theme.COLOR_DARK, message_rect, theme.H3_FONT, True)
-        pygame.display.update()
+        self._dirty.append(self.window.get_rect())
 
     def notify(self, event):
+        # Whatever was drawn during the frame is shown once it's over
+        if isinstance(event, CPUTickEvent):
+            if self._animated is not None:
+                self._draw_animation(event.ticks)
+            self._present()
+            return
+
         if isinstance(event, GameReadyEvent):
+            self._animation.stop()
+            self._animated = None
 
             # Game was restarted with this flag
             if not self._drawable:
@@ -220,13 +403,21 @@ class UserInterface(Listener):
             return
 
         if isinstance(event, GridUpdateEvent):
-            self._draw_tiles(event.grid)
+            # A move made while the previous one is animated skips the rest of its animation
+            if self._animation.start(event.grid):
+                self._animated = event.grid
+                # The tiles that stand still are rendered once per animation, frames only add the moving ones
+                self._tiles = self._tiles_layer(self._animation.still)
+                self._drawn = None
+            else:
+                self._finish_animation()
+                self._draw_tiles(event.grid)
 
         if isinstance(event, ScoreUpdateEvent):
             self._draw_scores(score=event.score, best=event.best)
 
         if isinstance(event, GameOverEvent):
+            self._finish_animation()
             self._draw_scores(score=event.score, best=event.best)
             self._draw_message(f"Game over! Score {event.score}.\nPress r to restart or q to quit :)")
             self._drawable = False
-
@@ -1,6 +1,8 @@
 import pygame.draw
 from pygame.gfxdraw import aacircle, filled_circle
 
+from view.text import render_line, wrap
+
 
 def draw_rounded_rect(surface, color, rect, border_radius):
     """Draw a rectangle with rounded corners.
@@ -62,6 +64,11 @@ def draw_bordered_rounded_rect(surface, color, rect, border_color, border_radius
 
 
 def draw_text(surface, text, color, rect, font, antialias=False, background=None):
+    """Draws text wrapped to the width of the rect.
+
+    :return: str text that didn't fit the rect height, empty if it all was drawn
+    """
+
     rect = pygame.Rect(rect)
     y = rect.top
     line_spacing = -2
@@ -69,33 +76,17 @@ def draw_text(surface, text, color, rect, font, antialias=False, background=None
     # Get the height of the font
     font_height = font.size("Tg")[1]
 
-    for text in text.split('\n'):
-        while text:
-            i = 1
-
-            # Determine if the row of text will be outside our area
-            if y + font_height > rect.bottom:
-                break
-
-            # Determine maximum width of line
-            while font.size(text[:i])[0] < rect.width and i < len(text):
-                i += 1
-
-            # If we've wrapped the text, then adjust the wrap to the last word
-            if i < len(text):
-                i = text.rfind(" ", 0, i) + 1 if not nl else text.rfind("\n", 0, i) + 1
-
-            # Render the line and blit it to the surface
-            if background:
-                image = font.render(text[:i], 1, color, background)
-                image.set_colorkey(background)
-            else:
-                image = font.render(text[:i], antialias, color)
+    lines = wrap(font, text, rect.width)
+    for i, line in enumerate(lines):
+        # Empty lines take no space
+        if not line:
+            continue
 
-            surface.blit(image, (rect.left, y))
-            y += font_height + line_spacing
+        # Determine if the row of text will be outside our area
+        if y + font_height > rect.bottom:
+            return '\n'.join(lines[i:])
 
-            # Remove the text we just blitted
-            text = text[i:]
+        surface.blit(render_line(font, line, color, antialias, background), (rect.left, y))
+        y += font_height + line_spacing
 
-    return text
+    return ''